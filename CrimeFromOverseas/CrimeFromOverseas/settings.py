@@ -29,6 +29,21 @@ SCAM_ENDPOINT = os.getenv("SCAM_ENDPOINT")
 VOICE_BASE_URL = os.getenv("VOICE_BASE_URL")
 VOICE_ENDPOINT = os.getenv("VOICE_ENDPOINT")
 
+# 여러 페이지 API를 받을 때 동시에 보낼 요청 수
+API_PAGE_WORKERS = int(os.getenv("API_PAGE_WORKERS", "4"))
+
+# 업스트림 API HTTP 세션: 커넥션 풀 크기, (connect, read) 타임아웃(초), 429/5xx 재시도
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "8"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+API_BACKOFF_FACTOR = float(os.getenv("API_BACKOFF_FACTOR", "0.5"))
+
+# 업스트림 API 응답 디스크 캐시 (데이터가 많아야 월 1회 바뀌므로 기본 TTL 하루)
+API_CACHE_ENABLED = os.getenv("API_CACHE_ENABLED", "1") == "1"
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", str(60 * 60 * 24)))
+API_CACHE_DIR = Path(os.getenv("API_CACHE_DIR", BASE_DIR / ".cache" / "api"))
+
 def csv_path(name):
     value = os.getenv(name)
     if value:
@@ -41,6 +56,65 @@ AFRICA_CSV = csv_path("AFRICA_CSV")
 AMERICA_CSV = csv_path("AMERICA_CSV")
 OCEANIA_CSV = csv_path("OCEANIA_CSV")
 
+# CSV 본문을 몇 행(=월)씩 나눠 읽을지 (스트리밍 파싱)
+DEPARTURE_CSV_CHUNK_ROWS = int(os.getenv("DEPARTURE_CSV_CHUNK_ROWS", "5000"))
+
+# 지역별 CSV 병렬 파싱 프로세스 수 (1 이하 = 직렬, 디버깅용)
+DEPARTURE_LOAD_WORKERS = int(os.getenv("DEPARTURE_LOAD_WORKERS", "1"))
+
+# 월별 출국 데이터 저장 방식: "rows"(TravelStat 행) / "series"(국가당 int32 배열) / "both"
+DEPARTURE_MONTHLY_STORAGE = os.getenv("DEPARTURE_MONTHLY_STORAGE", "rows")
+
+# bulk_create(update_conflicts=True) 한 번에 넣을 행 수
+DB_BULK_BATCH_SIZE = int(os.getenv("DB_BULK_BATCH_SIZE", "1000"))
+
+# /sync/* 백그라운드 작업: "thread"(웹 프로세스 스레드 풀) / "command"(run_sync_jobs 워커) / "inline"(디버깅)
+SYNC_JOB_MODE = os.getenv("SYNC_JOB_MODE", "thread")
+SYNC_JOB_WORKERS = int(os.getenv("SYNC_JOB_WORKERS", "1"))
+# 이 시간(초) 넘게 running 인 작업은 죽은 것으로 보고 같은 종류 작업을 새로 받는다
+SYNC_JOB_STALE_SECONDS = int(os.getenv("SYNC_JOB_STALE_SECONDS", "3600"))
+
+# single-flight 프로세스 간 파일 잠금 위치
+SINGLEFLIGHT_LOCK_DIR = Path(os.getenv("SINGLEFLIGHT_LOCK_DIR", BASE_DIR / ".cache" / "locks"))
+
+# 파싱된 출국 CSV 캐시 (feather). CSV가 바뀌면 지문이 달라져 자동 무효화
+DEPARTURE_CACHE_ENABLED = os.getenv("DEPARTURE_CACHE_ENABLED", "1") == "1"
+DEPARTURE_CACHE_DIR = Path(os.getenv("DEPARTURE_CACHE_DIR", BASE_DIR / ".cache" / "departures"))
+
+# 국가 × 연도 × 월 출국자 큐브 (ingest가 쓰고 웹 워커들은 읽기 전용 memmap으로 공유)
+DEPARTURE_CUBE_ENABLED = os.getenv("DEPARTURE_CUBE_ENABLED", "1") == "1"
+DEPARTURE_CUBE_DIR = Path(os.getenv("DEPARTURE_CUBE_DIR", BASE_DIR / ".cache" / "cube"))
+
+# 분석 API 응답 캐시 (키에 DB 데이터 버전, 동기화 때 비움).
+# 여러 워커 프로세스가 응답을 공유하도록 기본은 파일 캐시
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "1") == "1"
+ANALYSIS_CACHE_ALIAS = "analysis"
+ANALYSIS_CACHE_DIR = Path(os.getenv("ANALYSIS_CACHE_DIR", BASE_DIR / ".cache" / "responses"))
+# 응답 하나의 최대 보관 시간(초). 동기화와 겹쳐 옛 버전 키로 남은 응답도 이 시간 뒤엔 지워진다
+ANALYSIS_CACHE_TIMEOUT = int(os.getenv("ANALYSIS_CACHE_TIMEOUT", str(24 * 60 * 60)))
+
+# 요청 단위 프로파일링 미들웨어 + /debug/perf/ (지연시간, SQL, 구간, 메모리). 기본 꺼짐
+PERF_PROFILING_ENABLED = os.getenv("PERF_PROFILING_ENABLED", "0") == "1"
+# 라우트별 백분위 계산에 쓰는 최근 요청 수
+PERF_PROFILING_BUFFER = int(os.getenv("PERF_PROFILING_BUFFER", "500"))
+# tracemalloc 메모리 피크 측정 (할당마다 비용이 붙으므로 끌 수 있음)
+PERF_PROFILING_MEMORY = os.getenv("PERF_PROFILING_MEMORY", "1") == "1"
+
+# 수집/동기화 파이프라인 메트릭 (/metrics, Prometheus text format). 0 이면 기록도 노출도 안 함
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    ANALYSIS_CACHE_ALIAS: {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": str(ANALYSIS_CACHE_DIR),
+        "TIMEOUT": ANALYSIS_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -78,6 +152,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # PERF_PROFILING_ENABLED 가 꺼져 있으면 로드되지 않음
+    'main.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'CrimeFromOverseas.urls'
@@ -1,70 +1,156 @@
+import math
+import threading
+import time
 import requests
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+from django.db.models import Sum
 
 from .models import (
     CyberScamStat,
+    SyncWatermark,
     VoicePhishingStat,
+    VoicePhishingYearlyStat,
     TravelStat,
 )
+from . import metrics
+from . import utils_api_cache as api_cache
+from .utils_db import bulk_upsert, dry_run_atomic
 
 
 # =========================
-# 1. 사이버 사기
+# 0. 공통: HTTP 세션 (커넥션 풀 + 타임아웃 + 재시도)
 # =========================
-def fetch_cyber_scam(page=1, per_page=100):
-    """경찰청 사이버사기 범죄 API에서 원본 JSON 가져오기"""
+_session = None
+_session_lock = threading.Lock()
 
-    url = f"{settings.SCAM_BASE_URL}{settings.SCAM_ENDPOINT}"
+# 최근 호출 기록 (지연시간/재시도 횟수) + 엔드포인트별 누적
+_call_log = deque(maxlen=200)
+_call_totals = {}
+_stats_lock = threading.Lock()
 
-    params = {
-        "page": page,
-        "perPage": per_page,
-        "serviceKey": settings.API_KEY,  
-        "returnType": "JSON",
-    }
 
-    res = requests.get(url, params=params)
-    res.raise_for_status()
+def get_session():
+    """
+    프로세스 전체에서 같이 쓰는 requests.Session.
+    keep-alive 커넥션을 재사용하고, 429/5xx 는 지수 백오프로 재시도한다.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=settings.API_MAX_RETRIES,
+                    backoff_factor=settings.API_BACKOFF_FACTOR,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["GET"],
+                    respect_retry_after_header=True,
+                    raise_on_status=False,   # 마지막 응답은 raise_for_status()로 처리
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=settings.API_POOL_SIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def reset_session():
+    """설정을 바꾼 뒤(테스트 등) 세션을 새로 만들고 싶을 때"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _record_call(url, page, status, seconds, retries, error=None, cache=None):
+    """
+    cache: None(캐시 미사용) / "miss" / "revalidated"(304) / "hit"(TTL 안, HTTP 요청 없음)
+    retries: 재시도 횟수 (예외로 끝나서 알 수 없으면 None → 누적에는 더하지 않음)
+    """
+    with _stats_lock:
+        _call_log.append({
+            "url": url,
+            "page": page,
+            "status": status,
+            "seconds": round(seconds, 4),
+            "retries": retries,
+            "error": error,
+            "cache": cache,
+        })
+        total = _call_totals.setdefault(
+            url, {"calls": 0, "cache_hits": 0, "errors": 0, "retries": 0, "seconds": 0.0}
+        )
+        if cache == "hit":
+            total["cache_hits"] += 1
+            metrics.UPSTREAM_CACHE_HITS.inc(endpoint=metrics.endpoint_label(url))
+            return
+        total["calls"] += 1
+        total["retries"] += retries or 0
+        total["seconds"] += seconds
+        if error is not None:
+            total["errors"] += 1
+    metrics.UPSTREAM_SECONDS.observe(
+        seconds, endpoint=metrics.endpoint_label(url), status=status if status is not None else "error",
+    )
 
-    data = res.json()
-    return data.get("data", [])
 
+def _retries_from_error(error):
+    """
+    요청이 예외로 끝났을 때의 재시도 횟수.
+    urllib3는 재시도를 다 쓰면 MaxRetryError 를 던지고 Retry 객체(history)는 넘겨주지 않는다.
+    → MaxRetryError 면 설정한 횟수를 모두 쓴 것, 그 밖의 예외는 몇 번 재시도했는지 알 수 없음(None)
+    """
+    cause = error.args[0] if error.args else None
+    if isinstance(cause, MaxRetryError):
+        return settings.API_MAX_RETRIES
+    return None
 
-def sync_cyber_scam():
-    """사이버 사기 데이터를 DB에 저장"""
-    rows = fetch_cyber_scam(page=1, per_page=100)
 
-    for row in rows:
-        try:
-            year = clean_int(row.get("연도"))
-            category = row.get("구분", "")
-        except Exception:
-            continue
+def get_api_call_stats():
+    """업스트림 API 호출 비용: 엔드포인트별 누적 + 최근 호출 목록"""
+    with _stats_lock:
+        totals = {
+            url: dict(t, seconds=round(t["seconds"], 4),
+                      avg_seconds=round(t["seconds"] / t["calls"], 4) if t["calls"] else None)
+            for url, t in _call_totals.items()
+        }
+        return {"endpoints": totals, "recent": list(_call_log)}
 
-        CyberScamStat.objects.update_or_create(
-            year=year,
-            category=category,
-            defaults={
-                "direct_trade":  clean_int(row.get("직거래")),
-                "shopping_mall": clean_int(row.get("쇼핑몰")),
-                "game":          clean_int(row.get("게임")),
-                "email_trade":   clean_int(row.get("이메일 무역")),
-                "romance":       clean_int(row.get("연예빙자")),
-                "investment":    clean_int(row.get("사이버투자")),
-                "etc":           clean_int(row.get("사이버사기_기타")),
-            },
-        )
 
+def reset_api_call_stats():
+    with _stats_lock:
+        _call_log.clear()
+        _call_totals.clear()
 
 
 # =========================
-# 2. 보이스피싱 월별 (문자열 JSON 방어 포함)
+# 0-1. 공통: 페이지 요청 & 전체 페이지 수집
 # =========================
-def fetch_voice_phishing(page=1, per_page=200):
-    """보이스피싱 월별 현황 API에서 데이터 가져오기"""
+def request_page(url, page, per_page, use_cache=True):
+    """
+    공공데이터포털(odcloud) API 한 페이지 요청 → 최상위 JSON
+    응답은 디스크 캐시(utils_api_cache)에 저장되고, API_CACHE_TTL 안에서는 HTTP 요청 없이 재사용한다.
+    TTL이 지나면 ETag / Last-Modified 조건부 요청으로 바뀐 게 있을 때만 본문을 다시 받는다.
+    """
+
+    key = api_cache.cache_key(url, page, per_page) if use_cache else None
+    entry = api_cache.load_entry(key) if key else None
 
-    url = f"{settings.VOICE_BASE_URL}{settings.VOICE_ENDPOINT}"
+    if entry is not None and api_cache.is_fresh(entry):
+        _record_call(url, page, None, 0.0, 0, cache="hit")
+        return entry["body"]
 
     params = {
         "page": page,
@@ -73,18 +159,233 @@ def fetch_voice_phishing(page=1, per_page=200):
         "returnType": "JSON",
     }
 
-    res = requests.get(url, params=params)
+    start = time.perf_counter()
+    try:
+        res = get_session().get(
+            url,
+            params=params,
+            headers=api_cache.conditional_headers(entry),
+            timeout=(settings.API_CONNECT_TIMEOUT, settings.API_READ_TIMEOUT),
+        )
+    except requests.RequestException as e:
+        _record_call(url, page, None, time.perf_counter() - start, _retries_from_error(e), repr(e))
+        raise
+
+    history = getattr(getattr(res.raw, "retries", None), "history", None) or ()
+    not_modified = res.status_code == 304 and entry is not None
+    _record_call(
+        url, page, res.status_code, time.perf_counter() - start, len(history),
+        None if res.ok else f"HTTP {res.status_code}",
+        cache=("revalidated" if not_modified else "miss") if key else None,
+    )
+
+    if not_modified:
+        api_cache.touch_entry(key, entry)
+        return entry["body"]
+
     res.raise_for_status()
 
     # 1차 파싱: 최상위 JSON
     try:
-        raw = res.json()
+        body = res.json()
     except ValueError:
-        raw = json.loads(res.text)
+        body = json.loads(res.text)
+
+    if key:
+        api_cache.save_entry(
+            key, body,
+            etag=res.headers.get("ETag"),
+            last_modified=res.headers.get("Last-Modified"),
+        )
+    return body
+
+
+def page_rows(raw):
+    """경우에 따라 {"data": [...]} 이거나 그냥 [...] 일 수 있음"""
+    if isinstance(raw, dict):
+        return raw.get("data", [])
+    if isinstance(raw, list):
+        return raw
+    return []
+
+
+def total_count(raw):
+    """응답의 totalCount (없거나 숫자가 아니면 None)"""
+    try:
+        return int(raw.get("totalCount"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def iter_page_responses(url, per_page, max_workers=None, first_page=1):
+    """
+    first_page를 먼저 받아 totalCount로 마지막 페이지를 구한 뒤,
+    나머지 페이지는 스레드 풀(max_workers 동시 요청)로 받아서 페이지 순서대로 응답 JSON을 yield.
+    totalCount가 없는 응답이면 first_page만 돌려준다.
+    """
+    if max_workers is None:
+        max_workers = settings.API_PAGE_WORKERS
+
+    first = request_page(url, first_page, per_page)
+    yield first
+
+    total = total_count(first)
+    if total is None:
+        return
+
+    last_page = math.ceil(total / per_page)
+    if last_page <= first_page:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = [
+            pool.submit(request_page, url, page, per_page)
+            for page in range(first_page + 1, last_page + 1)
+        ]
+        for future in futures:
+            yield future.result()
+    finally:
+        # 중간에 실패하거나 소비를 멈추면 아직 시작 안 한 요청은 취소
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pages(url, per_page, max_workers=None):
+    """전체 페이지의 rows를 페이지 순서대로 yield"""
+    for raw in iter_page_responses(url, per_page, max_workers):
+        yield page_rows(raw)
+
+
+def payload_unchanged(source, digest, model):
+    """지난 동기화 때와 API 응답 내용(해시)이 같고 DB에도 데이터가 있으면 True"""
+    if digest != api_cache.load_sync_digest(source) or not model.objects.exists():
+        return False
+    print(f"✔ {source}: API 응답이 지난 동기화와 같음 → DB 동기화 생략")
+    return True
+
+
+def unchanged_stats(n_rows):
+    """payload_unchanged로 건너뛴 동기화의 결과 (bulk_upsert 반환 형식과 동일)"""
+    return {
+        "rows": n_rows, "inserted": 0, "updated": 0, "skipped": n_rows,
+        "seconds": 0.0, "rows_per_sec": None, "payload_unchanged": True,
+    }
+
+
+# =========================
+# 1. 사이버 사기
+# =========================
+def cyber_scam_url():
+    return f"{settings.SCAM_BASE_URL}{settings.SCAM_ENDPOINT}"
+
+
+def fetch_cyber_scam(page=1, per_page=100):
+    """경찰청 사이버사기 범죄 API에서 원본 JSON 가져오기"""
+    return page_rows(request_page(cyber_scam_url(), page, per_page))
+
 
-    # 경우에 따라 {"data": [...]} 이거나 그냥 [...] 일 수 있음
-    rows = raw.get("data", raw)
+def fetch_all_cyber_scam(per_page=100, max_workers=None):
+    """사이버사기 API 전체 페이지 (페이지 순서대로 이어 붙임)"""
+    rows = []
+    for page in iter_pages(cyber_scam_url(), per_page, max_workers):
+        rows.extend(page)
+    return rows
 
+
+CYBER_FIELDS = {
+    "direct_trade":  "직거래",
+    "shopping_mall": "쇼핑몰",
+    "game":          "게임",
+    "email_trade":   "이메일 무역",
+    "romance":       "연예빙자",
+    "investment":    "사이버투자",
+    "etc":           "사이버사기_기타",
+}
+
+
+def parse_cyber_scam_rows(rows):
+    """API 원본 rows → 검증된 CyberScamStat 인스턴스 리스트 (연도/구분 없는 행은 버림)"""
+    objs = []
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+
+        year = clean_int(row.get("연도"))
+        category = row.get("구분") or ""
+        if year <= 0 or not str(category).strip():
+            continue
+
+        objs.append(CyberScamStat(
+            year=year,
+            category=category,
+            **{field: clean_int(row.get(key)) for field, key in CYBER_FIELDS.items()},
+        ))
+    metrics.ROWS_PARSED.inc(len(objs), source="cyber_scam")
+    return objs
+
+
+def upsert_cyber_scam(objs, batch_size=None):
+    """CyberScamStat 인스턴스들을 한 번의 배치 upsert로 저장 (변경 없는 행은 건너뜀)"""
+    stats = bulk_upsert(
+        CyberScamStat, objs,
+        unique_fields=["year", "category"],
+        update_fields=list(CYBER_FIELDS),
+        batch_size=batch_size,
+    )
+    print(f"✔ CyberScamStat 동기화: {stats}")
+    return stats
+
+
+def get_cyber_scam_yearly(years=None, category="발생건수"):
+    """연도별 사이버사기 합계 {year: total} (DB에서 SUM 한 번, 연도순)"""
+    qs = CyberScamStat.objects.all()
+    if category is not None:
+        qs = qs.filter(category=category)
+    if years is not None:
+        qs = qs.filter(year__in=years)
+
+    rows = (
+        qs.values("year")
+        .annotate(total=Sum("total_cases"))
+        .order_by("year")
+    )
+    return {r["year"]: r["total"] for r in rows}
+
+
+@metrics.timed("sync_cyber_scam")
+def sync_cyber_scam(force=False, dry_run=False, workers=None, batch_size=None):
+    """
+    사이버 사기 데이터를 DB에 저장
+    force: API 응답이 지난 동기화와 같아도 다시 upsert
+    dry_run: 무엇이 바뀔지만 계산하고 DB 변경은 되돌림 (응답 해시도 남기지 않음)
+    workers / batch_size: 동시 페이지 요청 수 / upsert 배치 크기 (None = settings 기본값)
+    """
+    rows = fetch_all_cyber_scam(per_page=100, max_workers=workers)
+
+    digest = api_cache.payload_digest(rows)
+    if not force and payload_unchanged("cyber_scam", digest, CyberScamStat):
+        return unchanged_stats(len(rows))
+
+    with dry_run_atomic(dry_run):
+        stats = upsert_cyber_scam(parse_cyber_scam_rows(rows), batch_size)
+    if not dry_run:
+        api_cache.save_sync_digest("cyber_scam", digest)
+    return stats
+
+
+
+# =========================
+# 2. 보이스피싱 월별 (문자열 JSON 방어 포함)
+# =========================
+VOICE_SOURCE = "voice_phishing"
+
+
+def voice_phishing_url():
+    return f"{settings.VOICE_BASE_URL}{settings.VOICE_ENDPOINT}"
+
+
+def clean_voice_rows(rows):
+    """문자열로 한 번 더 감싸진 행까지 dict로 풀어서 반환"""
     clean_rows = []
 
     for r in rows:
@@ -107,11 +408,22 @@ def fetch_voice_phishing(page=1, per_page=200):
     return clean_rows
 
 
-def sync_voice_phishing():
-    """보이스피싱 월별 데이터를 DB에 저장"""
+def fetch_voice_phishing(page=1, per_page=200):
+    """보이스피싱 월별 현황 API에서 데이터 가져오기"""
+    return clean_voice_rows(page_rows(request_page(voice_phishing_url(), page, per_page)))
+
+
+def fetch_all_voice_phishing(per_page=500, max_workers=None):
+    """보이스피싱 API 전체 페이지 (페이지 순서대로 이어 붙임)"""
+    rows = []
+    for page in iter_pages(voice_phishing_url(), per_page, max_workers):
+        rows.extend(clean_voice_rows(page))
+    return rows
 
-    rows = fetch_voice_phishing(page=1, per_page=500)
 
+def parse_voice_phishing_rows(rows):
+    """API 원본 rows → 검증된 VoicePhishingStat 인스턴스 리스트"""
+    objs = []
     for row in rows:
         # 안전하게 get + 검증
         year_raw = row.get("년")
@@ -130,31 +442,144 @@ def sync_voice_phishing():
             # 숫자로 안 바뀌면 그냥 버리기
             continue
 
-        VoicePhishingStat.objects.update_or_create(
-            year=year,
-            month=month,
-            defaults={"cases": cases},
-        )
-    
-    yearly = get_voice_phishing_yearly()
-    return yearly
+        objs.append(VoicePhishingStat(year=year, month=month, cases=cases))
+    metrics.ROWS_PARSED.inc(len(objs), source="voice_phishing")
+    return objs
 
-def get_voice_phishing_yearly():
-    qs = VoicePhishingStat.objects.all().values("year", "month", "cases")
-    if not qs:
-        return None
 
-    df = pd.DataFrame(qs)
+def upsert_voice_phishing(objs, batch_size=None):
+    """VoicePhishingStat 인스턴스들을 한 번의 배치 upsert로 저장 (변경 없는 행은 건너뜀)"""
+    stats = bulk_upsert(
+        VoicePhishingStat, objs,
+        unique_fields=["year", "month"],
+        update_fields=["cases"],
+        batch_size=batch_size,
+    )
+    print(f"✔ VoicePhishingStat 동기화: {stats}")
+    return stats
+
+
+def fetch_voice_phishing_from(row_offset, per_page=500, max_workers=None):
+    """
+    API 전체 행 중 마지막으로 저장한 행(row_offset - 1 번째)이 들어 있는 페이지부터 받아온다.
+    (이미 저장한 마지막 페이지도 다시 받아서 그 사이 고쳐진 달을 반영한다)
+
+    반환: (rows, upstream_total, anchor)
+      - upstream_total: API의 totalCount (없으면 None)
+      - anchor: row_offset - 1 번째 행 (지난번 마지막 행과 같은지 호출하는 쪽에서 확인)
+      - totalCount가 row_offset보다 작으면(원본이 다시 쓰인 경우) rows=None → 전체 동기화 필요
+    """
+    last_index = max(row_offset - 1, 0)
+    first_page = last_index // per_page + 1
+    responses = iter_page_responses(voice_phishing_url(), per_page, max_workers, first_page)
+
+    first = next(responses)
+    upstream_total = total_count(first)
+    if upstream_total is not None and upstream_total < row_offset:
+        responses.close()
+        return None, upstream_total, None
+
+    raw = page_rows(first)
+    index = last_index - (first_page - 1) * per_page
+    anchor = clean_voice_rows(raw[index:index + 1]) if row_offset else []
+
+    rows = clean_voice_rows(raw)
+    for page in responses:
+        rows.extend(clean_voice_rows(page_rows(page)))
+    return rows, upstream_total, anchor[0] if anchor else None
+
 
-    yearly = (
-        df.groupby("year")["cases"]
-        .sum()
-        .reset_index()
-        .rename(columns={"cases": "voice_year_total"})
+def _matches_watermark(anchor, watermark):
+    """API의 row_count - 1 번째 행이 워터마크의 연/월과 같은지 (오래된 달 → 최근 달 순서 확인)"""
+    parsed = parse_voice_phishing_rows([anchor]) if anchor is not None else []
+    return bool(parsed) and (parsed[0].year, parsed[0].month) == (watermark.year, watermark.month)
+
+
+def refresh_voice_yearly(years):
+    """주어진 연도의 월별 합계만 다시 계산해서 VoicePhishingYearlyStat에 반영"""
+    if not years:
+        return None
+
+    sums = (
+        VoicePhishingStat.objects
+        .filter(year__in=years)
+        .values("year")
+        .annotate(total=Sum("cases"))
     )
+    objs = [VoicePhishingYearlyStat(year=r["year"], cases=r["total"]) for r in sums]
+    return bulk_upsert(VoicePhishingYearlyStat, objs, unique_fields=["year"], update_fields=["cases"])
+
+
+@metrics.timed("sync_voice_phishing")
+def sync_voice_phishing(full=False, dry_run=False, workers=None, batch_size=None):
+    """
+    보이스피싱 월별 데이터를 DB에 저장.
+
+    기본은 워터마크(마지막으로 받은 연/월 + 그때의 API 전체 행 수)가 들어 있는 페이지부터 받는 증분 동기화.
+    워터마크가 없거나 full=True 이거나 API 행 수가 줄었거나
+    마지막으로 저장한 위치의 행이 워터마크의 연/월과 다르면 전체를 다시 받는다.
+    연도별 합계는 다시 받은 달이 속한 연도만 다시 계산한다.
+    dry_run=True 면 저장/워터마크 갱신을 되돌리고 응답 해시도 남기지 않는다 (반환값은 기존 DB 기준).
+    workers / batch_size: 동시 페이지 요청 수 / upsert 배치 크기 (None = settings 기본값)
+    """
+    watermark = None if full else SyncWatermark.objects.filter(source=VOICE_SOURCE).first()
 
+    rows, upstream_total, digest = None, None, None
+    if watermark is not None:
+        rows, upstream_total, anchor = fetch_voice_phishing_from(
+            watermark.row_count, per_page=500, max_workers=workers,
+        )
+        if rows is not None and not _matches_watermark(anchor, watermark):
+            # 행 순서가 바뀌었거나 중간에 행이 끼어들었으면 offset을 믿을 수 없음
+            print(f"⚠ 보이스피싱 {watermark.row_count}번째 행이 워터마크와 다름 → 전체 동기화")
+            rows = None
+
+    if rows is None:
+        watermark = None
+        rows = fetch_all_voice_phishing(per_page=500, max_workers=workers)
+        upstream_total = len(rows)
+
+        # 전체 동기화는 응답이 지난번과 똑같으면 DB 작업 생략
+        digest = api_cache.payload_digest(rows)
+        if payload_unchanged("voice_phishing", digest, VoicePhishingStat):
+            return get_voice_phishing_yearly()
+
+    objs = parse_voice_phishing_rows(rows)
+    if watermark is not None:
+        # 다시 받은 마지막 저장 페이지의 행도 upsert → 고쳐진 달은 갱신, 같은 달은 건너뜀
+        print(f"✔ 보이스피싱 증분 동기화: {watermark.year}-{watermark.month:02d} 페이지부터 {len(objs)}건")
+
+    with dry_run_atomic(dry_run):
+        upsert_voice_phishing(objs, batch_size)
+        refresh_voice_yearly({o.year for o in objs})
+
+        if objs or watermark is None:
+            latest = max([(o.year, o.month) for o in objs] + (
+                [(watermark.year, watermark.month)] if watermark else []
+            ), default=(0, 0))
+            SyncWatermark.objects.update_or_create(
+                source=VOICE_SOURCE,
+                defaults={
+                    "year": latest[0],
+                    "month": latest[1],
+                    "row_count": upstream_total if upstream_total is not None else len(rows),
+                },
+            )
+
+    # DB 저장이 끝난 뒤에 남겨야 실패한 동기화가 "변경 없음"으로 건너뛰어지지 않는다
+    if digest is not None and not dry_run:
+        api_cache.save_sync_digest("voice_phishing", digest)
+
+    yearly = get_voice_phishing_yearly()
     return yearly
 
+def get_voice_phishing_yearly(years=None):
+    """연도별 보이스피싱 합계 {year: cases} (연도순, 데이터 없으면 빈 dict)"""
+    qs = VoicePhishingYearlyStat.objects.order_by("year")
+    if years is not None:
+        qs = qs.filter(year__in=years)
+    return dict(qs.values_list("year", "cases"))
+
 
 
 # =========================
@@ -0,0 +1,258 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from . import singleflight
+from .models import SyncJob
+
+
+# =========================
+# 1. 작업 종류별 실행 함수 (기존 sync 뷰가 하던 일 그대로)
+#    report(progress, message) 로 진행률을 남긴다
+# =========================
+def run_travel(report):
+    from .utils_csv_import import load_all_departure_data, save_yearly_to_db
+    from .utils_cube import cube_enabled, write_cube_from_csv
+
+    report(10, "출국 CSV 로드")
+    df, year_totals, crime_totals, crime_ratio, total_all_years = load_all_departure_data()
+
+    report(50, "TravelStat 저장")
+    saved = save_yearly_to_db(df)
+
+    if cube_enabled():
+        report(80, "출국 큐브 갱신")
+        write_cube_from_csv()
+
+    return {
+        "status": "ok",
+        "saved_rows": saved["rows"],
+        "inserted_rows": saved["inserted"],
+        "updated_rows": saved["updated"],
+        "rows_per_sec": saved["rows_per_sec"],
+        "total_rows": len(df),
+        "year_totals": year_totals.to_dict(),          # 연도별 출국자 합계
+        "crime_totals": crime_totals.to_dict(),        # 범죄국 연도별 합계
+        "crime_ratio": crime_ratio.to_dict(orient="records"),
+        "total_all_years": int(total_all_years),       # 전체 합계
+    }
+
+
+def run_cyber(report):
+    from .api_client import sync_cyber_scam
+
+    report(10, "사이버사기 API 수집/저장")
+    stats = sync_cyber_scam()
+    return {"status": "cyber_scam_sync_ok", "stats": stats}
+
+
+def run_voice(report):
+    from .api_client import sync_voice_phishing
+
+    report(10, "보이스피싱 API 수집/저장")
+    sync_voice_phishing()
+    return {"status": "voice_phishing_sync_ok"}
+
+
+def run_voice_yearly(report):
+    from .api_client import sync_voice_phishing
+
+    report(10, "보이스피싱 API 수집/저장")
+    yearly = sync_voice_phishing()
+
+    if not yearly:
+        return {"status": "no_voice_data"}
+
+    return {
+        "status": "ok",
+        "yearly_voice_stats": [
+            {"year": year, "voice_year_total": cases} for year, cases in yearly.items()
+        ],
+    }
+
+
+JOB_RUNNERS = {
+    "travel": run_travel,
+    "cyber": run_cyber,
+    "voice": run_voice,
+    "voice_yearly": run_voice_yearly,
+}
+
+# 작업 종류 → 쓰는 데이터 소스 (voice / voice_yearly 는 둘 다 sync_voice_phishing)
+# 같은 소스를 쓰는 작업은 같은 잠금을 잡아서 동시에 DB에 쓰지 않는다
+JOB_SOURCES = {
+    "travel": "travel",
+    "cyber": "cyber",
+    "voice": "voice",
+    "voice_yearly": "voice",
+}
+
+
+def sync_lock_name(kind):
+    """동기화 잠금 이름 (manage.py ingest 도 같은 이름을 잡는다)"""
+    return f"sync-{JOB_SOURCES[kind]}"
+
+
+# =========================
+# 2. 작업 등록 / 실행
+# =========================
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.SYNC_JOB_WORKERS,
+                    thread_name_prefix="sync-job",
+                )
+    return _executor
+
+
+def _stale_before():
+    return timezone.now() - timedelta(seconds=settings.SYNC_JOB_STALE_SECONDS)
+
+
+def active_job(kind):
+    """
+    같은 종류의 대기/실행 중 작업 (없으면 None).
+    SYNC_JOB_STALE_SECONDS 넘게 running 인 작업(started_at 기준)이나
+    그만큼 대기만 하고 있는 작업(created_at 기준)은 워커가 죽은 것으로 보고 무시한다.
+    """
+    stale_before = _stale_before()
+    return (
+        SyncJob.objects
+        .filter(kind=kind)
+        .filter(
+            Q(status=SyncJob.STATUS_QUEUED, created_at__gte=stale_before)
+            | Q(status=SyncJob.STATUS_RUNNING, started_at__gte=stale_before)
+        )
+        .order_by("created_at")
+        .first()
+    )
+
+
+def expire_stale_queued(kind):
+    """
+    오래 대기만 한 작업은 실패로 닫는다.
+    (스레드 모드에서 프로세스가 재시작되면 풀에 넣었던 작업이 사라져 queued 로 남는다.
+    새 작업으로 갈아탄 뒤 나중에 워커가 옛 작업까지 또 돌리지 않도록)
+    """
+    return SyncJob.objects.filter(
+        kind=kind, status=SyncJob.STATUS_QUEUED, created_at__lt=_stale_before(),
+    ).update(
+        status=SyncJob.STATUS_FAILED,
+        message="대기 시간 초과 (실행할 워커 없음)",
+        finished_at=timezone.now(),
+    )
+
+
+def enqueue(kind):
+    """
+    작업을 등록하고 (job, created) 반환.
+    같은 종류의 작업이 이미 대기/실행 중이면 새로 만들지 않고 그 작업을 돌려준다 (created=False).
+
+    settings.SYNC_JOB_MODE 에 따라
+      - "thread":  웹 프로세스 안의 스레드 풀에서 바로 실행
+      - "command": DB에만 넣고 `manage.py run_sync_jobs` 워커가 가져가서 실행
+      - "inline":  요청 안에서 바로 실행 (디버깅용)
+    """
+    if kind not in JOB_RUNNERS:
+        raise ValueError(f"알 수 없는 작업 종류: {kind}")
+
+    # 확인 → 생성 사이에 다른 워커 프로세스가 끼어들지 않도록 파일 잠금
+    with singleflight.file_lock(f"enqueue-{kind}"):
+        expire_stale_queued(kind)
+        job = active_job(kind)
+        if job is not None:
+            return job, False
+        job = SyncJob.objects.create(kind=kind)
+
+    mode = settings.SYNC_JOB_MODE
+    if mode == "inline":
+        run_job(job.pk)
+        job.refresh_from_db()
+    elif mode == "thread":
+        _get_executor().submit(_run_in_thread, job.pk)
+
+    return job, True
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        # 풀 스레드가 DB 커넥션을 계속 붙잡고 있지 않도록
+        connection.close()
+
+
+def claim(job_id):
+    """queued → running 으로 바꾼 워커만 실행 (여러 워커가 같은 작업을 잡지 않도록)"""
+    return SyncJob.objects.filter(pk=job_id, status=SyncJob.STATUS_QUEUED).update(
+        status=SyncJob.STATUS_RUNNING,
+        started_at=timezone.now(),
+        message="시작",
+    ) == 1
+
+
+def claim_next():
+    """가장 오래된 대기 작업 하나를 잡아서 id 반환 (없으면 None)"""
+    for job_id in (
+        SyncJob.objects.filter(status=SyncJob.STATUS_QUEUED)
+        .order_by("created_at")
+        .values_list("pk", flat=True)[:10]
+    ):
+        if claim(job_id):
+            return job_id
+    return None
+
+
+def _redact(text):
+    """요청 URL에 들어 있는 serviceKey가 작업 상태 API로 노출되지 않도록 가린다"""
+    if settings.API_KEY:
+        text = text.replace(settings.API_KEY, "***")
+    return text
+
+
+def run_job(job_id, claimed=False):
+    """작업 하나 실행. 결과/에러/소요시간을 SyncJob에 기록한다."""
+    if not claimed and not claim(job_id):
+        return None
+
+    job = SyncJob.objects.get(pk=job_id)
+
+    def report(progress, message=""):
+        SyncJob.objects.filter(pk=job_id).update(progress=progress, message=message[:200])
+
+    try:
+        # 워커가 여러 개여도 같은 종류의 동기화는 동시에 DB에 쓰지 않도록
+        with singleflight.file_lock(sync_lock_name(job.kind)):
+            result = JOB_RUNNERS[job.kind](report)
+    except Exception as e:
+        print(f"⚠ 동기화 작업 #{job_id} ({job.kind}) 실패 → {_redact(str(e))}")
+        SyncJob.objects.filter(pk=job_id).update(
+            status=SyncJob.STATUS_FAILED,
+            error=_redact(traceback.format_exc()),
+            message=_redact(str(e))[:200],
+            finished_at=timezone.now(),
+        )
+    else:
+        SyncJob.objects.filter(pk=job_id).update(
+            status=SyncJob.STATUS_SUCCEEDED,
+            progress=100,
+            message="완료",
+            result=result,
+            finished_at=timezone.now(),
+        )
+
+    return SyncJob.objects.get(pk=job_id)
@@ -0,0 +1,459 @@
+import io
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from main import response_cache, synthetic
+from main.models import TravelStat
+from main.api_client import (
+    parse_cyber_scam_rows,
+    parse_voice_phishing_rows,
+    refresh_voice_yearly,
+    upsert_cyber_scam,
+    upsert_voice_phishing,
+)
+from main.utils_csv import clean_num, load_regions, parse_departure_csv, save_to_db
+from main.utils_csv_import import compute_yearly_totals, load_and_aggregate_csv, save_yearly_to_db
+from main.utils_cube import write_cube
+from main.utils_series import load_series, save_series_frame, slice_range, yearly_totals
+
+# --suite csv-parse / series 가 늘려서 쓰는 실제 출국 CSV
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+SUITES = ("pipeline", "csv-parse", "series")
+
+# 분석 API 응답 캐시를 벤치마크 전용 메모리 캐시로
+BENCH_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "analysis": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark"},
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Timer:
+    """이름별 best-of-N 측정 결과를 모은다"""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, fn, repeat=None, setup=None, **info):
+        runs = []
+        result = None
+        for _ in range(repeat or self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                result = fn()
+            runs.append(time.perf_counter() - start)
+        self.results[name] = {
+            "best_s": round(min(runs), 6),
+            "median_s": round(sorted(runs)[len(runs) // 2], 6),
+            "runs": len(runs),
+            **info,
+        }
+        return result
+
+
+class Command(BaseCommand):
+    help = (
+        "성능 측정 (임시 테스트 DB / 임시 캐시 사용). "
+        "pipeline: 합성 데이터로 CSV 파싱, 연도별 집계, DB 저장, /analysis/* 응답 시간을 JSON으로 출력 / "
+        "csv-parse: main/data/*.csv 를 N배로 늘려서 기존 iterrows 파서와 벡터화 파서 비교 / "
+        "series: 월별 출국을 TravelStat 행과 DepartureSeries 배열로 저장해서 크기와 읽기 시간 비교"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suite", choices=SUITES, default="pipeline")
+        parser.add_argument("--repeat", type=int, help="반복 횟수 (기본 pipeline/csv-parse 3, series 5)")
+
+        # pipeline
+        parser.add_argument("--countries", type=int, default=60, help="지역당 국가 수")
+        parser.add_argument("--years", type=int, default=20)
+        parser.add_argument("--regions", type=int, default=5, choices=range(1, len(synthetic.REGIONS) + 1))
+        parser.add_argument("--start-year", type=int, default=2004)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="결과 JSON 파일 (없으면 stdout)")
+
+        # csv-parse / series
+        parser.add_argument("--scale", type=int,
+                            help="CSV 데이터 행을 N배로 늘려서 측정 (기본 csv-parse 100, series 1)")
+        parser.add_argument("--skip-legacy", action="store_true",
+                            help="csv-parse: 기존 파서 측정 생략 (큰 scale에서 느림)")
+        parser.add_argument("--memory", action="store_true",
+                            help="csv-parse: 연도별 집계의 최대 메모리 비교 (전체 로드 vs 스트리밍)")
+        parser.add_argument("--country", default="중국", help="series: 월별 조회할 국가")
+
+    def handle(self, *args, **opts):
+        suite = opts["suite"]
+        if opts["repeat"] is None:
+            opts["repeat"] = 5 if suite == "series" else 3
+        if opts["scale"] is None:
+            opts["scale"] = 100 if suite == "csv-parse" else 1
+
+        if suite == "csv-parse":
+            self.handle_csv_parse(opts)
+        elif suite == "series":
+            with tempfile.TemporaryDirectory() as tmp, override_settings(
+                CACHES=BENCH_CACHES, SINGLEFLIGHT_LOCK_DIR=Path(tmp) / "locks",
+            ):
+                self.handle_series(opts)
+        else:
+            self.handle_pipeline(opts)
+
+    # -----------------------------
+    # ✔ pipeline (합성 데이터, JSON)
+    # -----------------------------
+    def handle_pipeline(self, opts):
+        timer = Timer(opts["repeat"])
+        params = {k: opts[k] for k in ("countries", "years", "regions", "start_year", "repeat", "seed")}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            files = synthetic.write_departure_csvs(
+                tmp / "csv", opts["regions"], opts["countries"],
+                opts["start_year"], opts["years"], opts["seed"],
+            )
+            csv_settings = {f"{region.upper()}_CSV": files.get(region) for region in synthetic.REGIONS}
+
+            with override_settings(
+                **csv_settings,
+                CACHES=BENCH_CACHES,
+                DEPARTURE_CACHE_ENABLED=False,
+                DEPARTURE_LOAD_WORKERS=1,
+                DEPARTURE_CUBE_DIR=tmp / "cube",
+                SINGLEFLIGHT_LOCK_DIR=tmp / "locks",
+            ):
+                setup_test_environment()
+                old_config = setup_databases(verbosity=0, interactive=False)
+                try:
+                    self.run_all(timer, files, opts)
+                finally:
+                    teardown_databases(old_config, verbosity=0)
+                    teardown_test_environment()
+
+        report = {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "params": params,
+            "results": timer.results,
+        }
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if opts["output"]:
+            Path(opts["output"]).write_text(text + "\n", encoding="utf-8")
+            self.stdout.write(f"결과 저장: {opts['output']}")
+        else:
+            self.stdout.write(text)
+
+    def run_all(self, timer, files, opts):
+        start_year, years = opts["start_year"], opts["years"]
+
+        # ---- CSV 파싱 / 집계
+        monthly = timer.run(
+            "csv.parse_monthly",
+            lambda: pd.concat([df for _, df in load_regions(files, parse_departure_csv)], ignore_index=True),
+        )
+        yearly = timer.run(
+            "csv.aggregate_yearly_streaming",
+            lambda: pd.concat([df for _, df in load_regions(files, load_and_aggregate_csv)], ignore_index=True),
+        )
+        timer.run("analysis.compute_yearly_totals", lambda: compute_yearly_totals(yearly), rows=len(yearly))
+        timer.results["csv.parse_monthly"]["rows"] = len(monthly)
+
+        # ---- DB 저장 (첫 실행 = INSERT, 이후 = 변경 없음 → 건너뜀)
+        timer.run("db.save_yearly.insert", lambda: save_yearly_to_db(yearly), repeat=1, rows=len(yearly))
+        timer.run("db.save_yearly.unchanged", lambda: save_yearly_to_db(yearly), rows=len(yearly))
+        timer.run("db.save_monthly.insert", lambda: save_to_db(monthly), repeat=1, rows=len(monthly))
+        timer.run("db.save_monthly.unchanged", lambda: save_to_db(monthly), rows=len(monthly))
+        timer.run("db.save_series", lambda: save_series_frame(monthly), repeat=1, rows=len(monthly))
+
+        cyber = parse_cyber_scam_rows(synthetic.cyber_scam_rows(start_year, years, opts["seed"]))
+        timer.run("db.upsert_cyber_scam", lambda: upsert_cyber_scam(cyber), repeat=1, rows=len(cyber))
+
+        voice = parse_voice_phishing_rows(synthetic.voice_phishing_rows(start_year, years, opts["seed"]))
+
+        def save_voice():
+            upsert_voice_phishing(voice)
+            refresh_voice_yearly({o.year for o in voice})
+
+        timer.run("db.upsert_voice_phishing", save_voice, repeat=1, rows=len(voice))
+
+        timer.run("cube.write", lambda: write_cube(monthly), rows=len(monthly))
+
+        # ---- /analysis/* (test client, 응답 캐시 비우고 / 채운 상태)
+        client = Client()
+        clear = response_cache._cache().clear
+
+        def get(url, params=None):
+            res = client.get(url, params or {})
+            assert res.status_code == 200, f"{url} → {res.status_code}"
+            return res
+
+        views = [
+            ("view.analysis_data", "/analysis/data/", None),
+            ("view.analysis_step3", "/analysis/step3/", None),
+            ("view.analysis_ratio", "/analysis/ratio/",
+             {"countries": ",".join(f"asia국가{i:03d}" for i in range(5)),
+              "from": start_year, "to": start_year + years - 1}),
+        ]
+        for name, url, params in views:
+            timer.run(f"{name}.cold", lambda: get(url, params), setup=clear)
+            timer.run(f"{name}.warm", lambda: get(url, params))
+
+    # -----------------------------
+    # ✔ csv-parse (실제 CSV × scale, iterrows 파서와 비교)
+    # -----------------------------
+    def handle_csv_parse(self, opts):
+        scale, repeat = opts["scale"], opts["repeat"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for src in sorted(DATA_DIR.glob("*.csv")):
+                dst = Path(tmp) / src.name
+                scale_csv(src, dst, scale)
+                region = src.stem.lower()
+
+                new_t, new_df = best_of(lambda: parse_departure_csv(dst, region), repeat)
+                line = f"{src.name:<12} x{scale}  rows={len(new_df):>9,}  vectorized={new_t:8.3f}s"
+
+                if not opts["skip_legacy"]:
+                    old_t, old_df = best_of(lambda: legacy_parse(dst, region), 1)
+                    pd.testing.assert_frame_equal(old_df, new_df)
+                    line += f"  legacy={old_t:8.3f}s  speedup={old_t / new_t:6.1f}x"
+
+                if opts["memory"]:
+                    full_mb = peak_memory(lambda: full_aggregate(dst, region))
+                    stream_mb = peak_memory(lambda: load_and_aggregate_csv(dst, region))
+                    line += f"  peak full={full_mb:7.1f}MB  stream={stream_mb:7.1f}MB"
+
+                self.stdout.write(line)
+
+    # -----------------------------
+    # ✔ series (TravelStat 월별 행 vs DepartureSeries)
+    # -----------------------------
+    def handle_series(self, opts):
+        scale, repeat, country = opts["scale"], opts["repeat"], opts["country"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            frames = []
+            for src in sorted(DATA_DIR.glob("*.csv")):
+                dst = Path(tmp) / src.name
+                scale_csv(src, dst, scale)
+                frames.append(quiet(lambda: parse_departure_csv(dst, src.stem.lower())))
+            df = pd.concat(frames, ignore_index=True)
+
+        start_year, end_year = int(df["year"].min()), int(df["year"].max())
+        self.stdout.write(
+            f"월별 데이터 {len(df):,}행 ({df['country'].nunique()}개 국가, {start_year}~{end_year})"
+        )
+
+        # 실제 db.sqlite3 는 건드리지 않도록 테스트 DB를 만들어서 측정
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            before = db_bytes()
+            quiet(lambda: save_to_db(df))
+            rows_size = db_bytes() - before
+
+            before = db_bytes()
+            quiet(lambda: save_series_frame(df))
+            series_size = db_bytes() - before
+
+            self.stdout.write(
+                f"저장 크기  rows={rows_size / 1024:10.1f}KB  "
+                f"series={series_size / 1024:10.1f}KB  "
+                f"({rows_size / max(series_size, 1):.1f}x)"
+            )
+
+            rows_t, rows_out = best_of(lambda: rows_yearly(start_year, end_year), repeat)
+            series_t, series_out = best_of(lambda: series_yearly(start_year, end_year), repeat)
+            assert rows_out.keys() == series_out.keys()
+            assert all(np.array_equal(rows_out[k], series_out[k]) for k in rows_out)
+            self.stdout.write(
+                f"전 국가 연도별 합계  rows={rows_t * 1000:8.2f}ms  "
+                f"series={series_t * 1000:8.2f}ms  ({rows_t / series_t:.1f}x)"
+            )
+
+            start, end = (end_year - 4, 1), (end_year, 12)
+            rows_t, _ = best_of(lambda: rows_country(country, start, end), repeat)
+            series_t, _ = best_of(lambda: series_country(country, start, end), repeat)
+            self.stdout.write(
+                f"{country} 최근 5년 월별  rows={rows_t * 1000:8.2f}ms  "
+                f"series={series_t * 1000:8.2f}ms  ({rows_t / series_t:.1f}x)"
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+
+# =========================
+# csv-parse / series 보조 함수
+# =========================
+def quiet(fn):
+    with redirect_stdout(io.StringIO()):
+        return fn()
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def scale_csv(src, dst, factor):
+    """
+    데이터 행(3행~)을 factor 번 반복해서 이어 붙인 CSV를 만든다.
+    반복할 때마다 연도를 원본 기간만큼 밀어서 연도가 겹치지 않게 한다.
+    """
+    lines = Path(src).read_text(encoding="utf-8-sig").splitlines()
+    header, body = lines[:3], lines[3:]
+
+    years = [int(l.split(",", 1)[0][:-1]) for l in body if l.split(",", 1)[0].endswith("년")]
+    span = max(years) - min(years) + 1
+
+    out = list(header)
+    for k in range(factor):
+        for line in body:
+            first, sep, rest = line.partition(",")
+            if first.endswith("년"):
+                first = f"{int(first[:-1]) + k * span}년"
+            out.append(first + sep + rest)
+    Path(dst).write_text("\n".join(out) + "\n", encoding="utf-8-sig")
+
+
+def legacy_parse(path, region_name):
+    """벡터화 이전의 iterrows + 셀 단위 clean_num 구현 (비교 기준용)."""
+    df = pd.read_csv(path, header=None, encoding="utf-8-sig", low_memory=False)
+    header_country = df.iloc[1]
+    header_type = df.iloc[2]
+
+    country_cols = []
+    for col in range(3, df.shape[1]):
+        if str(header_type[col]).strip() != "명수":
+            continue
+        name = str(header_country[col]).strip()
+        if name.lower() == "nan" or name == "":
+            continue
+        country_cols.append((col, name))
+
+    output_rows = []
+    current_year = None
+    for _, row in df.iloc[3:].iterrows():
+        year_cell = str(row.iloc[0]).strip()
+        month_cell = str(row.iloc[1]).strip()
+        if year_cell.endswith("년"):
+            digits = "".join([c for c in year_cell if c.isdigit()])
+            if digits:
+                current_year = int(digits)
+            continue
+        if current_year is None or not month_cell.endswith("월"):
+            continue
+        month_digits = "".join([c for c in month_cell if c.isdigit()])
+        if not month_digits:
+            continue
+        for col, name in country_cols:
+            output_rows.append({
+                "year": current_year,
+                "month": int(month_digits),
+                "country": name,
+                "region": region_name,
+                "departures": clean_num(row.iloc[col]),
+            })
+    return pd.DataFrame(output_rows)
+
+
+def peak_memory(fn):
+    """fn 실행 중 tracemalloc 기준 최대 할당량 (MB)"""
+    tracemalloc.start()
+    try:
+        with redirect_stdout(io.StringIO()):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def full_aggregate(path, region):
+    """스트리밍 이전 방식: 월 단위 전체 표를 만든 뒤 연도별 합계"""
+    return (
+        parse_departure_csv(path, region)
+        .groupby(["year", "country", "region"])["departures"]
+        .sum()
+        .reset_index()
+    )
+
+
+def db_bytes():
+    """SQLite 전체 페이지 수 × 페이지 크기"""
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA page_count")
+        pages = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_size")
+        return pages * cursor.fetchone()[0]
+
+
+def rows_yearly(start_year, end_year):
+    """TravelStat 월별 행 → {(region, country): 연도별 합계 배열}"""
+    rows = TravelStat.objects.filter(
+        month__range=(1, 12), year__range=(start_year, end_year)
+    ).values_list("region", "country", "year", "departures")
+    df = pd.DataFrame(list(rows), columns=["region", "country", "year", "departures"])
+    out = {}
+    for key, group in df.groupby(["region", "country"], sort=False):
+        totals = np.zeros(end_year - start_year + 1, dtype="int64")
+        np.add.at(totals, group["year"].to_numpy() - start_year, group["departures"].to_numpy())
+        out[key] = totals
+    return out
+
+
+def series_yearly(start_year, end_year):
+    """DepartureSeries → {(region, country): 연도별 합계 배열}"""
+    return {key: yearly_totals(s, start_year, end_year) for key, s in load_series().items()}
+
+
+def rows_country(country, start, end):
+    return np.array(
+        TravelStat.objects.filter(country=country, month__range=(1, 12))
+        .filter(year__gte=start[0], year__lte=end[0])
+        .order_by("year", "month")
+        .values_list("departures", flat=True),
+        dtype="int32",
+    )
+
+
+def series_country(country, start, end):
+    return [slice_range(s, start, end)[0] for s in load_series(country=country).values()]
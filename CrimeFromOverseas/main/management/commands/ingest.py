@@ -0,0 +1,238 @@
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main import metrics, singleflight
+from main import utils_api_cache as api_cache
+from main.api_client import sync_cyber_scam, sync_voice_phishing
+from main.jobs import sync_lock_name
+from main.models import TravelStat
+from main.utils_csv import departure_csv_files, stream_csv_to_db
+from main.utils_csv_import import departure_data_key, load_all_departure_data, save_yearly_to_db
+from main.utils_cube import cube_enabled, write_cube_from_csv
+from main.utils_db import dry_run_atomic, merge_upsert_stats
+
+# 출국 CSV 지문을 남겨 두는 이름 (API 응답 해시와 같은 sync_digests.json 에 저장)
+DEPARTURES_SOURCE = "departures"
+
+
+def departure_sources(monthly):
+    """--incremental 이 비교할 지문 이름들 (월별 저장은 저장 방식마다 따로 남김)"""
+    if not monthly:
+        return [DEPARTURES_SOURCE]
+    return [DEPARTURES_SOURCE, f"{DEPARTURES_SOURCE}:monthly:{settings.DEPARTURE_MONTHLY_STORAGE}"]
+
+# /sync/* 작업(jobs.run_job)과 같은 잠금 → 웹에서 건 동기화와 동시에 DB에 쓰지 않음
+LOCK_KINDS = {"departures": "travel", "cyber": "cyber", "voice": "voice"}
+
+# --profile 때 보여 줄 함수 수 (누적 시간 순)
+PROFILE_LIMIT = 25
+
+
+class Command(BaseCommand):
+    help = (
+        "HTTP 요청 없이 데이터 수집/저장 (출국 CSV / 사이버사기 API / 보이스피싱 API). "
+        "/sync/* 작업과 같은 파이프라인 함수를 쓰고, 끝나면 처리량을 출력"
+    )
+
+    def add_arguments(self, parser):
+        sources = parser.add_subparsers(dest="source", required=True, metavar="{departures,cyber,voice}")
+        for name, help_text in (
+            ("departures", "출국 CSV → TravelStat 연도 합계 + 요약 테이블 + 출국 큐브"),
+            ("cyber", "사이버사기 API → CyberScamStat"),
+            ("voice", "보이스피싱 API → VoicePhishingStat + 연도별 합계"),
+        ):
+            sub = sources.add_parser(name, help=help_text)
+            sub.add_argument("--workers", type=int,
+                             help="departures: CSV 파싱 프로세스 수 / cyber·voice: 동시 페이지 요청 수")
+            sub.add_argument("--batch-size", type=int, help="bulk upsert 한 번에 넣을 행 수")
+            sub.add_argument("--incremental", action="store_true",
+                             help="바뀐 것만: CSV 지문/API 응답이 지난번과 같으면 건너뜀, voice는 워터마크 이후만")
+            sub.add_argument("--dry-run", action="store_true",
+                             help="저장할 내용만 계산하고 DB 변경은 되돌림 (큐브/지문/CSV 캐시도 쓰지 않음)")
+            sub.add_argument("--profile", action="store_true", help="cProfile 결과(누적 시간 상위) 출력")
+            if name == "departures":
+                sub.add_argument("--monthly", action="store_true",
+                                 help="월별 출국도 저장 (settings.DEPARTURE_MONTHLY_STORAGE: rows / series / both)")
+
+    def handle(self, *args, **opts):
+        source = opts["source"]
+        if opts["workers"] is not None and opts["workers"] < 1:
+            raise CommandError("--workers 는 1 이상")
+        if opts["batch_size"] is not None and opts["batch_size"] < 1:
+            raise CommandError("--batch-size 는 1 이상")
+
+        # 처리량 리포트는 메트릭 레지스트리의 전후 차이로 계산
+        if not metrics.metrics_enabled():
+            self.stdout.write("⚠ METRICS_ENABLED=0 → 파싱/저장 행 수 리포트 없이 실행")
+
+        mode = "dry-run" if opts["dry_run"] else ("증분" if opts["incremental"] else "전체")
+        self.stdout.write(f"▶ ingest {source} ({mode})")
+
+        profiler = cProfile.Profile() if opts["profile"] else None
+        with singleflight.file_lock(sync_lock_name(LOCK_KINDS[source])):
+            before = metrics.snapshot()
+            start = time.perf_counter()
+            if profiler is not None:
+                profiler.enable()
+            try:
+                result = getattr(self, f"ingest_{source}")(opts)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            elapsed = time.perf_counter() - start
+            after = metrics.snapshot()
+
+        self.report(result, before, after, elapsed, opts["dry_run"])
+        if profiler is not None:
+            self.print_profile(profiler)
+
+    # -----------------------------
+    # ✔ 진행 표시
+    # -----------------------------
+    @contextmanager
+    def stage(self, step, total, message):
+        self.stdout.write(f"[{step}/{total}] {message} ...")
+        start = time.perf_counter()
+        yield
+        self.stdout.write(f"      → {time.perf_counter() - start:.2f}s")
+
+    # -----------------------------
+    # ✔ 소스별 수집 (jobs.run_travel / run_cyber / run_voice_yearly 와 같은 함수)
+    # -----------------------------
+    def ingest_departures(self, opts):
+        key = departure_data_key(departure_csv_files())
+        sources = departure_sources(opts["monthly"])
+        if (
+            opts["incremental"]
+            and all(api_cache.load_sync_digest(source) == key for source in sources)
+            and TravelStat.objects.filter(month=0).exists()
+        ):
+            self.stdout.write("✔ 출국 CSV가 지난 ingest와 같음 → 건너뜀")
+            return {"status": "unchanged"}
+
+        steps = 4 if opts["monthly"] else 3
+        with self.stage(1, steps, "출국 CSV 로드/연도별 집계"):
+            loaded = load_all_departure_data(opts["workers"], write_cache=not opts["dry_run"])
+        if loaded is None:
+            raise CommandError("읽을 수 있는 출국 CSV가 없습니다 (settings.*_CSV 확인)")
+        df = loaded[0]
+
+        with self.stage(2, steps, "TravelStat 연도 합계 + 요약 테이블 저장"):
+            with dry_run_atomic(opts["dry_run"]):
+                stats = save_yearly_to_db(df, opts["batch_size"])
+
+        if opts["dry_run"] or not cube_enabled():
+            self.stdout.write(f"[3/{steps}] 출국 큐브 갱신 생략")
+        else:
+            with self.stage(3, steps, "출국 큐브 갱신"):
+                write_cube_from_csv(opts["workers"])
+
+        if opts["monthly"]:
+            storage = settings.DEPARTURE_MONTHLY_STORAGE
+            with self.stage(4, steps, f"월별 출국 저장 ({storage}, CSV 청크 스트리밍)"):
+                with dry_run_atomic(opts["dry_run"]):
+                    stats["monthly"] = self.stream_monthly(opts["batch_size"])
+
+        if not opts["dry_run"]:
+            for source in sources:
+                api_cache.save_sync_digest(source, key)
+        return {"status": "ok", "stats": stats}
+
+    def stream_monthly(self, batch_size):
+        """지역 CSV를 하나씩 청크 단위로 읽으면서 바로 저장 (월 단위 전체 표를 메모리에 만들지 않음)"""
+        total = None
+        for region, path in departure_csv_files().items():
+            if not path or not Path(path).exists():
+                self.stdout.write(f"      ⚠ {region} CSV 없음 → 건너뜀")
+                continue
+            stats = stream_csv_to_db(path, region, batch_size=batch_size)
+            if stats is not None:
+                total = merge_upsert_stats(total, stats)
+        return total
+
+    def ingest_cyber(self, opts):
+        with self.stage(1, 1, "사이버사기 API 수집/저장"):
+            stats = sync_cyber_scam(
+                force=not opts["incremental"], dry_run=opts["dry_run"],
+                workers=opts["workers"], batch_size=opts["batch_size"],
+            )
+        status = "unchanged" if stats.get("payload_unchanged") else "ok"
+        return {"status": status, "stats": stats}
+
+    def ingest_voice(self, opts):
+        with self.stage(1, 1, "보이스피싱 API 수집/저장 + 연도별 합계"):
+            yearly = sync_voice_phishing(
+                full=not opts["incremental"], dry_run=opts["dry_run"],
+                workers=opts["workers"], batch_size=opts["batch_size"],
+            )
+        return {"status": "ok", "years": len(yearly)}
+
+    # -----------------------------
+    # ✔ 처리량 리포트
+    # -----------------------------
+    def report(self, result, before, after, elapsed, dry_run):
+        def delta(name):
+            old = before.get(name, {})
+            out = {}
+            for key, value in after.get(name, {}).items():
+                prev = old.get(key)
+                if isinstance(value, tuple):
+                    prev = prev or (0, 0.0)
+                    value = (value[0] - prev[0], value[1] - prev[1])
+                    if value[0]:
+                        out[key] = value
+                elif value - (prev or 0):
+                    out[key] = value - (prev or 0)
+            return out
+
+        parsed = delta(metrics.ROWS_PARSED.name)
+        upserted = delta(metrics.ROWS_UPSERTED.name)
+        skipped = delta(metrics.ROWS_SKIPPED.name)
+        stages = delta(metrics.STAGE_SECONDS.name)
+        http = delta(metrics.UPSTREAM_SECONDS.name)
+        cache_hits = delta(metrics.UPSTREAM_CACHE_HITS.name)
+
+        n_parsed = sum(parsed.values())
+        n_written = sum(upserted.values())
+
+        self.stdout.write("")
+        self.stdout.write(f"■ 결과: {result['status']}" + (" (dry-run: DB 변경 되돌림)" if dry_run else ""))
+        for (source,), n in sorted(parsed.items()):
+            self.stdout.write(f"  파싱      {source:<24} {n:>10,}행")
+
+        models = sorted({model for model, _ in upserted} | {model for model, in skipped})
+        for model in models:
+            inserted = upserted.get((model, "insert"), 0)
+            updated = upserted.get((model, "update"), 0)
+            self.stdout.write(
+                f"  저장      {model:<24} "
+                f"insert {inserted:,} / update {updated:,} / skip {skipped.get((model,), 0):,}"
+            )
+
+        if http or cache_hits:
+            requests, seconds = map(sum, zip(*http.values())) if http else (0, 0.0)
+            self.stdout.write(
+                f"  HTTP      요청 {requests:,}회 ({seconds:.2f}s), 캐시 히트 {sum(cache_hits.values()):,}회"
+            )
+        for (stage,), (count, seconds) in sorted(stages.items()):
+            self.stdout.write(f"  단계      {stage:<24} {seconds:>9.2f}s" + (f" ({count}회)" if count > 1 else ""))
+
+        self.stdout.write(
+            f"  전체      {elapsed:.2f}s, "
+            f"파싱 {n_parsed / elapsed if elapsed > 0 else 0:,.0f}행/s, "
+            f"저장 {n_written / elapsed if elapsed > 0 else 0:,.0f}행/s"
+        )
+
+    def print_profile(self, profiler):
+        buf = io.StringIO()
+        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(PROFILE_LIMIT)
+        self.stdout.write("")
+        self.stdout.write(f"■ 프로파일 (누적 시간 상위 {PROFILE_LIMIT})")
+        self.stdout.write(buf.getvalue())
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import jobs
+
+
+class Command(BaseCommand):
+    help = "SYNC_JOB_MODE=command 일 때 대기 중인 동기화 작업(SyncJob)을 가져가서 실행하는 워커"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="대기 작업을 모두 처리하면 종료")
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="대기 작업이 없을 때 다시 확인할 간격(초)")
+
+    def handle(self, *args, **opts):
+        self.stdout.write("동기화 작업 워커 시작")
+
+        while True:
+            job_id = jobs.claim_next()
+
+            if job_id is None:
+                if opts["once"]:
+                    break
+                time.sleep(opts["poll_interval"])
+                continue
+
+            job = jobs.run_job(job_id, claimed=True)
+            self.stdout.write(
+                f"#{job.pk} {job.kind} → {job.status} ({job.duration_seconds}s)"
+            )
@@ -0,0 +1,272 @@
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+
+# =========================
+# 수집/동기화 파이프라인 메트릭 (Prometheus text format, /metrics)
+#   - Counter: 파싱/저장/건너뛴 행 수
+#   - Histogram: 단계별 소요시간, 업스트림 HTTP 지연시간
+#   - Gauge: 모델별 행 수 (스크레이프할 때 DB에서 COUNT)
+#   - METRICS_ENABLED=0 이면 inc/observe 는 설정값 하나만 보고 바로 반환
+#   - 값은 프로세스 메모리에만 있다 (run_sync_jobs 워커처럼 따로 도는 프로세스 값은 그 프로세스 것)
+# =========================
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 초 단위 기본 버킷 (CSV 로드 / 전체 동기화는 수십 초까지)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def metrics_enabled():
+    return getattr(settings, "METRICS_ENABLED", True)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            if name in _registry:
+                raise ValueError(f"메트릭 이름 중복: {name}")
+            _registry[name] = self
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: 라벨은 {self.labelnames} 이어야 합니다 (받은 값: {sorted(labels)})")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        """지금까지 누적된 값 {라벨 값 튜플: 값} (전후 차이 계산용)"""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        """[(이름 접미사, 라벨 값 튜플, 추가 라벨, 값)]"""
+        with self._lock:
+            return [("", key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, key, extra, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not metrics_enabled() or amount == 0:
+            return
+        if amount < 0:
+            raise ValueError(f"{self.name}: counter는 줄일 수 없습니다")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    set()으로 직접 넣거나, collect 함수(→ {라벨 값 튜플: 값})를 주면 스크레이프할 때마다 다시 계산
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def set(self, value, **labels):
+        if not metrics_enabled():
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.collect is not None:
+            values = {tuple(str(v) for v in key): value for key, value in self.collect().items()}
+            with self._lock:
+                self._values = values
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        if not metrics_enabled():
+            return
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록 소요시간(초) 기록"""
+        if not metrics_enabled():
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """{라벨 값 튜플: (관측 수, 합계)}"""
+        with self._lock:
+            return {key: (state["count"], state["sum"]) for key, state in self._values.items()}
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state["count"] if state else 0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, state["counts"]):
+                    cumulative += n
+                    out.append(("_bucket", key, (("le", _format_value(bound)),), cumulative))
+                out.append(("_sum", key, (), state["sum"]))
+                out.append(("_count", key, (), state["count"]))
+        return out
+
+
+# -----------------------------
+# ✔ 파이프라인 메트릭
+# -----------------------------
+def _model_row_counts():
+    from .models import (
+        CountryYearDeparture, CyberScamStat, DepartureSeries, TravelStat, VoicePhishingStat,
+        VoicePhishingYearlyStat, YearlyDepartureTotal,
+    )
+    models = (
+        TravelStat, DepartureSeries, YearlyDepartureTotal, CountryYearDeparture,
+        CyberScamStat, VoicePhishingStat, VoicePhishingYearlyStat,
+    )
+    return {(model.__name__,): model.objects.count() for model in models}
+
+
+ROWS_PARSED = Counter(
+    "ingest_rows_parsed_total", "원본(API 응답 / 출국 CSV)에서 파싱한 행 수", ["source"],
+)
+ROWS_UPSERTED = Counter(
+    "ingest_rows_upserted_total", "bulk_upsert 로 실제로 쓴 행 수", ["model", "op"],
+)
+ROWS_SKIPPED = Counter(
+    "ingest_rows_skipped_total", "DB 값과 같아서 쓰지 않고 건너뛴 행 수", ["model"],
+)
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds", "동기화/수집 단계별 소요시간", ["stage"],
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_http_request_duration_seconds", "업스트림 API HTTP 요청 지연시간 (재시도 포함)",
+    ["endpoint", "status"],
+)
+UPSTREAM_CACHE_HITS = Counter(
+    "upstream_http_cache_hits_total", "디스크 캐시 TTL 안이라 HTTP 요청 없이 쓴 페이지 수", ["endpoint"],
+)
+MODEL_ROWS = Gauge(
+    "db_model_rows", "모델별 DB 행 수", ["model"], collect=_model_row_counts,
+)
+
+
+def timed(stage):
+    """함수 전체를 STAGE_SECONDS{stage=...} 로 측정하는 데코레이터"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def endpoint_label(url):
+    """라벨 값은 경로만 (쿼리스트링 / serviceKey 가 섞이지 않도록)"""
+    return urlparse(url).path or url
+
+
+def render():
+    """등록된 전체 메트릭 → Prometheus text format"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Counter / Histogram 누적 값 {이름: metric.snapshot()} (gauge는 DB를 읽으므로 제외)"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {m.name: m.snapshot() for m in metrics if isinstance(m, (Counter, Histogram))}
+
+
+def reset():
+    """테스트용: 누적 값 전부 비우기"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        metric.reset()
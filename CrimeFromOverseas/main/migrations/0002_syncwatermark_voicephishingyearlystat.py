@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:22
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_voice_yearly(apps, schema_editor):
+    """이미 저장된 월별 보이스피싱 데이터로 연도별 합계 테이블 채우기"""
+    VoicePhishingStat = apps.get_model("main", "VoicePhishingStat")
+    VoicePhishingYearlyStat = apps.get_model("main", "VoicePhishingYearlyStat")
+
+    sums = VoicePhishingStat.objects.values("year").annotate(total=Sum("cases"))
+    VoicePhishingYearlyStat.objects.bulk_create(
+        VoicePhishingYearlyStat(year=r["year"], cases=r["total"]) for r in sums
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('row_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoicePhishingYearlyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(unique=True)),
+                ('cases', models.IntegerField()),
+            ],
+            options={
+                'ordering': ['year'],
+            },
+        ),
+        migrations.RunPython(fill_voice_yearly, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_syncjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cyberscamstat',
+            name='total_cases',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('direct_trade'), '+', models.F('shopping_mall')), '+', models.F('game')), '+', models.F('email_trade')), '+', models.F('romance')), '+', models.F('investment')), '+', models.F('etc')), output_field=models.IntegerField()),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+# main.utils_csv_import.CRIME_COUNTRIES (마이그레이션 시점 값으로 고정)
+CRIME_COUNTRIES = ["중국", "인도", "캄보디아", "이스라엘", "몰디브", "미얀마", "필리핀"]
+
+
+def fill_departure_summaries(apps, schema_editor):
+    """이미 저장된 TravelStat 연도 합계 행(month=0)으로 요약 테이블 채우기"""
+    TravelStat = apps.get_model("main", "TravelStat")
+    YearlyDepartureTotal = apps.get_model("main", "YearlyDepartureTotal")
+    CountryYearDeparture = apps.get_model("main", "CountryYearDeparture")
+
+    yearly_rows = TravelStat.objects.filter(month=0)
+
+    CountryYearDeparture.objects.bulk_create(
+        CountryYearDeparture(country=r["country"], year=r["year"], departures=r["total"])
+        for r in yearly_rows.values("country", "year").annotate(total=Sum("departures"))
+    )
+    YearlyDepartureTotal.objects.bulk_create(
+        YearlyDepartureTotal(year=r["year"], departures=r["total"], crime_departures=r["crime"] or 0)
+        for r in yearly_rows.values("year").annotate(
+            total=Sum("departures"),
+            crime=Sum("departures", filter=Q(country__in=CRIME_COUNTRIES)),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_cyberscamstat_total_cases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountryYearDeparture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.CharField(max_length=100)),
+                ('year', models.IntegerField()),
+                ('departures', models.BigIntegerField()),
+            ],
+            options={
+                'ordering': ['year', 'country'],
+                'unique_together': {('country', 'year')},
+            },
+        ),
+        migrations.CreateModel(
+            name='YearlyDepartureTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(unique=True)),
+                ('departures', models.BigIntegerField()),
+                ('crime_departures', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['year'],
+            },
+        ),
+        migrations.RunPython(fill_departure_summaries, migrations.RunPython.noop),
+    ]
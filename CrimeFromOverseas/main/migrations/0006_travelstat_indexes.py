@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_departure_summaries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='travelstat',
+            name='month',
+            field=models.IntegerField(help_text='1~12, 연도별 합계는 0'),
+        ),
+        migrations.AddIndex(
+            model_name='travelstat',
+            index=models.Index(fields=['year', 'month'], name='travelstat_year_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelstat',
+            index=models.Index(fields=['country', 'year', 'month'], name='travelstat_country_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelstat',
+            index=models.Index(fields=['region', 'year', 'month'], name='travelstat_region_year_idx'),
+        ),
+    ]
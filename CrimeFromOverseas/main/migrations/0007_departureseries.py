@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_travelstat_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartureSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=50)),
+                ('country', models.CharField(max_length=100)),
+                ('base_year', models.IntegerField()),
+                ('base_month', models.IntegerField()),
+                ('length', models.IntegerField(help_text='저장된 개월 수')),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'ordering': ['region', 'country'],
+                'unique_together': {('region', 'country')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# 예전 연도별 집계(groupby 후 region 문자열 합산)가 region에 "asiaasiaasia…"를 남겼다.
+# 그 뒤 파서는 지역 키("asia")를 그대로 쓰므로, 다음 동기화 때 같은 연도/국가 행이 둘이 된다.
+REGIONS = ["asia", "europe", "africa", "america", "oceania"]
+
+
+def base_region(name):
+    """"asiaasiaasia" → "asia" (알려진 지역 키가 반복된 문자열만, 아니면 그대로)"""
+    for region in REGIONS:
+        n, rest = divmod(len(name), len(region))
+        if n > 1 and rest == 0 and name == region * n:
+            return region
+    return name
+
+
+def normalize_regions(apps, schema_editor):
+    TravelStat = apps.get_model("main", "TravelStat")
+
+    for region in list(TravelStat.objects.order_by().values_list("region", flat=True).distinct()):
+        target = base_region(region)
+        if target == region:
+            continue
+
+        legacy = TravelStat.objects.filter(region=region)
+        # 이미 정상 키로 저장된 행이 있으면 그쪽(새 파서 결과)을 남긴다
+        taken = set(
+            TravelStat.objects.filter(region=target).values_list("country", "year", "month")
+        )
+        duplicates = [
+            pk for pk, *key in legacy.values_list("pk", "country", "year", "month")
+            if tuple(key) in taken
+        ]
+        if duplicates:
+            TravelStat.objects.filter(pk__in=duplicates).delete()
+        moved = legacy.update(region=target)
+        print(f"  {region[:20]}… → {target}: {moved}건 이동, 중복 {len(duplicates)}건 삭제")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_departureseries'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_regions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Q, Sum
+
+# main.utils_csv_import.CRIME_COUNTRIES (마이그레이션 시점 값으로 고정)
+CRIME_COUNTRIES = ["중국", "인도", "캄보디아", "이스라엘", "몰디브", "미얀마", "필리핀"]
+
+# main.utils_csv.departure_csv_files() 의 지역 → settings 이름
+CSV_SETTINGS = {
+    "asia": "ASIA_CSV",
+    "europe": "EUROPE_CSV",
+    "africa": "AFRICA_CSV",
+    "america": "AMERICA_CSV",
+    "oceania": "OCEANIA_CSV",
+}
+
+
+def csv_regions():
+    """CSV 파일이 있는 지역만 (main.utils_csv.csv_regions 와 같은 기준)"""
+    return [
+        region for region, name in CSV_SETTINGS.items()
+        if getattr(settings, name, None) and Path(getattr(settings, name)).exists()
+    ]
+
+
+def rebuild_departure_summaries(apps, schema_editor):
+    """
+    0005에서 채운 요약은 region 키가 섞인 연도별 행 기준이었다.
+    0008로 region 키를 정리한 뒤 TravelStat 연도 합계 행(month=0)에서 처음부터 다시 채운다.
+    CSV가 없는 지역의 행(America.csv 없이 남은 america 행)은 CSV 기준 예전 결과와 맞추려고 뺀다.
+    """
+    TravelStat = apps.get_model("main", "TravelStat")
+    YearlyDepartureTotal = apps.get_model("main", "YearlyDepartureTotal")
+    CountryYearDeparture = apps.get_model("main", "CountryYearDeparture")
+
+    CountryYearDeparture.objects.all().delete()
+    YearlyDepartureTotal.objects.all().delete()
+
+    yearly_rows = TravelStat.objects.filter(month=0, region__in=csv_regions()).order_by()
+    CountryYearDeparture.objects.bulk_create(
+        CountryYearDeparture(country=r["country"], year=r["year"], departures=r["total"])
+        for r in yearly_rows.values("country", "year").annotate(total=Sum("departures"))
+    )
+    YearlyDepartureTotal.objects.bulk_create(
+        YearlyDepartureTotal(year=r["year"], departures=r["total"], crime_departures=r["crime"] or 0)
+        for r in yearly_rows.values("year").annotate(
+            total=Sum("departures"),
+            crime=Sum("departures", filter=Q(country__in=CRIME_COUNTRIES)),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_normalize_travelstat_region'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_departure_summaries, migrations.RunPython.noop),
+    ]
@@ -1,24 +1,34 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
 class TravelStat(models.Model):
     """
-    해외 출국 통계 (월별 OR 연도별)
-    - month가 NULL이면 연도별 합계 데이터
+    해외 출국 통계 (월별 + 연도별)
+    - month가 0이면 연도별 합계 데이터
     - month가 숫자(1~12)면 월별 데이터
+    (region, country, year, month) 당 한 행
     """
     region = models.CharField(max_length=50)
     country = models.CharField(max_length=100)
 
     year = models.IntegerField()
-    month = models.IntegerField(null=True, blank=True)   # ⭐ 연도별 합계는 None
+    month = models.IntegerField(help_text="1~12, 연도별 합계는 0")
 
     departures = models.IntegerField(help_text="출국자 수")
-    ratio = models.FloatField(blank=True, null=True)
+    ratio = models.FloatField(blank=True, null=True, help_text="전년 대비 증감률(%)")
 
     class Meta:
-        # 이제 month를 unique에서 제거!
-        unique_together = ("region", "country", "year")
+        # 월별 행이 서로 덮어쓰지 않도록 month까지 포함 (DB의 unique 인덱스와 동일)
+        unique_together = ("region", "country", "year", "month")
         ordering = ["year", "month", "region", "country"]
+        indexes = [
+            # 기간 조회 / 최신순 정렬 (travel_debug)
+            models.Index(fields=["year", "month"], name="travelstat_year_month_idx"),
+            # 국가별·지역별 연도(+월) 범위 조회
+            models.Index(fields=["country", "year", "month"], name="travelstat_country_year_idx"),
+            models.Index(fields=["region", "year", "month"], name="travelstat_region_year_idx"),
+        ]
 
     def __str__(self):
         if self.month:
@@ -26,6 +36,67 @@ class TravelStat(models.Model):
         return f"{self.year} 연도합계 {self.region}/{self.country}: {self.departures}명"
 
 
+class DepartureSeries(models.Model):
+    """
+    국가별 월별 출국자 수를 한 행에 묶어 저장하는 압축 모드
+    - (region, country) 당 한 행
+    - data: base_year/base_month 부터 한 달에 int32(little-endian) 하나씩 이어 붙인 배열
+    - 값이 없는 달은 -1 (utils_series.MISSING)
+    """
+    region = models.CharField(max_length=50)
+    country = models.CharField(max_length=100)
+
+    base_year = models.IntegerField()
+    base_month = models.IntegerField()
+    length = models.IntegerField(help_text="저장된 개월 수")
+    data = models.BinaryField()
+
+    class Meta:
+        unique_together = ("region", "country")
+        ordering = ["region", "country"]
+
+    def __str__(self):
+        return f"{self.region}/{self.country}: {self.base_year}-{self.base_month:02d}부터 {self.length}개월"
+
+
+class YearlyDepartureTotal(models.Model):
+    """
+    연도별 출국자 합계 (TravelStat 연도 합계 행(month=0)에서 집계)
+    - departures: 전체 국가 합계
+    - crime_departures: 주요 범죄국(CRIME_COUNTRIES) 합계
+    출국 통계 저장 때 바뀐 연도만 다시 합산한다.
+    """
+    year = models.IntegerField(unique=True)
+    departures = models.BigIntegerField()
+    crime_departures = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["year"]
+
+    @property
+    def crime_ratio(self):
+        if not self.departures:
+            return None
+        return self.crime_departures / self.departures * 100
+
+    def __str__(self):
+        return f"{self.year}: {self.departures}명 (범죄국 {self.crime_departures}명)"
+
+
+class CountryYearDeparture(models.Model):
+    """국가별 연도별 출국자 합계 (지역 구분 없이 합산)"""
+    country = models.CharField(max_length=100)
+    year = models.IntegerField()
+    departures = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ("country", "year")
+        ordering = ["year", "country"]
+
+    def __str__(self):
+        return f"{self.year} {self.country}: {self.departures}명"
+
+
 class VoicePhishingStat(models.Model):
     """월별 보이스피싱 발생 건수"""
     year = models.IntegerField()
@@ -39,6 +110,47 @@ class VoicePhishingStat(models.Model):
         return f"{self.year}-{self.month:02d}: {self.cases}건"
 
 
+class VoicePhishingYearlyStat(models.Model):
+    """연도별 보이스피싱 발생 건수 (월별 동기화 때 바뀐 연도만 다시 합산)"""
+    year = models.IntegerField(unique=True)
+    cases = models.IntegerField()
+
+    class Meta:
+        ordering = ["year"]
+
+    def __str__(self):
+        return f"{self.year}: {self.cases}건"
+
+
+class SyncWatermark(models.Model):
+    """
+    소스별 증분 동기화 기준점
+      - year/month: 마지막으로 반영한 연/월
+      - row_count: 그때 업스트림 API의 전체 행 수 (다음에 받을 페이지 위치 계산용)
+    """
+    source = models.CharField(max_length=50, unique=True)
+    year = models.IntegerField()
+    month = models.IntegerField()
+    row_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.year}-{self.month:02d} ({self.row_count}행)"
+
+
+class DataVersion(models.Model):
+    """
+    DB 데이터 버전 (분석 응답 캐시 키에 들어감)
+    동기화가 DB를 바꿀 때마다 version을 1 올린다. 캐시 파일이 비워져도 되돌아가지 않도록 DB에 둔다.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: v{self.version}"
+
+
 class CyberScamStat(models.Model):
     """
     연도별 사이버 사기 범죄 (유형별 분리 저장)
@@ -64,20 +176,80 @@ class CyberScamStat(models.Model):
     investment = models.IntegerField()          # 사이버투자
     etc = models.IntegerField()                 # 사이버사기_기타
 
+    # 유형 7개 합계: DB가 저장 시점에 계산하는 컬럼 (정렬/필터/합계를 SQL에서 바로)
+    total_cases = models.GeneratedField(
+        expression=(
+            F("direct_trade") +
+            F("shopping_mall") +
+            F("game") +
+            F("email_trade") +
+            F("romance") +
+            F("investment") +
+            F("etc")
+        ),
+        output_field=models.IntegerField(),
+        db_persist=True,
+        db_index=True,
+    )
+
     class Meta:
         unique_together = ("year", "category")
 
-    @property
-    def total_cases(self):
-        return (
-            self.direct_trade +
-            self.shopping_mall +
-            self.game +
-            self.email_trade +
-            self.romance +
-            self.investment +
-            self.etc
-        )
-
     def __str__(self):
         return f"{self.year} {self.category}: 총 {self.total_cases}건"
+
+
+class SyncJob(models.Model):
+    """
+    백그라운드 동기화 작업 (/sync/* 요청은 작업만 등록하고 202 반환)
+    kind: travel / cyber / voice / voice_yearly
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "대기"),
+        (STATUS_RUNNING, "실행 중"),
+        (STATUS_SUCCEEDED, "완료"),
+        (STATUS_FAILED, "실패"),
+    ]
+
+    kind = models.CharField(max_length=30)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    progress = models.IntegerField(default=0)                 # 0~100
+    message = models.CharField(max_length=200, blank=True)    # 현재 단계
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} [{self.status}] {self.progress}%"
+
+    @property
+    def duration_seconds(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return round((end - self.started_at).total_seconds(), 3)
+
+    def as_dict(self):
+        return {
+            "job_id": self.pk,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error or None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": self.duration_seconds,
+        }
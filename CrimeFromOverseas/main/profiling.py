@@ -0,0 +1,199 @@
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+# =========================
+# 요청 단위 프로파일링 (opt-in: PERF_PROFILING_ENABLED=1)
+#   - 전체 지연시간, SQL 수/시간 (connection.execute_wrapper), 구간별 시간, 메모리 피크 증가분
+#   - 최근 요청 PERF_PROFILING_BUFFER 개를 링 버퍼에 보관 → /debug/perf/ 에서 라우트별 백분위
+#   - 꺼져 있으면 미들웨어가 로드되지 않고 section()은 ContextVar 조회 한 번으로 끝난다
+# =========================
+_current = ContextVar("perf_record", default=None)
+
+_records = deque(maxlen=500)
+_records_lock = threading.Lock()
+
+# 페이지에 보여 줄 백분위
+PERCENTILES = (50, 90, 99)
+
+
+def profiling_enabled():
+    return getattr(settings, "PERF_PROFILING_ENABLED", False)
+
+
+def _buffer_size():
+    return getattr(settings, "PERF_PROFILING_BUFFER", 500)
+
+
+@contextmanager
+def section(name):
+    """
+    요청 안의 구간 시간 측정 (csv_load / aggregate / serialize ...).
+    같은 이름은 누적, 중첩된 구간은 바깥 구간 시간에도 포함된다.
+    프로파일링 중인 요청이 아니면 아무것도 하지 않는다.
+    """
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sections = record["sections"]
+        sections[name] = sections.get(name, 0.0) + time.perf_counter() - start
+
+
+# -----------------------------
+# ✔ 링 버퍼
+# -----------------------------
+def _store(record):
+    global _records
+    with _records_lock:
+        if _records.maxlen != _buffer_size():
+            _records = deque(_records, maxlen=_buffer_size())
+        _records.append(record)
+
+
+def recent_records():
+    with _records_lock:
+        return list(_records)
+
+
+def reset_records():
+    with _records_lock:
+        _records.clear()
+
+
+def percentile(values, p):
+    """nearest-rank 백분위 (values가 비면 None)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+
+def _stats(values):
+    return {
+        **{f"p{p}": percentile(values, p) for p in PERCENTILES},
+        "max": max(values) if values else None,
+        "avg": sum(values) / len(values) if values else None,
+    }
+
+
+def summarize(records=None):
+    """라우트별 요청 수, 지연시간/SQL/구간/메모리 백분위 (요청 많은 순)"""
+    if records is None:
+        records = recent_records()
+
+    by_route = {}
+    for r in records:
+        by_route.setdefault((r["method"], r["route"]), []).append(r)
+
+    routes = []
+    for (method, route), rows in by_route.items():
+        section_names = sorted({name for r in rows for name in r["sections"]})
+        memory = [r["memory_peak_kb"] for r in rows if r["memory_peak_kb"] is not None]
+        routes.append({
+            "method": method,
+            "route": route,
+            "count": len(rows),
+            "errors": sum(1 for r in rows if r["status"] >= 500),
+            "total_ms": _stats([r["total_ms"] for r in rows]),
+            "sql_count": _stats([r["sql_count"] for r in rows]),
+            "sql_ms": _stats([r["sql_ms"] for r in rows]),
+            "sections_ms": {
+                name: _stats([r["sections"].get(name, 0.0) * 1000 for r in rows])
+                for name in section_names
+            },
+            "memory_peak_kb": _stats(memory) if memory else None,
+        })
+    routes.sort(key=lambda r: (-r["count"], r["route"]))
+    return routes
+
+
+# -----------------------------
+# ✔ 미들웨어
+# -----------------------------
+class _SqlRecorder:
+    """connection.execute_wrapper: 쿼리 수 / 누적 시간"""
+
+    def __init__(self, record):
+        self.record = record
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record["sql_count"] += 1
+            self.record["sql_ms"] += (time.perf_counter() - start) * 1000
+
+
+class ProfilingMiddleware:
+    """
+    settings.MIDDLEWARE 에 항상 들어 있고, PERF_PROFILING_ENABLED 가 꺼져 있으면
+    MiddlewareNotUsed 로 빠져서 요청 경로에 비용이 없다.
+    메모리 피크는 tracemalloc 기준 (프로세스 전체라서 동시 요청이 있으면 섞여 보일 수 있음)
+    """
+
+    def __init__(self, get_response):
+        if not profiling_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.track_memory = getattr(settings, "PERF_PROFILING_MEMORY", True)
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "route": None,
+            "status": None,
+            "started_at": time.time(),
+            "total_ms": 0.0,
+            "sql_count": 0,
+            "sql_ms": 0.0,
+            "sections": {},
+            "memory_peak_kb": None,
+        }
+        token = _current.set(record)
+        recorder = _SqlRecorder(record)
+
+        tracking = self.track_memory and tracemalloc.is_tracing()
+        if tracking:
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            with _wrap_all_connections(recorder):
+                response = self.get_response(request)
+        finally:
+            record["total_ms"] = (time.perf_counter() - start) * 1000
+            if tracking:
+                record["memory_peak_kb"] = max(0, tracemalloc.get_traced_memory()[1] - mem_before) / 1024
+            _current.reset(token)
+
+        match = getattr(request, "resolver_match", None)
+        record["route"] = "/" + match.route if match is not None else request.path
+        record["status"] = response.status_code
+        _store(record)
+        return response
+
+
+def _wrap_all_connections(wrapper):
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(wrapper))
+    return stack
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse
+
+from . import profiling, singleflight
+from .models import DataVersion
+
+
+# =========================
+# 분석 API 응답 캐시 (/analysis/data/, /analysis/step3/)
+#   - 키 = 이름 + 응답 스키마 버전 + 데이터 버전 (+ 출국 CSV 지문)
+#   - 데이터 버전은 DB(DataVersion)에 둔다 → 캐시가 컬링/삭제돼도 버전이 되돌아가지 않음
+#   - DB에 쓰는 동기화가 끝날 때마다 버전을 올리고 캐시를 비움 (옛 키가 디스크에 쌓이지 않도록)
+#   - 캐시에는 직렬화된 JSON bytes를 저장 → 히트면 분석 코드/JSON 인코딩 없이 그대로 응답
+# =========================
+VERSION_NAME = "analysis"
+
+# build 함수들이 돌려주는 응답 구조가 바뀌면 올린다 (배포 직후 옛 형식 응답을 내보내지 않도록)
+RESPONSE_SCHEMA = 1
+
+
+def cache_enabled():
+    return getattr(settings, "ANALYSIS_CACHE_ENABLED", True)
+
+
+def _cache():
+    return caches[settings.ANALYSIS_CACHE_ALIAS]
+
+
+def _timeout():
+    return getattr(settings, "ANALYSIS_CACHE_TIMEOUT", None)
+
+
+def data_version():
+    version = DataVersion.objects.filter(name=VERSION_NAME).values_list("version", flat=True).first()
+    return version or 1
+
+
+def bump_data_version():
+    """데이터가 바뀌었음을 알림. 커밋이 끝난 뒤에 불러야 새 버전 키에 옛 데이터가 안 들어간다."""
+    # UPDATE ... SET version = version + 1 한 번이라 워커끼리 겹쳐도 증가분을 잃지 않는다
+    if not DataVersion.objects.filter(name=VERSION_NAME).update(version=F("version") + 1):
+        _, created = DataVersion.objects.get_or_create(name=VERSION_NAME, defaults={"version": 2})
+        if not created:  # 다른 워커가 방금 만든 경우
+            DataVersion.objects.filter(name=VERSION_NAME).update(version=F("version") + 1)
+    # 옛 버전 키는 다시 읽히지 않으므로 바로 지운다
+    # (버전을 읽은 뒤 계산 중이던 요청이 옛 키를 다시 쓸 수 있음 → ANALYSIS_CACHE_TIMEOUT 으로 만료)
+    _cache().clear()
+    return data_version()
+
+
+def _build_json(build):
+    with profiling.section("aggregate"):
+        data = build()
+    with profiling.section("serialize"):
+        return JsonResponse(data).content
+
+
+def _render(key, build):
+    body = _cache().get(key)
+    if body is None:
+        body = _build_json(build)
+        _cache().set(key, body, timeout=_timeout())
+    return body
+
+
+def cached_json_response(name, build, extra_key=None):
+    """
+    build() 결과(dict)를 JSON 응답으로. 같은 데이터 버전이면 캐시된 bytes를 그대로 돌려준다.
+    extra_key: DB 밖 입력(CSV 지문 등)이 결과에 영향을 줄 때 키에 덧붙인다.
+    """
+    if not cache_enabled():
+        return HttpResponse(_build_json(build), content_type="application/json")
+
+    # 계산 전에 버전을 읽어 둔다: 계산 중에 동기화가 끝나면 이 결과는 옛 버전 키에만 남는다
+    key = f"{name}:s{RESPONSE_SCHEMA}:v{data_version()}"
+    if extra_key:
+        key = f"{key}:{extra_key}"
+
+    body = _cache().get(key)
+    if body is None:
+        # 콜드 미스에 동시 요청이 몰려도 계산은 한 번 (파일 잠금은 버전 없는 이름 하나만 씀)
+        body = singleflight.do(f"response:{key}", _render, key, build, lock_key=f"response:{name}")
+
+    return HttpResponse(body, content_type="application/json")
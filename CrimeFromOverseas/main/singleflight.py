@@ -0,0 +1,89 @@
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 프로세스 안에서만 합침
+    fcntl = None
+
+
+# =========================
+# 같은 key의 무거운 계산(CSV 전체 로드, 분석 데이터, 동기화)을 한 번만 돌리기
+#   - 같은 프로세스: 먼저 온 호출이 계산하고, 나머지는 기다렸다가 같은 결과를 받는다
+#   - 다른 워커 프로세스: 파일 잠금(flock)으로 한 번에 하나만 계산
+#     (뒤에 온 프로세스는 앞 계산이 남긴 캐시를 읽게 된다)
+# =========================
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def _lock_path(key):
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+    root = Path(settings.SINGLEFLIGHT_LOCK_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    return root / f"{safe}.lock"
+
+
+@contextmanager
+def file_lock(key):
+    """프로세스 간 배타 잠금 (fcntl이 없으면 아무것도 안 함)"""
+    if fcntl is None:
+        yield
+        return
+
+    with open(_lock_path(key), "a+") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def do(key, fn, *args, lock_key=None, **kwargs):
+    """
+    fn(*args, **kwargs)를 key당 한 번만 실행하고, 동시에 들어온 호출들은 그 결과를 같이 받는다.
+    결과 객체(DataFrame 등)는 호출자끼리 공유되므로 받은 쪽에서 수정하면 안 된다.
+    lock_key: 프로세스 간 잠금 파일 이름 (기본 key). key에 데이터 버전처럼 계속 바뀌는 값이
+    들어가면 고정된 이름을 줘야 잠금 파일이 버전마다 쌓이지 않는다.
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        with file_lock(lock_key or key):
+            call.result = fn(*args, **kwargs)
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
+
+    return call.result
+
+
+def in_flight(key):
+    """현재 이 프로세스에서 key 계산이 진행 중인지"""
+    with _calls_lock:
+        return key in _calls
@@ -0,0 +1,95 @@
+import csv
+import random
+from pathlib import Path
+
+from .api_client import CYBER_FIELDS
+
+# departure_csv_files() 의 지역 키와 같은 순서
+REGIONS = ["asia", "europe", "africa", "america", "oceania"]
+
+
+# =========================
+# 벤치마크/테스트용 합성 데이터
+#   - 출국 CSV: main/data/*.csv 와 같은 레이아웃
+#       0행 제목, 1행 (한글 국가명, 영문 국가명) 쌍, 2행 (명수, 전년대비) 쌍
+#       데이터: "2004년","1월",... 다음 행부터 "","2월",...
+#   - 사이버사기 / 보이스피싱: odcloud API 원본 행 형식 (parse_*_rows 에 그대로 넣을 수 있음)
+# =========================
+def _fmt_count(n):
+    # 원본처럼 천 단위 쉼표 + 뒤 공백
+    return f"{n:,} "
+
+
+def write_departure_csv(path, region, countries, start_year, years, seed=0):
+    """
+    region 하나의 출국 통계 CSV를 path에 쓴다.
+    countries: 국가 수, years: 연도 수 (start_year 부터 1~12월 전부)
+    반환: 쓴 데이터 행 수
+    """
+    rng = random.Random(f"{seed}-{region}")
+    names = [(f"{region}국가{i:03d}", f"{region.title()} Country {i}") for i in range(countries)]
+
+    title = [f"국민 해외관광객({region})", "", "", ""]
+    header_country = ["", "", "법무부・KTO", ""]
+    header_type = ["", "", "명수", "전년대비"]
+    for ko, en in names:
+        title += ["", ""]
+        header_country += [ko, en]
+        header_type += ["명수", "전년대비"]
+
+    base = [rng.randint(50, 200_000) for _ in names]
+    prev = {}
+    rows = []
+    for y in range(start_year, start_year + years):
+        for m in range(1, 13):
+            counts = [max(0, int(b * rng.uniform(0.6, 1.4))) for b in base]
+            cells = [f"{y}년" if m == 1 else "", f"{m}월", _fmt_count(sum(counts)), ""]
+            for i, n in enumerate(counts):
+                last = prev.get((i, m))
+                change = f"{(n - last) / last * 100:.1f}%" if last else ""
+                # 일부 칸은 원본처럼 비워 둔다
+                cells += ["" if rng.random() < 0.02 else _fmt_count(n), change]
+                prev[(i, m)] = n
+            rows.append(cells)
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(title)
+        writer.writerow(header_country)
+        writer.writerow(header_type)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def write_departure_csvs(root, regions=5, countries=60, start_year=2004, years=20, seed=0):
+    """지역별 CSV를 root 아래에 쓰고 {region: path} 반환 (departure_csv_files() 형식)"""
+    files = {}
+    for region in REGIONS[:regions]:
+        path = Path(root) / f"{region.title()}.csv"
+        write_departure_csv(path, region, countries, start_year, years, seed)
+        files[region] = path
+    return files
+
+
+def cyber_scam_rows(start_year=2004, years=20, seed=0):
+    """사이버사기 API 원본 행 (연도별 발생건수 / 검거건수)"""
+    rng = random.Random(f"{seed}-cyber")
+    rows = []
+    for y in range(start_year, start_year + years):
+        for category in ("발생건수", "검거건수"):
+            row = {"연도": str(y), "구분": category}
+            for key in CYBER_FIELDS.values():
+                row[key] = f"{rng.randint(100, 90_000):,}"
+            rows.append(row)
+    return rows
+
+
+def voice_phishing_rows(start_year=2004, years=20, seed=0):
+    """보이스피싱 API 원본 행 (월별 발생건수)"""
+    rng = random.Random(f"{seed}-voice")
+    return [
+        {"년": str(y), "월": str(m), "전화금융사기 발생건수": str(rng.randint(500, 5_000))}
+        for y in range(start_year, start_year + years)
+        for m in range(1, 13)
+    ]
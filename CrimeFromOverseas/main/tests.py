@@ -1,3 +1,1297 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management import call_command
+from django.apps import apps
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import (
+    api_client, jobs, metrics, profiling, response_cache, singleflight, synthetic, utils_csv, utils_csv_cache,
+    utils_csv_import, utils_cube, utils_series,
+)
+from . import utils_api_cache as api_cache
+from .utils_csv import clean_num, iter_departure_csv, parse_departure_csv, save_to_db
+from .utils_csv_import import save_yearly_to_db
+from .utils_db import bulk_upsert, merge_upsert_stats
+from .models import (
+    CountryYearDeparture, CyberScamStat, DataVersion, DepartureSeries, SyncJob, SyncWatermark, TravelStat, VoicePhishingStat,
+    VoicePhishingYearlyStat, YearlyDepartureTotal,
+)
+
+
+# 분석 응답 캐시를 디스크(.cache/responses) 대신 테스트 전용 메모리 캐시로
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "analysis": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "analysis-tests"},
+}
+
+
+class FakeOdcloudHandler(BaseHTTPRequestHandler):
+    """odcloud 형식({"totalCount", "data"})으로 페이지를 돌려주는 로컬 테스트 서버"""
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        page = int(query["page"][0])
+        per_page = int(query["perPage"][0])
+
+        with server.lock:
+            server.requested_pages.append(page)
+            server.request_headers.append(dict(self.headers))
+            failing = server.fail_first > 0
+            if failing:
+                server.fail_first -= 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        if server.etag and self.headers.get("If-None-Match") == server.etag:
+            self.send_response(304)
+            self.send_header("ETag", server.etag)
+            self.end_headers()
+            with server.lock:
+                server.in_flight -= 1
+            return
+
+        if failing:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            with server.lock:
+                server.in_flight -= 1
+            return
+
+        # 뒤 페이지일수록 빨리 응답 → 순서가 섞여 도착해도 결과는 페이지 순서여야 함
+        time.sleep(server.delay / page)
+
+        start = (page - 1) * per_page
+        rows = server.rows[start:start + per_page]
+        body = {"page": page, "perPage": per_page, "currentCount": len(rows), "data": rows}
+        if server.with_total:
+            body["totalCount"] = len(server.rows)
+
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if server.etag:
+            self.send_header("ETag", server.etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOdcloudServerMixin:
+
+    def start_server(self, rows, with_total=True, delay=0.02, fail_first=0, etag=None, **settings_kwargs):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOdcloudHandler)
+        server.rows = rows
+        server.with_total = with_total
+        server.delay = delay
+        server.fail_first = fail_first
+        server.etag = etag
+        server.lock = threading.Lock()
+        server.requested_pages = []
+        server.request_headers = []
+        server.in_flight = 0
+        server.max_in_flight = 0
+
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        settings_override = override_settings(**{
+            "SCAM_BASE_URL": base_url, "SCAM_ENDPOINT": "/scam",
+            "VOICE_BASE_URL": base_url, "VOICE_ENDPOINT": "/voice",
+            "API_KEY": "test-key",
+            "API_MAX_RETRIES": 2, "API_BACKOFF_FACTOR": 0.01,
+            "API_CACHE_DIR": cache_dir.name,
+            **settings_kwargs,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # 세션은 만들 때 설정을 읽으므로 테스트마다 새로 만든다
+        api_client.reset_session()
+        api_client.reset_api_call_stats()
+        self.addCleanup(api_client.reset_session)
+        return server
+
+
+class ApiClientTests(FakeOdcloudServerMixin, SimpleTestCase):
+
+    def test_fetches_every_page_in_order(self):
+        rows = [{"연도": str(2000 + i), "구분": "발생건수"} for i in range(23)]
+        server = self.start_server(rows)
+
+        result = api_client.fetch_all_cyber_scam(per_page=5, max_workers=3)
+
+        self.assertEqual(result, rows)
+        self.assertEqual(sorted(server.requested_pages), [1, 2, 3, 4, 5])
+
+    def test_concurrency_is_limited(self):
+        rows = [{"연도": "2020", "구분": str(i)} for i in range(40)]
+        server = self.start_server(rows, delay=0.05)
+
+        api_client.fetch_all_cyber_scam(per_page=2, max_workers=3)
+
+        self.assertEqual(len(server.requested_pages), 20)
+        self.assertLessEqual(server.max_in_flight, 3)
+        self.assertGreater(server.max_in_flight, 1)
+
+    def test_without_total_count_only_first_page(self):
+        rows = [{"연도": "2020", "구분": str(i)} for i in range(10)]
+        server = self.start_server(rows, with_total=False)
+
+        result = api_client.fetch_all_cyber_scam(per_page=4)
+
+        self.assertEqual(result, rows[:4])
+        self.assertEqual(server.requested_pages, [1])
+
+    def test_voice_rows_wrapped_in_strings_are_unpacked(self):
+        rows = [
+            json.dumps({"년": "2021", "월": str(m), "전화금융사기 발생건수": "10"}, ensure_ascii=False)
+            for m in range(1, 13)
+        ] + ["not json"]
+        self.start_server(rows)
+
+        result = api_client.fetch_all_voice_phishing(per_page=5)
+
+        self.assertEqual([r["월"] for r in result], [str(m) for m in range(1, 13)])
+
+    def test_retries_5xx_and_records_latency(self):
+        rows = [{"연도": "2020", "구분": "발생건수"}]
+        server = self.start_server(rows, fail_first=2)
+
+        result = api_client.fetch_cyber_scam()
+
+        self.assertEqual(result, rows)
+        self.assertEqual(server.requested_pages, [1, 1, 1])
+
+        stats = api_client.get_api_call_stats()
+        self.assertEqual(stats["recent"][-1]["retries"], 2)
+        self.assertEqual(stats["recent"][-1]["status"], 200)
+        endpoint = next(iter(stats["endpoints"].values()))
+        self.assertEqual(endpoint["calls"], 1)
+        self.assertGreater(endpoint["seconds"], 0)
+
+    def test_gives_up_after_max_retries(self):
+        server = self.start_server([], fail_first=10)
+
+        with self.assertRaises(api_client.requests.HTTPError):
+            api_client.fetch_cyber_scam()
+
+        self.assertEqual(len(server.requested_pages), 3)
+        self.assertEqual(api_client.get_api_call_stats()["recent"][-1]["error"], "HTTP 503")
+
+    def test_connection_errors_record_known_retry_count_only(self):
+        server = self.start_server([])
+        closed_url = f"http://127.0.0.1:{server.server_address[1]}/scam"
+        server.server_close()   # 포트를 닫아서 연결 실패 → 재시도를 다 쓰고 MaxRetryError
+
+        with self.assertRaises(api_client.requests.ConnectionError):
+            api_client.request_page(closed_url, 1, 10, use_cache=False)
+        self.assertEqual(api_client.get_api_call_stats()["recent"][-1]["retries"], 2)
+
+        # 재시도 정보가 없는 예외는 횟수를 지어내지 않는다
+        with mock.patch.object(api_client.requests.Session, "get", side_effect=api_client.requests.ConnectionError("reset")):
+            with self.assertRaises(api_client.requests.ConnectionError):
+                api_client.request_page(closed_url, 1, 10, use_cache=False)
+        self.assertIsNone(api_client.get_api_call_stats()["recent"][-1]["retries"])
+        self.assertEqual(api_client.get_api_call_stats()["endpoints"][closed_url]["retries"], 2)
+
+    def test_fresh_cache_skips_http(self):
+        rows = [{"연도": "2020", "구분": "발생건수"}]
+        server = self.start_server(rows)
+
+        first = api_client.fetch_cyber_scam()
+        second = api_client.fetch_cyber_scam()
+
+        self.assertEqual(first, second)
+        self.assertEqual(server.requested_pages, [1])
+        self.assertEqual(api_client.get_api_call_stats()["recent"][-1]["cache"], "hit")
+
+    def test_expired_cache_revalidates_with_etag(self):
+        rows = [{"연도": "2020", "구분": "발생건수"}]
+        server = self.start_server(rows, etag='"v1"', API_CACHE_TTL=0)
+
+        first = api_client.fetch_cyber_scam()
+        second = api_client.fetch_cyber_scam()
+
+        self.assertEqual(first, second)
+        self.assertEqual(server.requested_pages, [1, 1])
+        self.assertEqual(server.request_headers[1].get("If-None-Match"), '"v1"')
+        recent = api_client.get_api_call_stats()["recent"][-1]
+        self.assertEqual((recent["status"], recent["cache"]), (304, "revalidated"))
+
+
+class SyncShortCircuitTests(TestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings_override = override_settings(
+            API_CACHE_DIR=cache_dir.name, SINGLEFLIGHT_LOCK_DIR=f"{cache_dir.name}/locks",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_concurrent_digest_saves_keep_every_source(self):
+        read_json = api_cache._read_json
+
+        def slow_read(path):
+            data = read_json(path)
+            time.sleep(0.02)   # 읽기와 쓰기 사이를 벌려서 잠금이 없으면 서로 덮어쓰게 함
+            return data
+
+        sources = [f"source-{i}" for i in range(6)]
+        with mock.patch.object(api_cache, "_read_json", side_effect=slow_read):
+            threads = [threading.Thread(target=api_cache.save_sync_digest, args=(s, s)) for s in sources]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        for source in sources:
+            self.assertEqual(api_cache.load_sync_digest(source), source)
+
+    def test_unchanged_payload_skips_db_sync(self):
+        rows = [{"연도": "2020", "구분": "발생건수", "직거래": "10", "쇼핑몰": "1,000"}]
+
+        with mock.patch.object(api_client, "fetch_all_cyber_scam", return_value=rows):
+            first = api_client.sync_cyber_scam()
+            with self.assertNumQueries(1):   # CyberScamStat.objects.exists() 뿐
+                second = api_client.sync_cyber_scam()
+
+        self.assertEqual(first["inserted"], 1)
+        self.assertTrue(second["payload_unchanged"])
+        self.assertEqual(CyberScamStat.objects.get().shopping_mall, 1000)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_forced_resync_writes_only_changed_rows(self):
+        rows = [
+            {"연도": "2020", "구분": "발생건수", "직거래": "10"},
+            {"연도": "2021", "구분": "발생건수", "직거래": "20"},
+            {"연도": "", "구분": "발생건수", "직거래": "99"},   # 연도 없는 행은 버림
+        ]
+        with mock.patch.object(api_client, "fetch_all_cyber_scam", return_value=rows):
+            self.assertEqual(api_client.sync_cyber_scam()["inserted"], 2)
+            version = response_cache.data_version()
+
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+                same = api_client.sync_cyber_scam(force=True)
+            self.assertEqual((same["updated"], same["skipped"]), (0, 2))
+            self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith(("INSERT", "UPDATE"))])
+            self.assertEqual(response_cache.data_version(), version)
+
+            rows[1]["직거래"] = "25"
+            with self.captureOnCommitCallbacks(execute=True):
+                changed = api_client.sync_cyber_scam(force=True)
+
+        self.assertEqual((changed["inserted"], changed["updated"], changed["skipped"]), (0, 1, 1))
+        self.assertEqual(response_cache.data_version(), version + 1)
+        self.assertEqual(CyberScamStat.objects.get(year=2021).direct_trade, 25)
+
+
+def voice_rows(year_months):
+    return [
+        {"년": str(y), "월": str(m), "전화금융사기 발생건수": str(y - 2000 + m)}
+        for y, m in year_months
+    ]
+
+
+class VoiceIncrementalSyncTests(FakeOdcloudServerMixin, TestCase):
+
+    def test_second_sync_fetches_only_new_pages(self):
+        months = [(y, m) for y in (2021, 2022) for m in range(1, 13)]
+        server = self.start_server(voice_rows(months[:20]), API_CACHE_ENABLED=False)
+
+        api_client.sync_voice_phishing()
+        self.assertEqual(
+            (SyncWatermark.objects.get().year, SyncWatermark.objects.get().month), (2022, 8)
+        )
+
+        server.rows = voice_rows(months)
+        server.requested_pages.clear()
+        with mock.patch.object(api_client, "refresh_voice_yearly",
+                               wraps=api_client.refresh_voice_yearly) as refresh:
+            yearly = api_client.sync_voice_phishing()
+
+        # 500행/페이지라 마지막 저장 행과 새 4개월이 모두 1페이지에 있음 → 1페이지만 다시 요청
+        self.assertEqual(server.requested_pages, [1])
+        refresh.assert_called_once_with({2021, 2022})
+        self.assertEqual(VoicePhishingStat.objects.count(), 24)
+        self.assertEqual(
+            dict(VoicePhishingYearlyStat.objects.values_list("year", "cases")),
+            {2021: sum(21 + m for m in range(1, 13)), 2022: sum(22 + m for m in range(1, 13))},
+        )
+        self.assertEqual(list(yearly), [2021, 2022])
+        self.assertEqual(SyncWatermark.objects.get().row_count, 24)
+
+    def test_watermark_skips_pages_before_offset(self):
+        months = [(2020 + i // 12, i % 12 + 1) for i in range(30)]
+        server = self.start_server(voice_rows(months), API_CACHE_ENABLED=False)
+
+        rows, total, anchor = api_client.fetch_voice_phishing_from(20, per_page=7)
+
+        # 마지막 저장 행(19번째)은 3페이지(14~20)에 있으므로 3, 4, 5페이지만 요청
+        self.assertEqual(sorted(server.requested_pages), [3, 4, 5])
+        self.assertEqual(total, 30)
+        self.assertEqual(len(rows), 30 - 14)
+        self.assertEqual(anchor, voice_rows([months[19]])[0])
+
+    def test_correction_in_last_stored_page_is_picked_up(self):
+        months = [(2022, m) for m in range(1, 13)]
+        server = self.start_server(voice_rows(months[:10]), API_CACHE_ENABLED=False)
+        api_client.sync_voice_phishing()
+
+        server.rows = voice_rows(months)
+        server.rows[9]["전화금융사기 발생건수"] = "999"   # 이미 받은 10월 수치가 정정됨
+        api_client.sync_voice_phishing()
+
+        self.assertEqual(VoicePhishingStat.objects.get(year=2022, month=10).cases, 999)
+        self.assertEqual(VoicePhishingStat.objects.count(), 12)
+        self.assertEqual(
+            VoicePhishingYearlyStat.objects.get(year=2022).cases,
+            sum(22 + m for m in range(1, 13)) - (22 + 10) + 999,
+        )
+
+    def test_reordered_upstream_falls_back_to_full_sync(self):
+        months = [(2021, m) for m in range(1, 13)]
+        server = self.start_server(voice_rows(months[:6]), API_CACHE_ENABLED=False)
+        api_client.sync_voice_phishing()
+
+        # 최근 달 → 오래된 달 순으로 바뀌면 6번째 행은 더 이상 2021-06 이 아님
+        server.rows = voice_rows(list(reversed(months)))
+        with mock.patch.object(api_client, "fetch_all_voice_phishing",
+                               wraps=api_client.fetch_all_voice_phishing) as fetch_all:
+            api_client.sync_voice_phishing()
+
+        fetch_all.assert_called_once()
+        self.assertEqual(VoicePhishingStat.objects.count(), 12)
+        self.assertEqual((SyncWatermark.objects.get().year, SyncWatermark.objects.get().month), (2021, 12))
+
+
+class SyncJobTests(TestCase):
+
+    @override_settings(SYNC_JOB_MODE="command")
+    def test_sync_view_enqueues_and_worker_runs_job(self):
+        def fake_runner(report):
+            report(50, "절반")
+            return {"status": "ok"}
+
+        with mock.patch.dict(jobs.JOB_RUNNERS, {"cyber": fake_runner}):
+            res = self.client.get("/sync/cyber/")
+            self.assertEqual(res.status_code, 202)
+            status_url = res.json()["status_url"]
+            self.assertEqual(self.client.get(status_url).json()["status"], "queued")
+
+            job_id = jobs.claim_next()
+            self.assertEqual(job_id, res.json()["job_id"])
+            self.assertIsNone(jobs.claim_next())   # 이미 잡힌 작업은 다시 잡히지 않음
+            jobs.run_job(job_id, claimed=True)
+
+        body = self.client.get(status_url).json()
+        self.assertEqual(body["status"], "succeeded")
+        self.assertEqual(body["progress"], 100)
+        self.assertEqual(body["result"], {"status": "ok"})
+        self.assertIsNotNone(body["duration_seconds"])
+
+    @override_settings(SYNC_JOB_MODE="inline", API_KEY="secret-key")
+    def test_failed_job_records_redacted_error(self):
+        def broken_runner(report):
+            raise RuntimeError("upstream down ?serviceKey=secret-key")
+
+        with mock.patch.dict(jobs.JOB_RUNNERS, {"voice": broken_runner}):
+            job, _ = jobs.enqueue("voice")
+
+        self.assertEqual(job.status, SyncJob.STATUS_FAILED)
+        self.assertIn("upstream down", job.error)
+        self.assertNotIn("secret-key", job.error + job.message)
+
+    @override_settings(SYNC_JOB_MODE="command")
+    def test_second_enqueue_joins_active_job(self):
+        first = self.client.get("/sync/voice/").json()
+        second = self.client.get("/sync/voice/").json()
+
+        self.assertEqual(second["job_id"], first["job_id"])
+        self.assertTrue(second["joined_existing"])
+        self.assertEqual(SyncJob.objects.count(), 1)
+
+        # 끝난 작업에는 합류하지 않고 새로 만든다
+        SyncJob.objects.update(status=SyncJob.STATUS_SUCCEEDED)
+        third = self.client.get("/sync/voice/").json()
+        self.assertNotEqual(third["job_id"], first["job_id"])
+        self.assertFalse(third["joined_existing"])
+
+    @override_settings(SYNC_JOB_MODE="command", SYNC_JOB_STALE_SECONDS=60)
+    def test_orphaned_queued_job_is_expired_not_joined(self):
+        orphan, _ = jobs.enqueue("cyber")
+        SyncJob.objects.filter(pk=orphan.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+
+        job, created = jobs.enqueue("cyber")
+
+        self.assertTrue(created)
+        self.assertNotEqual(job.pk, orphan.pk)
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, SyncJob.STATUS_FAILED)
+        self.assertEqual(jobs.claim_next(), job.pk)   # 워커는 새 작업만 잡는다
+
+    def test_voice_jobs_share_one_sync_lock(self):
+        self.assertEqual(jobs.sync_lock_name("voice"), jobs.sync_lock_name("voice_yearly"))
+        self.assertNotEqual(jobs.sync_lock_name("voice"), jobs.sync_lock_name("cyber"))
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        settings_override = override_settings(SINGLEFLIGHT_LOCK_DIR=lock_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_concurrent_calls_share_one_computation(self):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"value": len(calls)}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(singleflight.do("k", compute)))
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait(5)
+        for t in threads[1:]:
+            t.start()
+        # 나머지 호출이 진행 중인 계산에 붙을 시간을 준다
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertFalse(singleflight.in_flight("k"))
+
+    def test_error_is_shared_and_next_call_retries(self):
+        def broken():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            singleflight.do("k", broken)
+        self.assertEqual(singleflight.do("k", lambda: 42), 42)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnalysisResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(response_cache._cache().clear)
+        VoicePhishingYearlyStat.objects.create(year=2020, cases=7)
+        self.upsert_cyber(2020, shopping_mall=5)
+
+    def upsert_cyber(self, year, shopping_mall):
+        fields = {name: 0 for name in api_client.CYBER_FIELDS}
+        fields["shopping_mall"] = shopping_mall
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_upsert(
+                CyberScamStat, [CyberScamStat(year=year, category="발생건수", **fields)],
+                unique_fields=["year", "category"], update_fields=list(fields),
+            )
+
+    def test_warm_hit_skips_queries_until_data_changes(self):
+        first = self.client.get("/analysis/step3/")
+        with self.assertNumQueries(1):   # 데이터 버전 조회만
+            second = self.client.get("/analysis/step3/")
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second.json()["data"][0]["shopping"], 5)
+
+        version = response_cache.data_version()
+        self.upsert_cyber(2020, shopping_mall=9)
+        self.assertEqual(response_cache.data_version(), version + 1)
+
+        self.assertEqual(self.client.get("/analysis/step3/").json()["data"][0]["shopping"], 9)
+
+    def test_unchanged_upsert_keeps_version(self):
+        version = response_cache.data_version()
+        self.upsert_cyber(2020, shopping_mall=5)
+        self.assertEqual(response_cache.data_version(), version)
+
+    def test_version_lives_in_db_and_bump_drops_old_entries(self):
+        self.client.get("/analysis/step3/")
+        version = response_cache.bump_data_version()
+
+        # 캐시가 통째로 비워져도 버전은 DB에 남아 있다
+        response_cache._cache().clear()
+        self.assertEqual(response_cache.data_version(), version)
+        self.assertEqual(DataVersion.objects.get(name=response_cache.VERSION_NAME).version, version)
+
+        self.client.get("/analysis/step3/")
+        key = f"step3_radial:s{response_cache.RESPONSE_SCHEMA}:v{version}"
+        self.assertIsNotNone(response_cache._cache().get(key))
+        response_cache.bump_data_version()
+        self.assertIsNone(response_cache._cache().get(key))
+
+    def test_versioned_keys_share_one_lock_file(self):
+        with tempfile.TemporaryDirectory() as lock_dir, override_settings(SINGLEFLIGHT_LOCK_DIR=lock_dir):
+            for _ in range(3):
+                self.client.get("/analysis/step3/")
+                response_cache.bump_data_version()
+
+            locks = sorted(p.name for p in Path(lock_dir).iterdir())
+
+        self.assertEqual(locks, ["response_step3_radial.lock"])
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PERF_PROFILING_ENABLED=True, PERF_PROFILING_MEMORY=True)
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        profiling.reset_records()
+        self.addCleanup(profiling.reset_records)
+        self.addCleanup(response_cache._cache().clear)
+        # 미들웨어가 켠 tracemalloc 은 다른 테스트까지 느리게 하므로 끈다
+        self.addCleanup(tracemalloc.stop)
+        VoicePhishingYearlyStat.objects.create(year=2020, cases=7)
+        CyberScamStat.objects.create(
+            year=2020, category="발생건수", **{field: 1 for field in api_client.CYBER_FIELDS},
+        )
+
+    def test_records_sql_sections_and_memory_per_request(self):
+        self.client.get("/analysis/step3/")
+        self.client.get("/analysis/step3/")
+
+        cold, warm = profiling.recent_records()
+        self.assertEqual(cold["route"], "/analysis/step3/")
+        self.assertEqual(cold["status"], 200)
+        self.assertGreater(cold["sql_count"], 0)
+        self.assertEqual(set(cold["sections"]), {"aggregate", "serialize"})
+        self.assertIsNotNone(cold["memory_peak_kb"])
+        # 두 번째는 응답 캐시 히트: 분석 코드 없이 데이터 버전 조회 SQL 하나
+        self.assertEqual((warm["sql_count"], warm["sections"]), (1, {}))
+
+    def test_dashboard_groups_by_route(self):
+        for job_id in (1, 2):
+            self.client.get(f"/sync/jobs/{job_id}/")
+        self.client.get("/analysis/step3/")
+
+        routes = self.client.get("/debug/perf/", {"format": "json"}).json()["routes"]
+        by_route = {r["route"]: r for r in routes}
+        self.assertEqual(by_route["/sync/jobs/<int:job_id>/"]["count"], 2)
+        self.assertIn("serialize", by_route["/analysis/step3/"]["sections_ms"])
+
+        page = self.client.get("/debug/perf/")
+        self.assertContains(page, "/analysis/step3/")
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([profiling.percentile(values, p) for p in (50, 90, 99)], [50, 90, 99])
+        self.assertEqual(profiling.percentile([3.0], 99), 3.0)
+        self.assertIsNone(profiling.percentile([], 50))
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.rows = synthetic.cyber_scam_rows(2020, 3)
+
+    def sync_cyber_twice(self):
+        for _ in range(2):
+            api_client.upsert_cyber_scam(api_client.parse_cyber_scam_rows(self.rows))
+
+    def test_pipeline_counters_and_prometheus_text(self):
+        self.sync_cyber_twice()
+        save_yearly_to_db(pd.DataFrame({
+            "year": [2020], "country": ["미얀마"], "region": ["asia"], "departures": [10],
+        }))
+
+        self.assertEqual(metrics.ROWS_PARSED.value(source="cyber_scam"), 12)
+        self.assertEqual(metrics.ROWS_UPSERTED.value(model="CyberScamStat", op="insert"), 6)
+        self.assertEqual(metrics.ROWS_SKIPPED.value(model="CyberScamStat"), 6)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage="save_yearly_to_db"), 1)
+
+        res = self.client.get("/metrics")
+        self.assertEqual(res["Content-Type"], metrics.CONTENT_TYPE)
+        text = res.content.decode()
+        self.assertIn("# TYPE ingest_rows_upserted_total counter", text)
+        self.assertIn('ingest_rows_skipped_total{model="CyberScamStat"} 6', text)
+        self.assertIn('db_model_rows{model="CyberScamStat"} 6', text)
+        self.assertIn('db_model_rows{model="YearlyDepartureTotal"} 1', text)
+        self.assertIn('pipeline_stage_duration_seconds_count{stage="save_yearly_to_db"} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.STAGE_SECONDS.observe(0.003, stage="x")
+        metrics.STAGE_SECONDS.observe(7, stage="x")
+
+        text = metrics.render()
+        self.assertIn('pipeline_stage_duration_seconds_bucket{stage="x",le="0.005"} 1', text)
+        self.assertIn('pipeline_stage_duration_seconds_bucket{stage="x",le="5"} 1', text)
+        self.assertIn('pipeline_stage_duration_seconds_bucket{stage="x",le="10"} 2', text)
+        self.assertIn('pipeline_stage_duration_seconds_bucket{stage="x",le="+Inf"} 2', text)
+        self.assertIn('pipeline_stage_duration_seconds_sum{stage="x"} 7.003', text)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled_registry_records_nothing(self):
+        self.sync_cyber_twice()
+
+        self.assertEqual(metrics.ROWS_PARSED.value(source="cyber_scam"), 0)
+        self.assertEqual(metrics.ROWS_UPSERTED.value(model="CyberScamStat", op="insert"), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+class YearlyAggregationTests(TestCase):
+
+    def test_cyber_yearly_sums_seven_categories_in_one_query(self):
+        for year, category, base in [(2020, "발생건수", 1), (2020, "검거건수", 100), (2021, "발생건수", 2)]:
+            CyberScamStat.objects.create(
+                year=year, category=category,
+                **{field: base for field in api_client.CYBER_FIELDS},
+            )
+
+        with self.assertNumQueries(1):
+            yearly = api_client.get_cyber_scam_yearly()
+
+        self.assertEqual(yearly, {2020: 7, 2021: 14})
+        self.assertEqual(api_client.get_cyber_scam_yearly([2021]), {2021: 14})
+
+    def test_total_cases_is_maintained_by_the_database(self):
+        fields = {field: 1 for field in api_client.CYBER_FIELDS}
+        api_client.upsert_cyber_scam([CyberScamStat(year=2020, category="발생건수", **fields)])
+        api_client.upsert_cyber_scam([
+            CyberScamStat(year=2020, category="발생건수", **{**fields, "game": 10}),
+            CyberScamStat(year=2021, category="발생건수", **fields),
+        ])
+
+        top = CyberScamStat.objects.filter(total_cases__gt=7).order_by("-total_cases")
+        self.assertEqual(list(top.values_list("year", "total_cases")), [(2020, 16)])
+
+
+
+# 제목 / 국가명 / 명수·전년대비 3행 + 본문. 빈칸, "-", "1,234 ", 소수, 숫자 아닌 값이 섞여 있다
+FIXTURE_CSV = """\ufeff국민 해외관광객,,,,,,,,,
+,,법무부・KTO,,일본,Japan,중국,China,,
+,,명수,전년대비,명수,전년대비,명수,전년대비,명수,전년대비
+2019년,1월,"1,000 ",,"1,234 ",,-,,5,
+,2월,900,,"2,000 ",3.5%,,,7,
+,3월,800,,-,,12.7,,n/a,
+합계,,,,,,,,,
+2020년,1월,10,,1,,2,,3,
+,2월,20,,"12,345 ",,0,,,
+,비고,,,,,,,,
+,3월,30,,"1,234 ",-1.0%,-,,"9,999 ",
+"""
+
+
+def legacy_parse(path, region_name):
+    """user-001 이전 load_csv_trip_table (iterrows) 그대로 — 새 파서의 기준"""
+    df = pd.read_csv(path, header=None, encoding="utf-8-sig")
+    header_country, header_type = df.iloc[1], df.iloc[2]
+    country_cols = []
+    for col in range(3, df.shape[1]):
+        name = str(header_country[col]).strip()
+        if str(header_type[col]).strip() == "명수" and name.lower() != "nan" and name != "":
+            country_cols.append((col, name))
+
+    rows, current_year = [], None
+    for _, row in df.iloc[3:].iterrows():
+        year_cell, month_cell = str(row.iloc[0]).strip(), str(row.iloc[1]).strip()
+        if year_cell.endswith("년"):
+            digits = "".join(c for c in year_cell if c.isdigit())
+            if digits:
+                current_year = int(digits)
+            continue
+        if current_year is None or not month_cell.endswith("월"):
+            continue
+        month_digits = "".join(c for c in month_cell if c.isdigit())
+        if not month_digits:
+            continue
+        for col, name in country_cols:
+            rows.append({
+                "year": current_year, "month": int(month_digits), "country": name,
+                "region": region_name, "departures": clean_num(row.iloc[col]),
+            })
+    return pd.DataFrame(rows)
+
+
+class DepartureCsvParserTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = f"{tmp.name}/Asia.csv"
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(FIXTURE_CSV)
+
+    def test_vectorized_parser_matches_legacy_iterrows(self):
+        expected = legacy_parse(self.path, "asia")
+        actual = parse_departure_csv(self.path, "asia")
+
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        # "1,234 " → 1234, "-" / 빈칸 / "n/a" → 0, "12.7" → 12, 연도 행(1월)은 건너뜀
+        self.assertEqual(
+            actual[actual["country"] == "일본"]["departures"].tolist(), [2000, 0, 12345, 1234],
+        )
+        self.assertEqual(actual["region"].unique().tolist(), ["asia"])
+
+    def test_chunked_parser_matches_full_parse_across_chunk_boundaries(self):
+        # 합계/비고 행이 섞인 fixture + 연도(12행)가 청크 경계에 걸리는 4년치 synthetic CSV
+        synthetic_path = synthetic.write_departure_csvs(
+            Path(self.path).parent / "synthetic", regions=1, countries=3, start_year=2010, years=4,
+        )["asia"]
+        for path in (self.path, synthetic_path):
+            expected = parse_departure_csv(path, "asia")
+            for chunksize in (1, 2, 7, 13, 50):
+                with self.subTest(path=Path(path).name, chunksize=chunksize):
+                    chunks = list(iter_departure_csv(path, "asia", chunksize))
+                    actual = pd.concat(chunks, ignore_index=True)
+                    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+    def test_base_region_only_unrolls_known_region_keys(self):
+        migration = importlib.import_module("main.migrations.0008_normalize_travelstat_region")
+        self.assertEqual(migration.base_region("asia" * 11), "asia")
+        self.assertEqual(migration.base_region("asia"), "asia")
+        self.assertEqual(migration.base_region("서울서울"), "서울서울")
+
+
+class DepartureCsvCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.files = synthetic.write_departure_csvs(f"{tmp.name}/csv", regions=2, countries=3, start_year=2020, years=2)
+        settings_override = override_settings(
+            **{f"{region.upper()}_CSV": self.files.get(region) for region in synthetic.REGIONS},
+            DEPARTURE_CACHE_ENABLED=True,
+            DEPARTURE_CACHE_DIR=f"{tmp.name}/feather",
+            SINGLEFLIGHT_LOCK_DIR=f"{tmp.name}/locks",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def load(self):
+        with mock.patch.object(
+            utils_csv_import, "load_regions", wraps=utils_csv_import.load_regions,
+        ) as parse:
+            df = utils_csv_import.load_all_departure_data(workers=1)[0]
+        return df, parse.called
+
+    @skipIf(utils_csv_cache.feather is None, "pyarrow 없음")
+    def test_cache_is_reused_until_csv_mtime_or_size_changes(self):
+        path = self.files["asia"]
+        expected, parsed = self.load()
+        self.assertTrue(parsed)
+
+        df, parsed = self.load()
+        self.assertFalse(parsed)
+        pd.testing.assert_frame_equal(df, expected)
+
+        # 내용은 그대로, mtime만 바뀜
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertTrue(self.load()[1])
+        self.assertFalse(self.load()[1])
+
+        # 크기만 바뀜 (빈 줄 추가, mtime은 되돌림 → 파싱 결과는 같음)
+        st = os.stat(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        df, parsed = self.load()
+        self.assertTrue(parsed)
+        pd.testing.assert_frame_equal(df, expected)
+
+        # 캐시를 쓰지 않는 호출(dry-run)은 쓰는 호출과 다른 single-flight 키
+        with mock.patch.object(utils_csv_import.singleflight, "do", wraps=singleflight.do) as do:
+            utils_csv_import.load_all_departure_data(workers=1)
+            utils_csv_import.load_all_departure_data(workers=1, write_cache=False)
+        self.assertEqual([c.args[0] for c in do.call_args_list], ["departures:1", "departures:0"])
+
+        # 예전 키의 캐시 폴더는 지워지고 현재 것 하나만 남는다
+        entries = [p for p in Path(settings.DEPARTURE_CACHE_DIR).iterdir() if not p.name.startswith(".")]
+        self.assertEqual([p.name for p in entries], [utils_csv_import.departure_data_key()])
+
+
+class LoadRegionsTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.files = synthetic.write_departure_csvs(tmp.name, regions=3, countries=3, start_year=2020, years=2)
+
+    def load(self, files, workers):
+        return utils_csv.load_regions(files, utils_csv.load_csv_trip_table, workers)
+
+    def assert_same_regions(self, actual, expected):
+        self.assertEqual([region for region, _ in actual], [region for region, _ in expected])
+        for (_, a), (_, b) in zip(actual, expected):
+            pd.testing.assert_frame_equal(a, b)
+
+    def test_process_pool_matches_serial(self):
+        self.assert_same_regions(self.load(self.files, workers=3), self.load(self.files, workers=1))
+
+    def test_failed_region_is_skipped_in_pool(self):
+        files = {**self.files, "europe": Path(self.files["europe"]).with_name("Missing.csv")}
+        loaded = self.load(files, workers=3)
+
+        self.assertEqual([region for region, _ in loaded], ["asia", "africa"])
+        self.assert_same_regions(loaded, [r for r in self.load(self.files, workers=1) if r[0] != "europe"])
+
+    def test_pool_failure_falls_back_to_serial(self):
+        with mock.patch.object(utils_csv, "ProcessPoolExecutor", side_effect=OSError("no fork")):
+            loaded = self.load(self.files, workers=3)
+        self.assert_same_regions(loaded, self.load(self.files, workers=1))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BulkUpsertTests(TestCase):
+
+    def upsert(self, rows, batch_size=2):
+        objs = [
+            TravelStat(region="asia", country=country, year=2020, month=1, departures=n)
+            for country, n in rows
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            return bulk_upsert(TravelStat, objs, ["region", "country", "year", "month"], ["departures"], batch_size)
+
+    def counts(self, stats):
+        return {k: stats[k] for k in ("rows", "inserted", "updated", "skipped")}
+
+    def test_counts_inserted_updated_and_skipped_rows(self):
+        first = self.upsert([("일본", 1), ("중국", 2), ("태국", 3)])
+        self.assertEqual(self.counts(first), {"rows": 3, "inserted": 3, "updated": 0, "skipped": 0})
+
+        # 같은 키가 두 번 나오면 마지막 값 (중국 2 → 5)
+        second = self.upsert([("일본", 1), ("중국", 9), ("중국", 5), ("태국", 3), ("미얀마", 4)])
+        self.assertEqual(self.counts(second), {"rows": 4, "inserted": 1, "updated": 1, "skipped": 2})
+        self.assertEqual(
+            dict(TravelStat.objects.values_list("country", "departures")),
+            {"일본": 1, "중국": 5, "태국": 3, "미얀마": 4},
+        )
+
+    def test_unchanged_resync_writes_nothing_and_keeps_version(self):
+        self.upsert([("일본", 1), ("중국", 2), ("태국", 3)])
+        version = response_cache.data_version()
+
+        with CaptureQueriesContext(connection) as ctx:
+            stats = self.upsert([("일본", 1), ("중국", 2), ("태국", 3)])
+
+        self.assertEqual(self.counts(stats), {"rows": 3, "inserted": 0, "updated": 0, "skipped": 3})
+        writes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+        self.assertEqual(writes, [])
+        self.assertEqual(response_cache.data_version(), version)
+
+    def test_merge_upsert_stats_sums_batches(self):
+        a = {"rows": 3, "inserted": 3, "updated": 0, "skipped": 0, "seconds": 0.5, "rows_per_sec": 6.0}
+        b = {"rows": 5, "inserted": 1, "updated": 2, "skipped": 2, "seconds": 1.5, "rows_per_sec": 3.3}
+
+        self.assertEqual(merge_upsert_stats(None, a), a)
+        self.assertIsNot(merge_upsert_stats(None, a), a)
+        self.assertEqual(
+            merge_upsert_stats(a, b),
+            {"rows": 8, "inserted": 4, "updated": 2, "skipped": 2, "seconds": 2.0, "rows_per_sec": 4.0},
+        )
+        zero = dict(a, seconds=0.0)
+        self.assertIsNone(merge_upsert_stats(zero, zero)["rows_per_sec"])
+
+
+class RegionKeyMigrationTests(TestCase):
+
+    def test_concatenated_regions_are_normalized_and_deduplicated(self):
+        TravelStat.objects.bulk_create([
+            TravelStat(year=2019, month=0, country="일본", region="asia" * 11, departures=100),
+            TravelStat(year=2019, month=0, country="중국", region="asia" * 11, departures=50),
+            TravelStat(year=2019, month=0, country="중국", region="asia", departures=55),
+            TravelStat(year=2019, month=0, country="이집트", region="africa" * 11, departures=7),
+        ])
+        migration = importlib.import_module("main.migrations.0008_normalize_travelstat_region")
+        migration.normalize_regions(apps, None)
+
+        self.assertEqual(
+            sorted(TravelStat.objects.values_list("region", "country", "departures")),
+            [("africa", "이집트", 7), ("asia", "일본", 100), ("asia", "중국", 55)],
+        )
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DepartureSummaryTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(response_cache._cache().clear)
+        # asia / europe 만 CSV가 있는 상태 (america 등은 CSV 없음 → 요약에서 빠짐)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.asia_csv = Path(tmp.name) / "Asia.csv"
+        self.asia_csv.write_text(FIXTURE_CSV, encoding="utf-8")
+        europe_csv = Path(tmp.name) / "Europe.csv"
+        europe_csv.write_text(FIXTURE_CSV, encoding="utf-8")
+        csv_files = {"asia": self.asia_csv, "europe": europe_csv}
+        settings_override = override_settings(
+            **{f"{region.upper()}_CSV": csv_files.get(region) for region in synthetic.REGIONS},
+            DEPARTURE_CACHE_ENABLED=False,
+            SINGLEFLIGHT_LOCK_DIR=f"{tmp.name}/locks",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def save_yearly(self, rows):
+        save_yearly_to_db(pd.DataFrame(rows, columns=["year", "country", "region", "departures"]))
+
+    def test_summaries_follow_yearly_travel_rows(self):
+        self.save_yearly([
+            (2019, "중국", "asia", 30), (2019, "일본", "asia", 70), (2019, "중국", "europe", 10),
+            (2020, "일본", "asia", 50), (2020, "필리핀", "asia", 50),
+        ])
+
+        self.assertEqual(
+            list(YearlyDepartureTotal.objects.values_list("year", "departures", "crime_departures")),
+            [(2019, 110, 40), (2020, 100, 50)],
+        )
+        self.assertEqual(CountryYearDeparture.objects.get(country="중국", year=2019).departures, 40)
+
+        # Asia 지역을 다시 저장 (2020년 일본만 바뀜) → 2020년 요약만 달라짐
+        self.save_yearly([
+            (2019, "중국", "asia", 30), (2019, "일본", "asia", 70),
+            (2020, "일본", "asia", 80), (2020, "필리핀", "asia", 50),
+        ])
+        self.assertEqual(
+            list(YearlyDepartureTotal.objects.values_list("year", "departures", "crime_departures")),
+            [(2019, 110, 40), (2020, 130, 50)],
+        )
+
+        data = self.client.get("/analysis/data/").json()
+        self.assertEqual(data["years"], [2019, 2020])
+        self.assertAlmostEqual(data["crime_ratio"][1], 50 / 130 * 100)
+
+    def test_resync_replaces_existing_yearly_rows_of_the_region(self):
+        # 예전 동기화가 남긴 행: 같은 키, 이번 CSV엔 없는 국가/연도, 다른 지역
+        TravelStat.objects.bulk_create([
+            TravelStat(year=2019, month=0, country="일본", region="asia", departures=999),
+            TravelStat(year=2019, month=0, country="몰디브", region="asia", departures=40),
+            TravelStat(year=2018, month=0, country="일본", region="asia", departures=60),
+            TravelStat(year=2019, month=0, country="미국", region="america", departures=5),
+        ])
+
+        stats = save_yearly_to_db(pd.DataFrame(
+            [(2019, "일본", "asia", 70), (2019, "중국", "asia", 30)],
+            columns=["year", "country", "region", "departures"],
+        ))
+
+        self.assertEqual(stats["deleted"], 2)
+        self.assertEqual(
+            sorted(TravelStat.objects.filter(month=0).values_list("region", "country", "year", "departures")),
+            [("america", "미국", 2019, 5), ("asia", "일본", 2019, 70), ("asia", "중국", 2019, 30)],
+        )
+        # 2019 = 이번 asia 합계 (CSV 없는 america 행은 빠짐), 2018 (더 이상 행 없음) 요약은 삭제
+        self.assertEqual(
+            list(YearlyDepartureTotal.objects.values_list("year", "departures", "crime_departures")),
+            [(2019, 100, 30)],
+        )
+
+    def test_analysis_data_matches_csv_result_with_orphaned_region_rows(self):
+        # America.csv 없이 예전 동기화가 남긴 행 (범죄국 포함)
+        TravelStat.objects.bulk_create([
+            TravelStat(year=2019, month=0, country="중국", region="america", departures=5_000),
+            TravelStat(year=2020, month=0, country="미국", region="america", departures=7_000),
+        ])
+        with override_settings(EUROPE_CSV=None):
+            df, _, _, crime_ratio, _ = utils_csv_import.load_all_departure_data(workers=1)
+            save_yearly_to_db(df)
+            data = self.client.get("/analysis/data/").json()
+
+            expected = crime_ratio[crime_ratio["year"].between(2018, 2025)]
+            self.assertEqual(data["years"], expected["year"].tolist())
+            for actual, (crime, total) in zip(
+                data["crime_ratio"], expected[["crime_country_total", "year_total"]].values.tolist(),
+            ):
+                self.assertAlmostEqual(actual, crime / total * 100)
+
+            # 마이그레이션 0009로 처음부터 다시 만들어도 같은 요약
+            before = list(YearlyDepartureTotal.objects.values_list("year", "departures", "crime_departures"))
+            importlib.import_module("main.migrations.0009_rebuild_departure_summaries") \
+                .rebuild_departure_summaries(apps, None)
+            self.assertEqual(
+                list(YearlyDepartureTotal.objects.values_list("year", "departures", "crime_departures")), before,
+            )
+
+    def test_monthly_rows_do_not_collide_with_yearly_rows(self):
+        self.save_yearly([(2020, "일본", "asia", 100)])
+        save_to_db(pd.DataFrame(
+            [(2020, m, "일본", "asia", m * 10) for m in (2, 3, 4)],
+            columns=["year", "month", "country", "region", "departures"],
+        ))
+
+        rows = TravelStat.objects.filter(country="일본", year=2020, month__range=(1, 12))
+        self.assertEqual(list(rows.values_list("month", "departures")), [(2, 20), (3, 30), (4, 40)])
+        self.assertEqual(TravelStat.objects.get(country="일본", year=2020, month=0).departures, 100)
+
+
+class DepartureSeriesTests(TestCase):
+
+    def monthly(self, rows):
+        return pd.DataFrame(rows, columns=["year", "month", "country", "region", "departures"])
+
+    def test_chunks_merge_into_one_packed_row(self):
+        utils_series.save_series_frame(self.monthly(
+            [(2020, m, "일본", "asia", m) for m in range(2, 13)]
+        ))
+        utils_series.save_series_frame(self.monthly(
+            [(2021, 2, "일본", "asia", 100), (2020, 12, "일본", "asia", 99)]
+        ))
+
+        series = DepartureSeries.objects.get()
+        values = utils_series.decode(series)
+        self.assertEqual((series.base_year, series.base_month, series.length), (2020, 2, 13))
+        self.assertEqual(values.dtype, utils_series.DTYPE)
+        self.assertFalse(values.flags.writeable)   # DB 버퍼를 그대로 가리킴 (복사 없음)
+        self.assertEqual(values.tolist(), list(range(2, 12)) + [99, utils_series.MISSING, 100])
+
+        window, first = utils_series.slice_range(series, (2020, 11), (2030, 1))
+        self.assertEqual((window.tolist(), first), ([11, 99, utils_series.MISSING, 100], (2020, 11)))
+        self.assertEqual(utils_series.yearly_totals(series, 2019, 2021).tolist(), [0, 164, 100])
+
+    def test_append_months_extends_before_and_after(self):
+        utils_series.append_months("asia", "중국", 2020, 6, [1, 2])
+        series = utils_series.append_months("asia", "중국", 2020, 3, [5])
+        series = utils_series.append_months("asia", "중국", 2020, 9, [7])
+
+        self.assertEqual((series.base_year, series.base_month), (2020, 3))
+        self.assertEqual(
+            utils_series.decode(series).tolist(),
+            [5, -1, -1, 1, 2, -1, 7],
+        )
+
+
+class DepartureCubeTests(SimpleTestCase):
+
+    def setUp(self):
+        cube_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cube_dir.cleanup)
+        settings_override = override_settings(DEPARTURE_CUBE_DIR=cube_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def monthly(self, rows):
+        return pd.DataFrame(rows, columns=["year", "month", "country", "region", "departures"])
+
+    def test_empty_input_keeps_existing_cube(self):
+        self.assertIsNone(utils_cube.build_cube(self.monthly([])))
+        self.assertIsNone(utils_cube.write_cube(self.monthly([(2020, 0, "중국", "asia", 10)])))
+        self.assertIsNone(utils_cube.open_cube())
+
+        utils_cube.write_cube(self.monthly([(2020, 2, "중국", "asia", 10)]))
+        empty = self.monthly([])
+        with mock.patch.object(utils_cube, "load_regions", return_value=[("asia", empty)]):
+            self.assertIsNone(utils_cube.write_cube_from_csv())
+        self.assertEqual(utils_cube.open_cube().yearly_totals().tolist(), [10])
+
+    def test_workers_share_read_only_cube_and_see_swaps(self):
+        self.assertIsNone(utils_cube.open_cube())
+
+        utils_cube.write_cube(self.monthly([
+            (2020, 2, "중국", "asia", 10), (2020, 3, "중국", "asia", 5),
+            (2021, 2, "중국", "europe", 1), (2021, 2, "프랑스", "europe", 7),
+        ]))
+        cube = utils_cube.open_cube()
+
+        self.assertIsInstance(cube.data, np.memmap)
+        self.assertFalse(cube.data.flags.writeable)
+        self.assertIs(utils_cube.open_cube(), cube)   # 포인터가 그대로면 다시 열지 않음
+        self.assertEqual(cube.years, [2020, 2021])
+        self.assertEqual(cube.region_countries("europe"), ["중국", "프랑스"])
+        self.assertEqual(cube.monthly("중국")[:, 1].tolist(), [10, 1])
+        self.assertEqual(cube.yearly_totals().tolist(), [15, 8])
+        self.assertEqual(cube.yearly_totals(["중국", "없는나라"]).tolist(), [15, 1])
+
+        utils_cube.write_cube(self.monthly([(2022, 5, "중국", "asia", 3)]))
+        swapped = utils_cube.open_cube()
+
+        self.assertNotEqual(swapped.file, cube.file)
+        self.assertEqual(swapped.yearly_totals().tolist(), [3])
+        self.assertEqual(cube.yearly_totals().tolist(), [15, 8])   # 예전 memmap은 그대로 읽힘
+
+    def test_ratio_endpoint_uses_prefix_sums(self):
+        utils_cube.write_cube(self.monthly([
+            (2019, 12, "캄보디아", "asia", 4),
+            (2020, 2, "캄보디아", "asia", 10), (2020, 3, "미얀마", "asia", 10),
+            (2020, 2, "일본", "asia", 80), (2021, 5, "일본", "asia", 50),
+            (2021, 6, "미얀마", "asia", 50),
+        ]))
+
+        res = self.client.get("/analysis/ratio/", {"countries": "캄보디아,미얀마,없는나라", "from": 2020, "to": 2030})
+        body = res.json()
+        self.assertEqual(body["periods"], [2020, 2021])
+        self.assertEqual(body["selected_total"], [20, 50])
+        self.assertEqual(body["all_total"], [100, 100])
+        self.assertEqual(body["ratio_percent"], [20.0, 50.0])
+        self.assertEqual(body["unknown_countries"], ["없는나라"])
+
+        monthly = self.client.get("/analysis/ratio/", {"countries": "미얀마", "from": 2021, "to": 2021, "by": "month"}).json()
+        self.assertEqual(len(monthly["periods"]), 12)
+        self.assertEqual(monthly["periods"][5], "2021-06")
+        self.assertEqual(monthly["selected_total"][5], 50)
+
+        self.assertEqual(self.client.get("/analysis/ratio/", {"from": "abc"}).status_code, 400)
+
+    def test_ratio_endpoint_counts_duplicate_countries_once(self):
+        utils_cube.write_cube(self.monthly([
+            (2021, 6, "미얀마", "asia", 50), (2021, 5, "일본", "asia", 50),
+        ]))
+        once = self.client.get("/analysis/ratio/", {"countries": "미얀마", "from": 2021, "to": 2021}).json()
+        repeated = self.client.get(
+            "/analysis/ratio/", {"countries": "미얀마,미얀마, 미얀마", "from": 2021, "to": 2021},
+        ).json()
+
+        self.assertEqual(repeated["countries"], ["미얀마"])
+        self.assertEqual(repeated["selected_total"], once["selected_total"])
+        self.assertEqual(repeated["ratio_percent"], once["ratio_percent"])
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEPARTURE_CACHE_ENABLED=False)
+class IngestCommandTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        files = synthetic.write_departure_csvs(f"{tmp.name}/csv", regions=2, countries=3, start_year=2020, years=2)
+        settings_override = override_settings(
+            **{f"{region.upper()}_CSV": files.get(region) for region in synthetic.REGIONS},
+            API_CACHE_DIR=f"{tmp.name}/api",
+            DEPARTURE_CUBE_DIR=f"{tmp.name}/cube",
+            DEPARTURE_CACHE_ENABLED=True,
+            DEPARTURE_CACHE_DIR=f"{tmp.name}/feather",
+            SINGLEFLIGHT_LOCK_DIR=f"{tmp.name}/locks",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.feather_dir = Path(tmp.name) / "feather"
+
+    def ingest(self, *args):
+        out = StringIO()
+        call_command("ingest", *args, stdout=out)
+        return out.getvalue()
+
+    def test_departures_dry_run_then_full_then_incremental(self):
+        output = self.ingest("departures", "--dry-run", "--batch-size", "2")
+        self.assertIn("dry-run", output)
+        self.assertIn("TravelStat               insert 12", output)
+        self.assertFalse(TravelStat.objects.exists())
+        self.assertIsNone(utils_cube.open_cube())
+        self.assertFalse(self.feather_dir.exists())   # dry-run 은 CSV 캐시도 쓰지 않음
+
+        self.ingest("departures", "--workers", "1")
+        self.assertEqual(TravelStat.objects.filter(month=0).count(), 12)
+        self.assertEqual(YearlyDepartureTotal.objects.count(), 2)
+        self.assertIsNotNone(utils_cube.open_cube())
+
+        with self.assertNumQueries(1):
+            output = self.ingest("departures", "--incremental")
+        self.assertIn("결과: unchanged", output)
+
+    @override_settings(DEPARTURE_MONTHLY_STORAGE="both", DEPARTURE_CSV_CHUNK_ROWS=5)
+    def test_departures_monthly_streams_rows_and_series(self):
+        self.ingest("departures", "--monthly", "--dry-run")
+        self.assertFalse(TravelStat.objects.exists())
+        self.assertFalse(DepartureSeries.objects.exists())
+
+        self.ingest("departures", "--monthly")
+        # 2개 지역 × 3개국 × 2년 × 11개월 (연도 행 = 1월은 파서가 건너뜀)
+        self.assertEqual(TravelStat.objects.filter(month__gte=1).count(), 2 * 3 * 2 * 11)
+        self.assertEqual(DepartureSeries.objects.count(), 2 * 3)
+        self.assertEqual(TravelStat.objects.filter(month=0).count(), 12)
+
+    @override_settings(DEPARTURE_MONTHLY_STORAGE="rows")
+    def test_incremental_monthly_after_yearly_only_ingest(self):
+        self.ingest("departures")
+        self.assertFalse(TravelStat.objects.filter(month__gte=1).exists())
+
+        # 연도 합계만 저장한 지문으로는 월별 저장을 건너뛰면 안 됨
+        output = self.ingest("departures", "--incremental", "--monthly")
+        self.assertNotIn("결과: unchanged", output)
+        self.assertEqual(TravelStat.objects.filter(month__gte=1).count(), 2 * 3 * 2 * 11)
+
+        self.assertIn("결과: unchanged", self.ingest("departures", "--incremental", "--monthly"))
+        self.assertIn("결과: unchanged", self.ingest("departures", "--incremental"))
+        with override_settings(DEPARTURE_MONTHLY_STORAGE="series"):
+            self.assertNotIn("결과: unchanged", self.ingest("departures", "--incremental", "--monthly"))
+
+    def test_cyber_dry_run_leaves_db_and_digest_untouched(self):
+        rows = synthetic.cyber_scam_rows(2020, 2)
+        with mock.patch.object(api_client, "fetch_all_cyber_scam", return_value=rows):
+            output = self.ingest("cyber", "--dry-run")
+            self.assertIn("CyberScamStat            insert 4", output)
+            self.assertFalse(CyberScamStat.objects.exists())
+
+            # dry-run 이 응답 해시를 남겼다면 여기서 "변경 없음"으로 건너뛰었을 것
+            self.ingest("cyber", "--incremental")
+            self.assertEqual(CyberScamStat.objects.count(), 4)
+
+            self.assertIn("결과: unchanged", self.ingest("cyber", "--incremental"))
+            self.assertIn("skip 4", self.ingest("cyber"))
+
+    def test_workers_and_batch_size_are_passed_as_arguments(self):
+        rows = synthetic.cyber_scam_rows(2020, 2)
+        with mock.patch.object(api_client, "fetch_all_cyber_scam", return_value=rows) as fetch, \
+                mock.patch.object(api_client, "bulk_upsert", wraps=api_client.bulk_upsert) as upsert:
+            self.ingest("cyber", "--workers", "3", "--batch-size", "1")
+
+        self.assertEqual(fetch.call_args.kwargs["max_workers"], 3)
+        self.assertEqual(upsert.call_args.kwargs["batch_size"], 1)
+        self.assertEqual(CyberScamStat.objects.count(), 4)
+
+class SyntheticDataTests(SimpleTestCase):
+
+    def test_generated_csv_matches_departure_layout(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = synthetic.write_departure_csvs(tmp, regions=2, countries=4, start_year=2010, years=3)
+            df = parse_departure_csv(files["europe"], "europe")
+
+        self.assertEqual(list(files), ["asia", "europe"])
+        self.assertEqual(df["country"].unique().tolist(), [f"europe국가{i:03d}" for i in range(4)])
+        self.assertEqual(sorted(df["year"].unique().tolist()), [2010, 2011, 2012])
+        # 연도 행(1월)은 기존 파서처럼 건너뛰므로 연도당 11개월
+        self.assertEqual(len(df), 3 * 11 * 4)
+
+        cyber = api_client.parse_cyber_scam_rows(synthetic.cyber_scam_rows(2010, 3))
+        voice = api_client.parse_voice_phishing_rows(synthetic.voice_phishing_rows(2010, 3))
+        self.assertEqual((len(cyber), len(voice)), (6, 36))
@@ -0,0 +1,179 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+import pandas as pd
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import api_client, response_cache, synthetic, urls, views
+from .models import SyncJob
+from .utils_csv import load_regions, parse_departure_csv, save_to_db
+from .utils_csv_import import load_and_aggregate_csv, save_yearly_to_db
+from .utils_cube import write_cube
+
+
+# =========================
+# 라우트별 성능 예산: (최대 쿼리 수, 최대 응답 시간(초))
+#   - 키는 main/urls.py 의 path 문자열
+#   - 라우트를 새로 추가하면 여기에도 예산을 넣어야 테스트가 통과한다
+#   - 분석 API는 응답 캐시를 비운 상태(콜드)에서 잰다
+#   - 응답 시간은 PERF_LATENCY_SCALE 을 줬을 때만 검사 (아래 참고)
+# =========================
+BUDGETS = {
+    "": (0, 0.5),
+    "test/keys/": (0, 0.2),
+    # 오래 대기한 작업 정리(UPDATE) + 진행 중 작업 조회 + 등록
+    "sync/cyber/": (3, 0.3),
+    "sync/voice/": (3, 0.3),
+    "sync/travel/": (3, 0.3),
+    "sync/voiceall/": (3, 0.3),
+    "test/cyber/": (0, 0.2),
+    "test/voice/": (0, 0.2),
+    "debug/travel/": (4, 0.5),
+    "debug/perf/": (0, 0.2),
+    # 모델별 행 수 gauge: 모델당 COUNT 한 번
+    "metrics": (7, 0.2),
+    "debug/api/": (0, 0.2),
+    "sync/jobs/<int:job_id>/": (1, 0.2),
+    # 분석 API: 데이터 버전 조회 1 + 분석 쿼리
+    "analysis/data/": (4, 0.3),
+    "analysis/": (0, 0.5),
+    "analysis/step3/": (3, 0.3),
+    "analysis/ratio/": (0, 0.3),
+}
+
+# 시간 측정은 가장 빠른 값 기준 (CI 기계의 일시적인 지연으로 깨지지 않도록)
+TIMING_RUNS = 3
+
+# 응답 시간 예산 배율. 쿼리 수 예산은 항상 검사하고, 시간 예산은 이 값을 줬을 때만 검사한다
+#   PERF_LATENCY_SCALE=1  → 위 예산 그대로 (성능 측정용 기계)
+#   PERF_LATENCY_SCALE=3  → 느린 CI 기계에서 3배까지 허용
+#   없음 / 0              → 시간은 검사하지 않음 (공유 러너에서 깨지지 않도록)
+LATENCY_SCALE = float(os.getenv("PERF_LATENCY_SCALE", "0") or 0)
+
+# 예산 초과 시 실패 메시지에 보여 줄 쿼리 수
+MAX_LISTED_QUERIES = 30
+
+PERF_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "analysis": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "perf-tests"},
+}
+
+
+def route_paths():
+    return [str(p.pattern) for p in urls.urlpatterns if isinstance(p, URLPattern)]
+
+
+def format_queries(queries):
+    """쿼리별 소요시간 + SQL (느린 순)"""
+    lines = []
+    ordered = sorted(queries, key=lambda q: float(q.get("time") or 0), reverse=True)
+    for i, q in enumerate(ordered[:MAX_LISTED_QUERIES], 1):
+        lines.append(f"  {i:>2}. {float(q.get('time') or 0) * 1000:7.2f}ms  {q['sql']}")
+    if len(queries) > MAX_LISTED_QUERIES:
+        lines.append(f"  ... 외 {len(queries) - MAX_LISTED_QUERIES}개")
+    return "\n".join(lines)
+
+
+@override_settings(CACHES=PERF_CACHES, SYNC_JOB_MODE="command")
+class EndpointBudgetTests(TestCase):
+    """
+    fixture DB(합성 출국 CSV 2개 지역 × 15개국 × 6년 + 사이버사기 + 보이스피싱)를 깔고
+    main/urls.py 의 모든 라우트를 예산 안에서 응답하는지 확인한다.
+    N+1 쿼리나 행 단위 update_or_create 가 뷰로 다시 들어오면 쿼리 수에서 걸린다.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        files = synthetic.write_departure_csvs(cls.tmp.name, regions=2, countries=15, start_year=2018, years=6)
+
+        monthly = pd.concat([df for _, df in load_regions(files, parse_departure_csv, workers=1)])
+        yearly = pd.concat([df for _, df in load_regions(files, load_and_aggregate_csv, workers=1)])
+        save_to_db(monthly)
+        save_yearly_to_db(yearly)
+
+        api_client.upsert_cyber_scam(api_client.parse_cyber_scam_rows(synthetic.cyber_scam_rows(2018, 6)))
+        voice = api_client.parse_voice_phishing_rows(synthetic.voice_phishing_rows(2018, 6))
+        api_client.upsert_voice_phishing(voice)
+        api_client.refresh_voice_yearly({o.year for o in voice})
+
+        cls.job = SyncJob.objects.create(kind="cyber")
+        cls.monthly = monthly
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        cube_dir = tempfile.TemporaryDirectory()
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cube_dir.cleanup)
+        self.addCleanup(lock_dir.cleanup)
+        settings_override = override_settings(
+            DEPARTURE_CUBE_DIR=cube_dir.name, SINGLEFLIGHT_LOCK_DIR=lock_dir.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        write_cube(self.monthly)
+
+        # 업스트림 API는 부르지 않는다
+        for target, name in ((views, "fetch_cyber_scam"), (api_client, "fetch_voice_phishing")):
+            patcher = mock.patch.object(target, name, return_value=[])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def url_for(self, path):
+        if path == "sync/jobs/<int:job_id>/":
+            return reverse("sync_job_status", args=[self.job.pk])
+        return "/" + path
+
+    def measure(self, url):
+        """(첫 요청의 쿼리 목록, 응답, 가장 빠른 응답 시간)"""
+        best = None
+        captured = None
+        for _ in range(TIMING_RUNS if LATENCY_SCALE > 0 else 1):
+            response_cache._cache().clear()
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                res = self.client.get(url)
+                elapsed = time.perf_counter() - start
+            if captured is None:
+                captured = list(ctx.captured_queries)
+                first_res = res
+            best = elapsed if best is None else min(best, elapsed)
+
+            # 같은 종류 작업에 합류하지 않도록 매번 새로 등록되게 한다
+            SyncJob.objects.exclude(pk=self.job.pk).delete()
+        return captured, first_res, best
+
+    def test_every_route_has_a_budget(self):
+        self.assertEqual(sorted(route_paths()), sorted(BUDGETS))
+
+    def test_routes_stay_within_budget(self):
+        for path in route_paths():
+            if path not in BUDGETS:
+                continue
+            max_queries, max_seconds = BUDGETS[path]
+            url = self.url_for(path)
+
+            with self.subTest(route=url):
+                queries, res, seconds = self.measure(url)
+
+                self.assertLess(res.status_code, 400, f"{url} → HTTP {res.status_code}")
+                self.assertLessEqual(
+                    len(queries), max_queries,
+                    f"{url}: 쿼리 {len(queries)}개 (예산 {max_queries}개)\n{format_queries(queries)}",
+                )
+                if LATENCY_SCALE > 0:
+                    budget = max_seconds * LATENCY_SCALE
+                    self.assertLessEqual(
+                        seconds, budget,
+                        f"{url}: {seconds * 1000:.1f}ms (예산 {budget * 1000:.0f}ms), "
+                        f"쿼리 {len(queries)}개\n{format_queries(queries)}",
+                    )
@@ -24,12 +24,27 @@ urlpatterns = [
 
     path("debug/travel/", views.travel_debug_view, name="travel_debug"),
 
+    # 요청 프로파일링 결과 (PERF_PROFILING_ENABLED=1 일 때 기록)
+    path("debug/perf/", views.perf_debug_view, name="perf_debug"),
+
+    # 파이프라인 메트릭 (Prometheus 기본 경로 그대로, 끝 슬래시 없음)
+    path("metrics", views.metrics_view, name="metrics"),
+
+    # 업스트림 API 호출 비용 (지연시간 / 재시도)
+    path("debug/api/", views.api_stats_view, name="api_stats"),
+
     path("sync/voiceall/", views.sync_voice_yearly_view, name="sync_voiceall"),
 
+    # 동기화 작업 상태 (sync/* 가 돌려준 job_id)
+    path("sync/jobs/<int:job_id>/", views.sync_job_status_view, name="sync_job_status"),
+
     path("analysis/data/", views.get_analysis_data, name="analysis_data"),
 
     path("analysis/", views.analysis_view, name="analysis"),
 
     path("analysis/step3/", views.step3_radial_data),
 
+    # 임의 국가 묶음 / 기간의 출국자 비율 (?countries=...&from=&to=&by=year|month)
+    path("analysis/ratio/", views.analysis_ratio_view, name="analysis_ratio"),
+
 ]
\ No newline at end of file
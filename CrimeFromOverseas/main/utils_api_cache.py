@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from . import singleflight
+
+
+# -----------------------------
+# ✔ 업스트림 API 응답 디스크 캐시
+#   - TTL 안이면 HTTP 요청 없이 저장된 본문 사용
+#   - TTL이 지나면 ETag / Last-Modified 로 조건부 요청 (304면 본문 재사용)
+# -----------------------------
+def cache_enabled():
+    return getattr(settings, "API_CACHE_ENABLED", True)
+
+
+def _cache_root():
+    return Path(settings.API_CACHE_DIR)
+
+
+def cache_key(url, page, per_page):
+    """serviceKey는 빼고 (url, page, perPage) 로만 키를 만든다"""
+    raw = json.dumps([url, page, per_page]).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def _write_json(path, data):
+    """임시 파일에 쓰고 rename → 동시에 읽는 쪽이 깨진 파일을 보지 않음"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}-", dir=path.parent)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def load_entry(key):
+    if not cache_enabled():
+        return None
+    return _read_json(_cache_root() / "responses" / f"{key}.json")
+
+
+def save_entry(key, body, etag=None, last_modified=None):
+    if not cache_enabled():
+        return
+    _write_json(_cache_root() / "responses" / f"{key}.json", {
+        "fetched_at": time.time(),
+        "etag": etag,
+        "last_modified": last_modified,
+        "body": body,
+    })
+
+
+def touch_entry(key, entry):
+    """304 Not Modified → 본문은 그대로 두고 TTL만 갱신"""
+    save_entry(key, entry["body"], entry.get("etag"), entry.get("last_modified"))
+
+
+def is_fresh(entry):
+    return time.time() - entry.get("fetched_at", 0) < settings.API_CACHE_TTL
+
+
+def conditional_headers(entry):
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+# -----------------------------
+# ✔ 동기화 단축: 지난 동기화 때와 응답 내용이 같으면 DB 작업 생략
+# -----------------------------
+def payload_digest(rows):
+    raw = json.dumps(rows, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def load_sync_digest(source):
+    if not cache_enabled():
+        return None
+    state = _read_json(_cache_root() / "sync_digests.json") or {}
+    return state.get(source)
+
+
+def save_sync_digest(source, digest):
+    if not cache_enabled():
+        return
+    path = _cache_root() / "sync_digests.json"
+    # 여러 소스가 한 파일을 같이 쓰므로 읽기-수정-쓰기 사이에 다른 소스의 저장이 끼면 덮어써짐
+    with singleflight.file_lock("sync-digests"):
+        state = _read_json(path) or {}
+        state[source] = digest
+        _write_json(path, state)
@@ -1,6 +1,14 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+import numpy as np
 import pandas as pd
 from django.conf import settings
+from . import metrics
 from .models import TravelStat
+from .utils_db import bulk_upsert, merge_upsert_stats
+from .utils_series import save_series_frame
 
 def clean_num(x):
     if pd.isna(x):
@@ -14,83 +22,176 @@ def clean_num(x):
         return 0
 
 
-def load_csv_trip_table(path, region_name):
-    df = pd.read_csv(path, header=None, encoding="utf-8-sig")
+_NUM_JUNK = str.maketrans("", "", ",%")
 
-    # 1행 = 국가명, 2행 = 명수/전년대비
-    header_country = df.iloc[1]   # 국가명 한글/영문 페어
-    header_type = df.iloc[2]      # 명수/전년대비
 
-    n_cols = df.shape[1]
+def clean_num_array(values):
+    """
+    clean_num()의 벡터화 버전.
+    문자열/NaN 배열을 한 번에 int64 배열로 변환한다.
+    (쉼표·% 제거, 빈칸/"-"/변환 실패 → 0, 소수점 이하는 버림)
+    """
+    cells = np.asarray(values, dtype=object).ravel()
+    out = np.zeros(len(cells), dtype="int64")
 
-    # ★ 국가명 & 명수열만 추출하는 규칙 ★
-    country_cols = []  # (열번호, 국가명)
+    # 빈 셀(NaN)이 대부분이라 값이 있는 셀만 문자열 처리
+    filled = pd.notna(cells)
+    s = pd.Series(cells[filled], dtype=object).str.translate(_NUM_JUNK)
 
-    for col in range(3, n_cols):
-        col_type = str(header_type[col]).strip()
-        col_country = str(header_country[col]).strip()
+    # 앞뒤 공백은 to_numeric이 알아서 무시한다
+    nums = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64")
+    out[filled] = np.where(np.isfinite(nums), np.trunc(nums), 0)
+    return out
 
-        # 명수 열만 선택 (전년대비 제외)
-        if col_type != "명수":
-            continue
 
-        # 국가명은 한글/영문 페어 중 “한글쪽”만 이름으로 사용
-        # 예: 4열=일본 / 5열=Japan → 우리는 4열의 "일본" 사용
-        country_name = col_country
-        if country_name.lower() == "nan" or country_name == "":
-            continue
+def _digits(s):
+    """문자열 Series에서 숫자만 남긴다. ("2004년" → "2004")"""
+    return s.str.replace(r"\D", "", regex=True)
 
-        country_cols.append((col, country_name))
 
-    print(f"[{region_name}] 감지된 국가 수: {len(country_cols)}")
-    print(f"[{region_name}] 국가 리스트 앞 10개:", country_cols[:10])
+def detect_country_columns(header, region_name):
+    """
+    CSV 상단 3행(header=None 기준 0~2행)에서 국가별 "명수" 열을 찾는다.
+      - 1행: 국가명 (한글/영문 페어), 2행: 명수/전년대비
 
-    output_rows = []
-    current_year = None
+    반환: (열 번호 배열, 국가명 배열)
+    """
+    header_country = header.iloc[1].fillna("").astype(str).str.strip()
+    header_type = header.iloc[2].fillna("").astype(str).str.strip()
 
-    # 실제 데이터는 3행부터 시작
-    for idx, row in df.iloc[3:].iterrows():
-        year_cell = str(row.iloc[0]).strip()
-        month_cell = str(row.iloc[1]).strip()
+    # ★ 국가명 & 명수열만 추출 (한글/영문 페어 중 "명수" 쪽 = 한글 국가명) ★
+    col_mask = (
+        (np.arange(header.shape[1]) >= 3)
+        & (header_type == "명수").to_numpy()
+        & (header_country != "").to_numpy()
+        & (header_country.str.lower() != "nan").to_numpy()
+    )
+    country_idx = np.flatnonzero(col_mask)
+    country_names = header_country.to_numpy(dtype=object)[country_idx]
 
-        # 연도 행
-        if year_cell.endswith("년"):
-            digits = "".join([c for c in year_cell if c.isdigit()])
-            if digits:
-                current_year = int(digits)
-            continue
+    print(f"[{region_name}] 감지된 국가 수: {len(country_idx)}")
+    return country_idx, country_names
 
-        if current_year is None:
-            continue
 
-        # 월 행
-        if not month_cell.endswith("월"):
-            continue
+def parse_departure_rows(body, country_idx, country_names, region_name):
+    """
+    데이터 행(3행~)을 월 단위 long-form DataFrame으로 변환.
+    body의 컬럼 라벨은 원본 CSV의 열 번호 (0열 연도, 1열 월, country_idx 국가 열).
 
-        month_digits = "".join([c for c in month_cell if c.isdigit()])
-        if not month_digits:
-            continue
+    반환 columns: [year, month, country, region, departures]
+    행 순서는 (시트의 행 순서 → 국가 열 순서) 로 기존 iterrows 구현과 동일하다.
+    """
+    df, _ = _parse_rows(body, country_idx, country_names, region_name)
+    return df
+
+
+def _parse_rows(body, country_idx, country_names, region_name, start_year=None):
+    """
+    parse_departure_rows 본체.
+    start_year: 이전 청크의 마지막 연도 (청크 첫 행들이 이 연도에 속함)
+    반환: (DataFrame, 이 청크 끝의 연도)
+    """
+    year_cell = body[0].fillna("").astype(str).str.strip()
+    month_cell = body[1].fillna("").astype(str).str.strip()
+
+    # 연도 행: "년"으로 끝나는 행에서 연도를 읽고 아래로 forward-fill
+    # (연도 행 자체는 건너뛰므로 연도 행에 같이 적힌 1월 값은 기존 구현처럼 제외된다)
+    is_year = year_cell.str.endswith("년")
+    year_digits = _digits(year_cell)
+    current_year = pd.to_numeric(
+        year_digits.where(is_year & (year_digits != "")), errors="coerce"
+    ).ffill()
+    if start_year is not None:
+        current_year = current_year.fillna(start_year)
+
+    # 월 행: "월"로 끝나고 숫자가 있으며, 앞에서 연도가 한 번이라도 나온 행
+    month_digits = _digits(month_cell)
+    is_month = (
+        ~is_year
+        & current_year.notna()
+        & month_cell.str.endswith("월")
+        & (month_digits != "")
+    ).to_numpy()
 
-        month = int(month_digits)
+    years = current_year.to_numpy()[is_month].astype("int64")
+    months = pd.to_numeric(month_digits[is_month]).to_numpy().astype("int64")
 
-        # 국가별 명수 추출
-        for col, country_name in country_cols:
-            raw_val = row.iloc[col]
-            departures = clean_num(raw_val)
+    # 명수 열만 한 번에 잘라서 (행 → 국가) 순서로 펼친다 (melt)
+    values = body[list(country_idx)].to_numpy(dtype=object)[is_month]
+    n_countries = len(country_idx)
 
-            output_rows.append({
-                "year": current_year,
-                "month": month,
-                "country": country_name,
-                "region": region_name,
-                "departures": departures
-            })
+    df = pd.DataFrame({
+        "year": np.repeat(years, n_countries),
+        "month": np.repeat(months, n_countries),
+        "country": np.tile(country_names, len(years)),
+        "region": region_name,
+        "departures": clean_num_array(values),
+    })
 
-    return pd.DataFrame(output_rows)
+    end_year = current_year.iloc[-1] if len(current_year) else np.nan
+    return df, (start_year if pd.isna(end_year) else int(end_year))
+
+
+def parse_departure_csv(path, region_name):
+    """
+    출국 통계 CSV 한 개를 읽어 월 단위 long-form DataFrame으로 반환.
+    상단 3행으로 국가 "명수" 열을 먼저 고른 뒤, 본문은 연도/월 + 그 열들만 읽는다.
+    """
+    header = pd.read_csv(path, header=None, nrows=3, encoding="utf-8-sig", dtype=str)
+    country_idx, country_names = detect_country_columns(header, region_name)
+
+    body = pd.read_csv(
+        path,
+        header=None,
+        skiprows=3,
+        usecols=[0, 1, *country_idx],
+        encoding="utf-8-sig",
+        dtype=str,
+    )
+    return parse_departure_rows(body, country_idx, country_names, region_name)
+
+
+def iter_departure_csv(path, region_name, chunksize=None):
+    """
+    parse_departure_csv의 스트리밍 버전.
+    헤더 3행은 한 번만 읽고, 본문은 chunksize 행씩 읽어서 월 단위 long-form 청크를 yield.
+    청크 경계에 걸린 연도는 다음 청크로 이어서 넘겨준다.
+    전체 결과를 한 번에 만들지 않으므로 메모리는 청크 크기에만 비례한다.
+    """
+    if chunksize is None:
+        chunksize = settings.DEPARTURE_CSV_CHUNK_ROWS
+
+    header = pd.read_csv(path, header=None, nrows=3, encoding="utf-8-sig", dtype=str)
+    country_idx, country_names = detect_country_columns(header, region_name)
+
+    reader = pd.read_csv(
+        path,
+        header=None,
+        skiprows=3,
+        usecols=[0, 1, *country_idx],
+        encoding="utf-8-sig",
+        dtype=str,
+        chunksize=chunksize,
+    )
+
+    current_year = None
+    with reader:
+        for body in reader:
+            df, current_year = _parse_rows(
+                body, country_idx, country_names, region_name, start_year=current_year
+            )
+            if len(df):
+                yield df
+
+
+def load_csv_trip_table(path, region_name):
+    """월 단위 출국 테이블 (columns: year, month, country, region, departures)"""
+    return parse_departure_csv(path, region_name)
 
 
-def load_all_departure_data():
-    files = {
+def departure_csv_files():
+    """{region: CSV 경로} — settings.*_CSV"""
+    return {
         "asia": settings.ASIA_CSV,
         "europe": settings.EUROPE_CSV,
         "africa": settings.AFRICA_CSV,
@@ -98,16 +199,74 @@ def load_all_departure_data():
         "oceania": settings.OCEANIA_CSV,
     }
 
+
+def csv_regions():
+    """CSV 파일이 실제로 있는 지역 (요약 테이블은 이 지역들의 연도 합계만 더한다)"""
+    return [region for region, path in departure_csv_files().items() if path and Path(path).exists()]
+
+
+def _load_region(loader, path, region):
+    """워커에서 한 지역을 로드. 예외는 밖으로 던지지 않고 (df, error)로 돌려준다."""
+    print(f"=== {region.upper()} CSV 로드 시작 ===")
+    try:
+        return loader(path, region), None
+    except Exception as e:
+        return None, e
+
+
+def load_regions(files, loader, workers=None):
+    """
+    files: {region: path}, loader: (path, region) -> DataFrame
+    workers: None이면 settings.DEPARTURE_LOAD_WORKERS, 1 이하면 직렬 처리 (디버깅용)
+
+    지역별 실패는 경고만 찍고 건너뛰며, 결과는 항상 files 순서대로 [(region, df)] 로 반환.
+    """
+    with metrics.STAGE_SECONDS.time(stage="csv_load"):
+        results = _load_regions(files, loader, workers)
+
     outputs = []
+    for region, df, error in results:
+        if error is not None:
+            print(f"⚠ {region} CSV 로드 실패 → {error}")
+            continue
+        metrics.ROWS_PARSED.inc(len(df), source=f"departure_csv:{region}")
+        outputs.append((region, df))
+    return outputs
 
-    for region, path in files.items():
-        print(f"=== {region.upper()} CSV 로드 시작 ===")
+
+def _load_regions(files, loader, workers):
+    """[(region, df, error)] — workers 가 2 이상이면 프로세스 풀, 실패하면 직렬로 다시"""
+    if workers is None:
+        workers = getattr(settings, "DEPARTURE_LOAD_WORKERS", 1)
+    workers = min(workers, len(files))
+
+    if workers > 1:
         try:
-            df = load_csv_trip_table(path, region)
-            print(df.head())
-            outputs.append(df)
+            # spawn 방식 플랫폼에서도 models import가 되도록 워커마다 django.setup()
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                futures = [
+                    (region, pool.submit(_load_region, loader, path, region))
+                    for region, path in files.items()
+                ]
+                results = [(region, *future.result()) for region, future in futures]
         except Exception as e:
-            print(f"⚠ {region} CSV 로드 실패 → {e}")
+            print(f"⚠ 병렬 CSV 로드 실패, 직렬로 다시 시도 → {e}")
+            workers = 1
+
+    if workers <= 1:
+        results = [
+            (region, *_load_region(loader, path, region))
+            for region, path in files.items()
+        ]
+    return results
+
+
+def load_all_departure_data(workers=None):
+    outputs = []
+
+    for region, df in load_regions(departure_csv_files(), load_csv_trip_table, workers):
+        print(df.head())
+        outputs.append(df)
 
     if not outputs:
         print("❌ CSV 데이터 없음")
@@ -115,16 +274,61 @@ def load_all_departure_data():
 
     return pd.concat(outputs, ignore_index=True)
 
-def save_to_db(df):
-    count = 0
-    for _, row in df.iterrows():
-        TravelStat.objects.update_or_create(
-            year=row["year"],
-            month=row["month"],
-            country=row["country"],
-            region=row["region"],
-            defaults={"departures": row["departures"]},
+
+def stream_csv_to_db(path, region_name, chunksize=None, batch_size=None):
+    """
+    CSV를 청크 단위로 파싱하면서 바로 DB에 저장 (전체 DataFrame을 만들지 않음).
+    manage.py ingest departures --monthly 가 지역마다 부른다.
+    settings.DEPARTURE_MONTHLY_STORAGE:
+      - "rows":   TravelStat 월별 행
+      - "series": DepartureSeries (국가당 int32 배열 한 행)
+      - "both":   둘 다 (반환 통계는 TravelStat 기준)
+    """
+    storage = settings.DEPARTURE_MONTHLY_STORAGE
+    total = None
+    for chunk in iter_departure_csv(path, region_name, chunksize):
+        stats = None
+        if storage in ("rows", "both"):
+            stats = save_to_db(chunk, batch_size)
+        if storage in ("series", "both"):
+            series_stats = save_series_frame(chunk, batch_size)
+            stats = stats or series_stats
+        if stats is not None:
+            total = merge_upsert_stats(total, stats)
+    return total
+
+
+# TravelStat.Meta.unique_together (DB unique 인덱스) 와 같은 필드 조합
+TRAVEL_UNIQUE_FIELDS = ["region", "country", "year", "month"]
+
+
+def bulk_save_travel_stats(df, update_fields, month=None, batch_size=None):
+    """
+    long-form DataFrame(year, [month], country, region, departures)을 TravelStat에 배치 upsert.
+    month를 주면 df의 month 대신 그 값으로 저장 (연도별 합계 = 0)
+    """
+    months = [month] * len(df) if month is not None else df["month"].tolist()
+
+    objs = [
+        TravelStat(region=region, country=country, year=year, month=m, departures=departures)
+        for region, country, year, m, departures in zip(
+            df["region"].tolist(),
+            df["country"].tolist(),
+            df["year"].tolist(),
+            months,
+            df["departures"].tolist(),
         )
-        count += 1
-    return count
+    ]
+
+    stats = bulk_upsert(TravelStat, objs, TRAVEL_UNIQUE_FIELDS, update_fields, batch_size)
+    print(
+        f"✔ TravelStat {stats['rows']}건 저장 "
+        f"(신규 {stats['inserted']} / 갱신 {stats['updated']} / 변경없음 {stats['skipped']}, "
+        f"{stats['rows_per_sec']} rows/s)"
+    )
+    return stats
+
 
+@metrics.timed("save_monthly_to_db")
+def save_to_db(df, batch_size=None):
+    return bulk_save_travel_stats(df, ["departures"], batch_size=batch_size)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow가 없으면 캐시 없이 매번 파싱
+    feather = None
+
+
+# 파서/집계 로직이 바뀌면 올려서 기존 캐시를 전부 무효화
+CACHE_VERSION = 1
+
+# (path, size, mtime_ns) → sha256 : 같은 프로세스에서 파일이 그대로면 다시 해시하지 않음
+_hash_memo = {}
+
+
+# -----------------------------
+# ✔ CSV 지문 (path + size + mtime + 내용 해시)
+# -----------------------------
+def file_fingerprint(path):
+    if path is None:
+        return {"path": None}
+
+    path = Path(path)
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return {"path": str(path), "missing": True}
+
+    memo_key = (str(path), st.st_size, st.st_mtime_ns)
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        _hash_memo[memo_key] = digest
+
+    return {
+        "path": str(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": digest,
+    }
+
+
+def dataset_key(files, extra=None):
+    """
+    files: {region: path} 전체에 대한 캐시 키.
+    extra: 결과에 영향을 주는 기타 파라미터 (예: 범죄국 리스트)
+    """
+    payload = {
+        "version": CACHE_VERSION,
+        "files": {region: file_fingerprint(path) for region, path in files.items()},
+        "extra": extra,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+# -----------------------------
+# ✔ Feather 캐시 읽기/쓰기
+# -----------------------------
+def cache_enabled():
+    return feather is not None and getattr(settings, "DEPARTURE_CACHE_ENABLED", True)
+
+
+def _cache_root():
+    return Path(settings.DEPARTURE_CACHE_DIR)
+
+
+def read_cached(key):
+    """
+    캐시 적중 시 {"frames": {name: DataFrame}, "meta": dict} 반환, 없으면 None.
+    Feather 파일은 무압축으로 저장해서 memory_map으로 바로 연다.
+    """
+    if not cache_enabled():
+        return None
+
+    entry = _cache_root() / key
+    meta_path = entry / "meta.json"
+    if not meta_path.exists():
+        return None
+
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        frames = {
+            name: feather.read_table(entry / f"{name}.feather", memory_map=True).to_pandas()
+            for name in meta["frames"]
+        }
+    except Exception as e:
+        print(f"⚠ CSV 캐시 읽기 실패 ({key}) → {e}")
+        return None
+
+    return {"frames": frames, "meta": meta}
+
+
+def write_cached(key, frames, meta=None):
+    """
+    frames: {name: DataFrame}, meta: JSON으로 저장할 스칼라 값들.
+    임시 폴더에 다 쓴 다음 rename 하므로 읽는 쪽은 반쯤 쓰인 캐시를 보지 않는다.
+    """
+    if not cache_enabled():
+        return
+
+    root = _cache_root()
+    root.mkdir(parents=True, exist_ok=True)
+    entry = root / key
+
+    tmp = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=root))
+    try:
+        for name, df in frames.items():
+            feather.write_feather(
+                df.reset_index(drop=True),
+                tmp / f"{name}.feather",
+                compression="uncompressed",
+            )
+        full_meta = dict(meta or {}, frames=list(frames))
+        (tmp / "meta.json").write_text(
+            json.dumps(full_meta, ensure_ascii=False), encoding="utf-8"
+        )
+        os.replace(tmp, entry)
+    except OSError:
+        # 다른 워커가 같은 키를 먼저 써 둔 경우 → 그쪽 결과를 그대로 사용
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+
+    _prune(root, keep=key)
+
+
+def _prune(root, keep):
+    """현재 키가 아닌 예전 캐시 폴더 정리 (CSV가 바뀌면 자동으로 무효화)"""
+    for child in root.iterdir():
+        if child.name != keep and child.is_dir() and not child.name.startswith("."):
+            shutil.rmtree(child, ignore_errors=True)
@@ -1,86 +1,36 @@
 import pandas as pd
 from django.conf import settings
-from .models import TravelStat
-
-# -----------------------------
-# ✔ 숫자 변환 함수
-# -----------------------------
-def clean_num(x):
-    if pd.isna(x):
-        return 0
-    x = str(x).replace(",", "").replace("-", "0").strip()
-    try:
-        return int(float(x))
-    except:
-        return 0
-
+from django.db import transaction
+from django.db.models import Q, Sum
+from .models import CountryYearDeparture, TravelStat, YearlyDepartureTotal
+from .utils_csv import bulk_save_travel_stats, csv_regions, departure_csv_files, iter_departure_csv, load_regions
+from . import metrics, profiling, singleflight
+from .utils_csv_cache import dataset_key, read_cached, write_cached
+from .response_cache import bump_data_version
+from .utils_db import bulk_upsert
 
 # -----------------------------
 # ✔ CSV 월별 파싱 → 연도/국가별 집계
 # -----------------------------
-def load_and_aggregate_csv(path, region_name):
-
-    df = pd.read_csv(path, header=None, encoding="utf-8-sig")
-
-    # 1행: 국가명, 2행: 명수/전년대비
-    header_country = df.iloc[1]
-    header_type = df.iloc[2]
-    n_cols = df.shape[1]
-
-    # (col_index, country_name)
-    country_cols = []
-    for col in range(3, n_cols):
-        if str(header_type[col]).strip() != "명수":
-            continue
-        country_name = str(header_country[col]).strip()
-        if country_name.lower() == "nan" or country_name == "":
-            continue
-        country_cols.append((col, country_name))
-
-    print(f"[{region_name}] 감지된 국가 수:", len(country_cols))
-
-    output_rows = []
-    current_year = None
-
-    # -----------------------------
-    # ✔ 월별 데이터 파싱
-    # -----------------------------
-    for idx, row in df.iloc[3:].iterrows():
-
-        year_cell = str(row.iloc[0]).strip()
-        month_cell = str(row.iloc[1]).strip()
-
-        # 연도 감지
-        if year_cell.endswith("년"):
-            digits = "".join([c for c in year_cell if c.isdigit()])
-            if digits:
-                current_year = int(digits)
-            continue
-
-        if current_year is None:
-            continue
-
-        # 월 감지
-        if not month_cell.endswith("월"):
-            continue
-
-        # 국가별 숫자 저장
-        for col, country_name in country_cols:
-            departures = clean_num(row.iloc[col])
-            output_rows.append({
-                "year": current_year,
-                "country": country_name,
-                "region": region_name,
-                "departures": departures,
-            })
+def load_and_aggregate_csv(path, region_name, chunksize=None):
+
+    # 월별 파싱은 utils_csv의 스트리밍 파서를 사용하고,
+    # 청크마다 바로 연도별 부분합으로 줄여서 월 단위 전체 표는 메모리에 두지 않는다
+    keys = ["year", "country", "region"]
+    partials = [
+        chunk.groupby(keys)["departures"].sum()
+        for chunk in iter_departure_csv(path, region_name, chunksize)
+    ]
 
-    monthly_df = pd.DataFrame(output_rows)
+    if not partials:
+        return pd.DataFrame(columns=keys + ["departures"])
 
     # -----------------------------
     # ✔ 월별 → 연도별 합계 변환
     # -----------------------------
     yearly_df = (
-        monthly_df.groupby(["year", "country"])
+        pd.concat(partials)
+        .groupby(level=keys)
         .sum()
         .reset_index()
     )
@@ -172,25 +122,44 @@ def compute_yearly_totals(df):
 # -----------------------------
 # ✔ CSV 전체 로드 & 연도별/범죄국 집계
 # -----------------------------
-def load_all_departure_data():
-    files = {
-        "asia": settings.ASIA_CSV,
-        "europe": settings.EUROPE_CSV,
-        "africa": settings.AFRICA_CSV,
-        "america": settings.AMERICA_CSV,
-        "oceania": settings.OCEANIA_CSV,
-    }
+REPORT_FRAMES = ["total_by_year", "crime_total_by_year", "crime_ratio_by_year", "country_yearly"]
+
+
+def _as_result(df, report):
+    return df, report["total_by_year"], report["crime_total_by_year"], report["crime_ratio_by_year"], report["total_2018_2024"]
+
 
-    outputs = []
+def load_all_departure_data(workers=None, write_cache=True):
+    # 동시에 여러 요청이 와도 CSV 로드/집계는 한 번만 (결과 공유)
+    # write_cache=False: 캐시가 있으면 읽기만 하고 새로 쓰지는 않음 (ingest --dry-run)
+    # → 캐시를 쓰는 호출과 안 쓰는 호출이 서로의 계산에 합류하지 않도록 키를 나눈다
+    return singleflight.do(f"departures:{int(write_cache)}", _load_all_departure_data, workers, write_cache)
 
-    for region, path in files.items():
-        print(f"=== {region.upper()} CSV 로드 시작 ===")
-        try:
-            df = load_and_aggregate_csv(path, region)
 
-            outputs.append(df)
-        except Exception as e:
-            print(f"⚠ {region} CSV 로드 실패 → {e}")
+def departure_data_key(files=None):
+    """출국 CSV 전체 + 범죄국 리스트 지문 (CSV가 바뀌면 달라짐)"""
+    if files is None:
+        files = departure_csv_files()
+    return dataset_key(files, extra={"crime_countries": CRIME_COUNTRIES})
+
+
+def _load_all_departure_data(workers, write_cache=True):
+    files = departure_csv_files()
+
+    # CSV 지문이 그대로면 파싱 없이 캐시(feather, memory-map)에서 바로 읽기
+    key = departure_data_key(files)
+    with profiling.section("csv_load"):
+        cached = read_cached(key)
+    if cached is not None:
+        frames = cached["frames"]
+        report = {name: frames[name] for name in REPORT_FRAMES}
+        report["total_2018_2024"] = cached["meta"]["total_2018_2024"]
+        return _as_result(frames["df"], report)
+
+    with profiling.section("csv_load"):
+        outputs = [
+            df for _, df in load_regions(files, load_and_aggregate_csv, workers)
+        ]
 
     if not outputs:
         return None
@@ -198,28 +167,118 @@ def load_all_departure_data():
     df = pd.concat(outputs, ignore_index=True)
 
     # 🔥 새 분석 기능 추가
-    report = compute_yearly_totals(df)
+    with profiling.section("aggregate"):
+        report = compute_yearly_totals(df)
+
+    if write_cache:
+        write_cached(
+            key,
+            {"df": df, **{name: report[name] for name in REPORT_FRAMES}},
+            {"total_2018_2024": report["total_2018_2024"]},
+        )
 
-    return df, report["total_by_year"], report["crime_total_by_year"], report["crime_ratio_by_year"], report["total_2018_2024"]
+    return _as_result(df, report)
 
 
 # -----------------------------
 # ✔ DB 저장 (연도별 데이터만 저장)
 # -----------------------------
-def save_yearly_to_db(df):
-    count = 0
-    for _, row in df.iterrows():
-        TravelStat.objects.update_or_create(
-            year=row["year"],
-            month=0,
-            country=row["country"],
-            region=row["region"],     # 🔥 region은 모델에 있으므로 추가
-            defaults={
-                "departures": row["departures"],
-                "ratio": None,
-            }
+@metrics.timed("save_yearly_to_db")
+def save_yearly_to_db(df, batch_size=None):
+    # 연도별 합계는 month=0 으로 저장, ratio는 비워 둔다
+    # df에 들어 있는 지역은 그 지역 CSV 전체로 보고 연도별 행을 통째로 바꾼다
+    # (df에 없는 예전 국가/연도 행은 삭제 → 같은 연도가 두 번 합산되지 않음)
+    # 요약 테이블도 같은 트랜잭션에서 갱신 → 분석 API가 반쯤 바뀐 합계를 보지 않음
+    with transaction.atomic():
+        stats = bulk_save_travel_stats(df, ["departures", "ratio"], month=0, batch_size=batch_size)
+        removed_years = _delete_missing_yearly(df)
+        stats["deleted"] = len(removed_years)
+        refresh_departure_summaries(set(df["year"].tolist()) | set(removed_years))
+
+    print(f"\n✔ 연도별 데이터 {stats['rows']}건 저장 완료! (지난 행 삭제 {stats['deleted']}건)")
+    return stats
+
+
+def _delete_missing_yearly(df):
+    """df의 지역들에서 df에 없는 연도별 행(month=0) 삭제, 삭제한 행의 연도 목록 반환"""
+    keep = set(zip(df["region"].tolist(), df["country"].tolist(), df["year"].tolist()))
+    stale = [
+        (pk, year)
+        for pk, *key, year in TravelStat.objects.filter(month=0, region__in=set(df["region"].tolist()))
+        .values_list("pk", "region", "country", "year")
+        if (*key, year) not in keep
+    ]
+    if stale:
+        TravelStat.objects.filter(pk__in=[pk for pk, _ in stale]).delete()
+        transaction.on_commit(bump_data_version)
+    return [year for _, year in stale]
+
+
+# -----------------------------
+# ✔ 출국자 요약 테이블 (분석 API는 CSV 대신 이 표를 읽는다)
+# -----------------------------
+def _delete_missing(model, years, keep, fields):
+    """years 안에서 이번 집계에 없는 (더 이상 데이터가 없는) 요약 행 삭제"""
+    stale = [
+        pk for pk, *key in model.objects.filter(year__in=years).values_list("pk", *fields)
+        if tuple(key) not in keep
+    ]
+    if stale:
+        model.objects.filter(pk__in=stale).delete()
+    return len(stale)
+
+
+def refresh_departure_summaries(years=None):
+    """
+    TravelStat 연도 합계 행(month=0)에서 주어진 연도의 요약만 다시 계산
+      - CountryYearDeparture: 국가 × 연도
+      - YearlyDepartureTotal: 연도별 전체 / 범죄국 합계
+    years=None 이면 전체 재계산.
+    CSV가 없는 지역(예: America.csv 없이 예전 동기화가 남긴 행)은 더하지 않는다
+    → CSV로 계산하던 예전 결과, CSV로 만든 출국 큐브(/analysis/ratio/)와 같은 숫자
+    """
+    source = TravelStat.objects.filter(month=0, region__in=csv_regions())
+    if years is not None:
+        if not years:
+            return None
+        source = source.filter(year__in=years)
+
+    country_objs = [
+        CountryYearDeparture(country=r["country"], year=r["year"], departures=r["total"])
+        for r in source.values("country", "year").annotate(total=Sum("departures")).order_by()
+    ]
+    yearly_objs = [
+        YearlyDepartureTotal(year=r["year"], departures=r["total"], crime_departures=r["crime"] or 0)
+        for r in source.values("year").annotate(
+            total=Sum("departures"),
+            crime=Sum("departures", filter=Q(country__in=CRIME_COUNTRIES)),
+        ).order_by()
+    ]
+
+    if years is None:
+        years = {o.year for o in yearly_objs} | set(
+            YearlyDepartureTotal.objects.values_list("year", flat=True)
         )
-        count += 1
 
-    print(f"\n✔ 연도별 데이터 {count}건 저장 완료!")
-    return count
+    with transaction.atomic():
+        stats = {
+            "country_year": bulk_upsert(
+                CountryYearDeparture, country_objs, ["country", "year"], ["departures"]
+            ),
+            "yearly": bulk_upsert(
+                YearlyDepartureTotal, yearly_objs, ["year"], ["departures", "crime_departures"]
+            ),
+        }
+        removed = _delete_missing(
+            CountryYearDeparture, years, {(o.country, o.year) for o in country_objs}, ["country", "year"]
+        ) + _delete_missing(
+            YearlyDepartureTotal, years, {(o.year,) for o in yearly_objs}, ["year"]
+        )
+        if removed:
+            transaction.on_commit(bump_data_version)
+
+    print(
+        f"✔ 출국 요약 갱신: 국가×연도 {stats['country_year']['rows']}건 / "
+        f"연도 {stats['yearly']['rows']}건 (삭제 {removed})"
+    )
+    return stats
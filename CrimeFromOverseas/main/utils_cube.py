@@ -0,0 +1,250 @@
+import json
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .utils_csv import departure_csv_files, load_regions, parse_departure_csv
+
+# 국가 × 연도 × 월(12) 출국자 수. 없는 달은 0
+CUBE_DTYPE = np.dtype("<i8")
+
+# 월 단위 누적합 인덱스 (국가 + 마지막 행 = 전체 국가, 맨 앞 0)
+PREFIX_DTYPE = np.dtype("<i8")
+
+# 현재 큐브 파일 + 국가/지역 인덱스. 이 파일 하나를 os.replace 로 바꿔서 교체한다
+POINTER_NAME = "current.json"
+
+# 교체된 뒤에도 남겨 둘 이전 큐브 수 (아직 열고 있는 워커가 있을 수 있음)
+KEEP_OLD = 1
+
+
+def cube_enabled():
+    return getattr(settings, "DEPARTURE_CUBE_ENABLED", True)
+
+
+def _cube_root():
+    return Path(settings.DEPARTURE_CUBE_DIR)
+
+
+# =========================
+# 1. 쓰기 (ingest 프로세스)
+# =========================
+def build_cube(df):
+    """
+    월 단위 long-form DataFrame(year, month, country, region, departures) → (cube, meta)
+    같은 국가가 여러 지역 CSV에 있으면 합산하고, 지역은 인덱스에만 남긴다.
+    월 단위 행이 하나도 없으면 None (연도 범위를 정할 수 없음)
+    """
+    df = df[(df["month"] >= 1) & (df["month"] <= 12)]
+    if df.empty:
+        return None
+
+    countries = sorted(df["country"].unique().tolist())
+    base_year = int(df["year"].min())
+    n_years = int(df["year"].max()) - base_year + 1
+
+    country_codes = pd.Categorical(df["country"], categories=countries).codes
+    cube = np.zeros((len(countries), n_years, 12), dtype=CUBE_DTYPE)
+    np.add.at(
+        cube,
+        (country_codes, df["year"].to_numpy() - base_year, df["month"].to_numpy() - 1),
+        df["departures"].to_numpy(),
+    )
+
+    regions = {
+        region: sorted(group.unique().tolist())
+        for region, group in df.groupby("region")["country"]
+    }
+    meta = {
+        "countries": countries,
+        "regions": regions,
+        "base_year": base_year,
+        "n_years": n_years,
+    }
+    return cube, meta
+
+
+def build_prefix(cube):
+    """
+    (국가, 연도, 월) 큐브 → (국가 + 1, 개월 수 + 1) 누적합.
+    prefix[i, t] = i번째 국가의 0 ~ t-1번째 달 합계, 마지막 행은 전체 국가 합계.
+    [a, b) 구간 합계는 prefix[:, b] - prefix[:, a] 로 국가 수만큼의 뺄셈이면 된다.
+    """
+    n_countries = cube.shape[0]
+    flat = cube.reshape(n_countries, -1)
+    prefix = np.zeros((n_countries + 1, flat.shape[1] + 1), dtype=PREFIX_DTYPE)
+    np.cumsum(flat, axis=1, out=prefix[:n_countries, 1:])
+    prefix[n_countries] = prefix[:n_countries].sum(axis=0)
+    return prefix
+
+
+def _save_array(root, name, array):
+    fd, tmp = tempfile.mkstemp(prefix=f".{name}-", dir=root)
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, root / name)
+
+
+def write_cube(df):
+    """
+    큐브를 새 파일에 쓰고 포인터(current.json)를 원자적으로 바꾼다.
+    이미 열려 있는 워커의 memmap은 예전 파일을 계속 보다가 다음 open_cube() 때 새 파일로 넘어간다.
+    월 단위 행이 없으면 아무것도 쓰지 않고 None (기존 큐브는 그대로 둔다)
+    """
+    built = build_cube(df)
+    if built is None:
+        print("⚠ 출국 큐브: 월 단위 행이 없음 → 저장 생략")
+        return None
+    cube, meta = built
+
+    root = _cube_root()
+    root.mkdir(parents=True, exist_ok=True)
+
+    token = uuid.uuid4().hex[:12]
+    name = f"cube-{token}.npy"
+    prefix_name = f"prefix-{token}.npy"
+    _save_array(root, name, cube)
+    _save_array(root, prefix_name, build_prefix(cube))
+
+    meta = {"file": name, "prefix_file": prefix_name, **meta}
+    fd, tmp = tempfile.mkstemp(prefix=".current-", dir=root)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, root / POINTER_NAME)
+
+    _prune(root, keep=token)
+    print(f"✔ 출국 큐브 저장: {name} {cube.shape} ({cube.nbytes / 1024:.1f}KB)")
+    return meta
+
+
+def _prune(root, keep):
+    """가장 최근 것들만 남기고 예전 큐브/누적합 파일 삭제 (열린 memmap은 POSIX에서 계속 유효)"""
+    old = sorted(
+        (p for p in root.glob("cube-*.npy") if p.stem != f"cube-{keep}"),
+        key=lambda p: p.stat().st_mtime_ns,
+        reverse=True,
+    )
+    for path in old[KEEP_OLD:]:
+        token = path.stem.split("-", 1)[1]
+        for stale in (path, root / f"prefix-{token}.npy"):
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+
+def write_cube_from_csv(workers=None):
+    """출국 CSV 전체를 월 단위로 파싱해서 큐브 갱신"""
+    outputs = [df for _, df in load_regions(departure_csv_files(), parse_departure_csv, workers)]
+    if not outputs:
+        return None
+    return write_cube(pd.concat(outputs, ignore_index=True))
+
+
+# =========================
+# 2. 읽기 (웹 워커, 읽기 전용 memmap)
+# =========================
+class DepartureCube:
+    """
+    data: (국가, 연도, 월) 읽기 전용 memmap
+    같은 파일을 여는 모든 워커가 OS 페이지 캐시를 공유한다.
+    """
+
+    def __init__(self, data, meta, prefix=None):
+        self.data = data
+        self.prefix = prefix if prefix is not None else build_prefix(data)
+        self.file = meta["file"]
+        self.countries = meta["countries"]
+        self.regions = meta["regions"]
+        self.base_year = meta["base_year"]
+        self.country_index = {name: i for i, name in enumerate(self.countries)}
+
+    @property
+    def years(self):
+        return list(range(self.base_year, self.base_year + self.data.shape[1]))
+
+    def country_ids(self, countries):
+        """국가명 목록 → 인덱스 배열 (없는 국가는 무시, 중복은 한 번만)"""
+        return np.array(
+            list(dict.fromkeys(self.country_index[c] for c in countries if c in self.country_index)),
+            dtype="int64",
+        )
+
+    def region_countries(self, region):
+        return self.regions.get(region, [])
+
+    def monthly(self, country):
+        """국가 하나의 (연도, 월) view"""
+        return self.data[self.country_index[country]]
+
+    def yearly_totals(self, countries=None):
+        """연도별 합계 (countries=None 이면 전체 국가)"""
+        data = self.data if countries is None else self.data[self.country_ids(countries)]
+        return data.sum(axis=(0, 2))
+
+    def range_totals(self, countries, start, end, by="year"):
+        """
+        start/end: (연, 월) 포함 구간. 큐브 기간 밖은 잘라낸다.
+        by="year"면 연도별, "month"면 월별 구간 경계에서 누적합을 뺀다.
+        반환: (구간 라벨 [(연, 월)], 선택 국가 합계, 전체 국가 합계)
+        """
+        n_months = self.data.shape[1] * 12
+        lo = max(0, (start[0] - self.base_year) * 12 + start[1] - 1)
+        hi = min(n_months, (end[0] - self.base_year) * 12 + end[1])
+        if hi <= lo:
+            empty = np.zeros(0, dtype=PREFIX_DTYPE)
+            return [], empty, empty
+
+        step = 12 if by == "year" else 1
+        # 연도별이면 구간 경계를 연초에 맞춘다 (잘린 첫/마지막 해는 있는 달만)
+        first = lo - lo % step
+        edges = np.append(np.arange(first, hi, step).clip(lo), hi)
+
+        ids = self.country_ids(countries)
+        # (선택 국가 × 구간 경계) 칸만 읽는다 → O(|countries| × 구간 수)
+        picked = self.prefix[np.ix_(ids, edges)].sum(axis=0)
+        total = self.prefix[-1, edges]
+
+        labels = [divmod(int(e), 12) for e in edges[:-1]]
+        labels = [(self.base_year + y, m + 1) for y, m in labels]
+        return labels, np.diff(picked), np.diff(total)
+
+
+_opened = None
+_opened_lock = threading.Lock()
+
+
+def open_cube():
+    """
+    현재 큐브를 읽기 전용으로 연다 (없으면 None).
+    포인터 파일이 그대로면 이미 열어 둔 memmap을 돌려주고, 바뀌었으면 새 파일을 연다.
+    """
+    global _opened
+
+    pointer = _cube_root() / POINTER_NAME
+    try:
+        st = pointer.stat()
+    except FileNotFoundError:
+        return None
+    key = (str(pointer), st.st_ino, st.st_mtime_ns, st.st_size)
+
+    with _opened_lock:
+        if _opened is not None and _opened[0] == key:
+            return _opened[1]
+
+        meta = json.loads(pointer.read_text(encoding="utf-8"))
+        data = np.load(pointer.parent / meta["file"], mmap_mode="r")
+        prefix = None
+        if meta.get("prefix_file"):
+            prefix = np.load(pointer.parent / meta["prefix_file"], mmap_mode="r")
+        cube = DepartureCube(data, meta, prefix)
+        _opened = (key, cube)
+        return cube
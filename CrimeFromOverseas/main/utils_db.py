@@ -0,0 +1,120 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from . import metrics
+from .response_cache import bump_data_version
+
+
+# -----------------------------
+# ✔ 배치 upsert (bulk_create + ON CONFLICT DO UPDATE)
+# -----------------------------
+def _key(obj, fields):
+    return tuple(getattr(obj, f) for f in fields)
+
+
+def _existing_rows(model, objs, unique_fields, update_fields):
+    """objs 중 이미 DB에 있는 행 {키: update_fields 값} (SELECT 한 번)"""
+    lookup = {
+        f"{field}__in": {getattr(obj, field) for obj in objs}
+        for field in unique_fields
+    }
+    n = len(unique_fields)
+    return {
+        row[:n]: row[n:]
+        for row in model.objects.filter(**lookup).values_list(*unique_fields, *update_fields)
+    }
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """
+    objs(저장 안 된 모델 인스턴스 리스트)를 batch_size 개씩 bulk_create(update_conflicts=True)로 저장.
+    전체를 트랜잭션 하나로 묶으므로 중간에 실패하면 아무것도 저장되지 않는다.
+
+    같은 키가 여러 번 나오면 update_or_create를 순서대로 부른 것처럼 마지막 값이 남는다.
+    DB에 있는 값과 update_fields가 전부 같은 행은 쓰지 않고 건너뛴다.
+    (변경 없는 재동기화는 INSERT/UPDATE가 0건)
+
+    실제로 쓴 행이 있으면 커밋 후 분석 응답 캐시의 데이터 버전을 올린다.
+
+    반환: {"rows", "inserted", "updated", "skipped", "seconds", "rows_per_sec"}
+    """
+    if batch_size is None:
+        batch_size = settings.DB_BULK_BATCH_SIZE
+
+    start = time.perf_counter()
+
+    deduped = {}
+    for obj in objs:
+        deduped[_key(obj, unique_fields)] = obj
+    objs = list(deduped.values())
+
+    with transaction.atomic():
+        existing = _existing_rows(model, objs, unique_fields, update_fields) if objs else {}
+
+        changed = []
+        inserted = updated = 0
+        for key, obj in deduped.items():
+            if key not in existing:
+                inserted += 1
+            elif existing[key] != _key(obj, update_fields):
+                updated += 1
+            else:
+                continue
+            changed.append(obj)
+
+        for i in range(0, len(changed), batch_size):
+            model.objects.bulk_create(
+                changed[i:i + batch_size],
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=update_fields,
+            )
+
+        if changed:
+            # 바깥 트랜잭션(동기화 전체)이 커밋된 뒤에 올려야 새 버전에 옛 데이터가 캐시되지 않음
+            transaction.on_commit(bump_data_version)
+
+    elapsed = time.perf_counter() - start
+
+    model_name = model.__name__
+    metrics.ROWS_UPSERTED.inc(inserted, model=model_name, op="insert")
+    metrics.ROWS_UPSERTED.inc(updated, model=model_name, op="update")
+    metrics.ROWS_SKIPPED.inc(len(objs) - inserted - updated, model=model_name)
+
+    return {
+        "rows": len(objs),
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": len(objs) - inserted - updated,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(len(objs) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+@contextmanager
+def dry_run_atomic(dry_run):
+    """
+    블록 전체를 트랜잭션 하나로 묶고, dry_run 이면 끝에서 되돌린다.
+    (bulk_upsert 의 inserted/updated/skipped 는 실제로 쓴 것처럼 계산되고,
+     on_commit 콜백 = 데이터 버전 올리기는 실행되지 않는다)
+    """
+    with transaction.atomic():
+        yield
+        if dry_run:
+            transaction.set_rollback(True)
+
+
+def merge_upsert_stats(total, stats):
+    """여러 번 나눠 저장한 bulk_upsert 결과를 합친다."""
+    if total is None:
+        return dict(stats)
+
+    merged = {k: total[k] + stats[k] for k in ("rows", "inserted", "updated", "skipped", "seconds")}
+    merged["seconds"] = round(merged["seconds"], 4)
+    merged["rows_per_sec"] = (
+        round(merged["rows"] / merged["seconds"], 1) if merged["seconds"] > 0 else None
+    )
+    return merged
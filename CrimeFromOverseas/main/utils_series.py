@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .models import DepartureSeries, TravelStat
+from .utils_db import bulk_upsert
+
+# 저장 형식: little-endian int32, 한 달에 하나
+DTYPE = np.dtype("<i4")
+
+# 값이 없는 달 (출국자 수는 음수가 될 수 없음)
+MISSING = -1
+
+
+# -----------------------------
+# ✔ (연, 월) ↔ 배열 위치
+# -----------------------------
+def month_offset(base_year, base_month, year, month):
+    return (year - base_year) * 12 + (month - base_month)
+
+
+def month_at(base_year, base_month, offset):
+    """offset번째 칸의 (연, 월)"""
+    y, m = divmod(base_month - 1 + offset, 12)
+    return base_year + y, m + 1
+
+
+# -----------------------------
+# ✔ 읽기 (복사 없이 NumPy 배열로)
+# -----------------------------
+def decode(series):
+    """
+    DepartureSeries.data → int32 배열.
+    DB에서 받은 버퍼를 그대로 가리키므로 읽기 전용이다 (수정하려면 .copy()).
+    """
+    return np.frombuffer(series.data, dtype=DTYPE)
+
+
+def slice_range(series, start=None, end=None):
+    """
+    start/end: (연, 월) 포함 구간. None이면 처음/끝까지.
+    반환: (int32 배열 view, 첫 칸의 (연, 월))
+    저장된 범위 밖은 잘라낸다 (없는 달은 MISSING 그대로).
+    """
+    values = decode(series)
+    lo = 0 if start is None else max(0, month_offset(series.base_year, series.base_month, *start))
+    hi = len(values) if end is None else min(
+        len(values), month_offset(series.base_year, series.base_month, *end) + 1
+    )
+    hi = max(lo, hi)
+    return values[lo:hi], month_at(series.base_year, series.base_month, lo)
+
+
+def yearly_totals(series, start_year, end_year):
+    """start_year~end_year 연도별 합계 int64 배열 (없는 달은 0으로)"""
+    values, (y, m) = slice_range(series, (start_year, 1), (end_year, 12))
+    months = np.zeros((end_year - start_year + 1) * 12, dtype="int64")
+    at = month_offset(start_year, 1, y, m)
+    months[at:at + len(values)] = np.where(values == MISSING, 0, values)
+    return months.reshape(-1, 12).sum(axis=1)
+
+
+def load_series(region=None, country=None):
+    """{(region, country): DepartureSeries}"""
+    qs = DepartureSeries.objects.all()
+    if region is not None:
+        qs = qs.filter(region=region)
+    if country is not None:
+        qs = qs.filter(country=country)
+    return {(s.region, s.country): s for s in qs}
+
+
+# -----------------------------
+# ✔ 쓰기 (기존 배열과 합치기)
+# -----------------------------
+def _merge(existing, year, month, values):
+    """
+    existing(DepartureSeries 또는 None)에 (year, month)부터 시작하는 values를 덮어쓴 새 배열.
+    반환: (base_year, base_month, int32 배열)
+    값이 MISSING 인 칸은 기존 값을 지우지 않는다.
+    """
+    values = np.asarray(values, dtype=DTYPE)
+
+    if existing is None:
+        return year, month, values
+
+    old = decode(existing)
+    base = (existing.base_year, existing.base_month)
+    if (year, month) < base:
+        base = (year, month)
+
+    old_at = month_offset(*base, existing.base_year, existing.base_month)
+    new_at = month_offset(*base, year, month)
+    length = max(old_at + len(old), new_at + len(values))
+
+    merged = np.full(length, MISSING, dtype=DTYPE)
+    merged[old_at:old_at + len(old)] = old
+    target = merged[new_at:new_at + len(values)]
+    np.copyto(target, values, where=values != MISSING)
+    return base[0], base[1], merged
+
+
+def append_months(region, country, year, month, values):
+    """
+    (region, country) 배열에 (year, month)부터 values를 이어 붙인다.
+    이미 있는 달은 새 값으로 덮어쓰고, 중간에 빈 달은 MISSING 으로 채운다.
+    """
+    with transaction.atomic():
+        existing = (
+            DepartureSeries.objects.select_for_update()
+            .filter(region=region, country=country)
+            .first()
+        )
+        base_year, base_month, merged = _merge(existing, year, month, values)
+
+        obj = existing or DepartureSeries(region=region, country=country)
+        obj.base_year, obj.base_month = base_year, base_month
+        obj.length = len(merged)
+        obj.data = merged.tobytes()
+        obj.save()
+    return obj
+
+
+def _frame_to_arrays(df):
+    """월 단위 long-form DataFrame → {(region, country): ((연, 월), int32 배열)}"""
+    df = df[(df["month"] >= 1) & (df["month"] <= 12)]
+    out = {}
+    for (region, country), group in df.groupby(["region", "country"], sort=False):
+        idx = group["year"].to_numpy() * 12 + group["month"].to_numpy() - 1
+        first = int(idx.min())
+        values = np.full(int(idx.max()) - first + 1, MISSING, dtype=DTYPE)
+        values[idx - first] = group["departures"].to_numpy()
+        out[(region, country)] = (divmod(first, 12), values)
+    return out
+
+
+def save_series_frame(df, batch_size=None):
+    """
+    월 단위 long-form DataFrame(year, month, country, region, departures)을
+    DepartureSeries에 합쳐 저장 (국가당 한 행, bulk upsert 한 번).
+    CSV 청크를 차례로 넣어도 기존 배열에 이어 붙는다.
+    """
+    arrays = _frame_to_arrays(df)
+    if not arrays:
+        return None
+
+    with transaction.atomic():
+        existing = {
+            (s.region, s.country): s
+            for s in DepartureSeries.objects.select_for_update().filter(
+                region__in={r for r, _ in arrays},
+                country__in={c for _, c in arrays},
+            )
+        }
+
+        objs = []
+        for (region, country), ((y, m0), values) in arrays.items():
+            base_year, base_month, merged = _merge(
+                existing.get((region, country)), y, m0 + 1, values
+            )
+            objs.append(DepartureSeries(
+                region=region, country=country,
+                base_year=base_year, base_month=base_month,
+                length=len(merged), data=merged.tobytes(),
+            ))
+
+        stats = bulk_upsert(
+            DepartureSeries, objs,
+            unique_fields=["region", "country"],
+            update_fields=["base_year", "base_month", "length", "data"],
+            batch_size=batch_size,
+        )
+
+    print(f"✔ DepartureSeries {stats['rows']}개 국가 저장 (신규 {stats['inserted']} / 갱신 {stats['updated']})")
+    return stats
+
+
+def series_from_travel_stats(batch_size=None):
+    """이미 저장된 TravelStat 월별 행(month 1~12)을 DepartureSeries로 옮긴다"""
+    rows = TravelStat.objects.filter(month__range=(1, 12)).values_list(
+        "region", "country", "year", "month", "departures"
+    )
+    df = pd.DataFrame(list(rows), columns=["region", "country", "year", "month", "departures"])
+    if df.empty:
+        return None
+    return save_series_frame(df, batch_size)
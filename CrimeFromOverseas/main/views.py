@@ -1,8 +1,12 @@
-from django.shortcuts import render
-from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.http import HttpResponse, JsonResponse
 from django.conf import settings 
-from .utils_csv_import import load_all_departure_data
-from .models import TravelStat
+from django.urls import reverse
+from . import jobs, metrics, profiling
+from .response_cache import cached_json_response
+from .utils_csv_import import CRIME_COUNTRIES, load_all_departure_data
+from .utils_cube import open_cube
+from .models import SyncJob, TravelStat, YearlyDepartureTotal
 from django.db.models import Count
 from django.http import JsonResponse
 from .api_client import get_voice_phishing_yearly
@@ -19,12 +23,7 @@ def test_departure_csv(request):
     }, safe=False)
 
 
-from .api_client import (
-    sync_cyber_scam,
-    sync_voice_phishing,
-    sync_travel_stats_from_csv,
-    fetch_cyber_scam,
-)
+from .api_client import fetch_cyber_scam
 
 
 def test_voice(request):
@@ -32,6 +31,12 @@ def test_voice(request):
     return JsonResponse(fetch_voice_phishing(), safe=False)
 
 
+# 업스트림 API 호출 지연시간/재시도 현황
+def api_stats_view(request):
+    from .api_client import get_api_call_stats
+    return JsonResponse(get_api_call_stats())
+
+
 # 메인 페이지
 def index(request):
     return render(request, 'main/index.html')
@@ -45,57 +50,49 @@ def test_keys(request):
         "VOICE_BASE_URL": settings.VOICE_BASE_URL,
     })
 
-from .utils_csv_import import load_all_departure_data, save_yearly_to_db
-
-def sync_travel_view(request):
-    df, year_totals, crime_totals, crime_ratio, total_all_years = load_all_departure_data()
+# =========================
+# 동기화: 요청은 작업만 등록하고 202 + job id 반환
+# 실제 수집/저장은 jobs.py 워커가 처리
+# =========================
+def _enqueue_sync(request, kind):
+    # 같은 종류의 작업이 이미 대기/실행 중이면 새로 만들지 않고 그 작업에 합류
+    job, created = jobs.enqueue(kind)
+    status_url = reverse("sync_job_status", args=[job.pk])
+    return JsonResponse({
+        "job_id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "joined_existing": not created,
+        "status_url": status_url,
+    }, status=202, headers={"Location": status_url})
 
-    saved = save_yearly_to_db(df)
 
-    return JsonResponse({
-        "status": "ok",
-        "saved_rows": saved,
-        "total_rows": len(df),
-        "year_totals": year_totals.to_dict(),          # 연도별 출국자 합계
-        "crime_totals": crime_totals.to_dict(),        # 범죄국 연도별 합계
-        "crime_ratio": crime_ratio.to_dict(orient="records"),
-        "total_all_years": int(total_all_years),       # 전체 합계
-    })
+def sync_travel_view(request):
+    return _enqueue_sync(request, "travel")
 
 
 # 사이버사기 API 동기화
 def sync_cyber_view(request):
-    sync_cyber_scam()
-    return JsonResponse({"status": "cyber_scam_sync_ok"})
+    return _enqueue_sync(request, "cyber")
 
 
 # 보이스피싱 API 동기화
 def sync_voice_view(request):
-    sync_voice_phishing()
-    return JsonResponse({"status": "voice_phishing_sync_ok"})
-
-
-from .api_client import sync_voice_phishing, get_voice_phishing_yearly
+    return _enqueue_sync(request, "voice")
 
 
 def sync_voice_yearly_view(request):
     """
     보이스피싱 월별 데이터를 DB로 저장하고,
-    연도별 합계(yearly)를 JSON으로 반환한다.
+    연도별 합계(yearly)는 작업 결과(result)로 남긴다.
     """
-    # 월별 데이터 저장
-    sync_voice_phishing()
-
-    # 연도별 합계 계산
-    yearly_df = get_voice_phishing_yearly()
+    return _enqueue_sync(request, "voice_yearly")
 
-    if yearly_df is None:
-        return JsonResponse({"status": "no_voice_data"})
 
-    return JsonResponse({
-        "status": "ok",
-        "yearly_voice_stats": yearly_df.to_dict(orient="records"),
-    })
+# 동기화 작업 상태 / 진행률
+def sync_job_status_view(request, job_id):
+    job = get_object_or_404(SyncJob, pk=job_id)
+    return JsonResponse(job.as_dict())
 
 
 # 사이버사기 원본 데이터 테스트 조회
@@ -139,65 +136,33 @@ def travel_debug_view(request):
     return render(request, "main/travel_debug.html", context)
 
 
-def get_analysis_data(request):
-    """
-    범죄국 비율, 사이버 사기 yearly, 보이스피싱 yearly
-    모두 JSON으로 반환
-    """
-
-    # 👉 1) 출국자 통계 (CSV 기반)
-    df, total_by_year, crime_by_year, total2018_2024 = load_all_departure_data()
-
-    # 연도: 2018~2024 슬라이싱
-    target_years = list(range(2018, 2025))
-
-    # 전체 출국자
-    total_year_dict = total_by_year.set_index("year")["year_total"].to_dict()
-
-    # 범죄국 출국자
-    crime_year_dict = crime_by_year.set_index("year")["crime_country_total"].to_dict()
-
-    # 👉 1-1) 범죄국 출국자 비율 (%) 계산
-    crime_ratio = []
-    for y in target_years:
-        if y in total_year_dict and y in crime_year_dict:
-            ratio = (crime_year_dict[y] / total_year_dict[y]) * 100
-            crime_ratio.append(round(ratio, 3))
-        else:
-            crime_ratio.append(None)
-
-    # 👉 2) 보이스피싱 연도별 합계
-    vp_df = get_voice_phishing_yearly()
-    vp_dict = vp_df.set_index("year")["voice_year_total"].to_dict()
-    voice_cases = [vp_dict.get(y, None) for y in target_years]
-
-    # 👉 3) 사이버사기 연도별 total_cases 계산
-    scam_qs = CyberScamStat.objects.all()
-    scam_yearly = {}
-
-    for obj in scam_qs:
-        scam_yearly.setdefault(obj.year, 0)
-        scam_yearly[obj.year] += obj.total_cases
+# 요청 프로파일링: 라우트별 지연시간 / SQL / 구간 / 메모리 백분위 (?format=json 이면 JSON)
+def perf_debug_view(request):
+    routes = profiling.summarize()
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "enabled": profiling.profiling_enabled(),
+            "buffer_size": settings.PERF_PROFILING_BUFFER,
+            "routes": routes,
+        })
+    return render(request, "main/perf_debug.html", {
+        "enabled": profiling.profiling_enabled(),
+        "buffer_size": settings.PERF_PROFILING_BUFFER,
+        "request_count": sum(r["count"] for r in routes),
+        "routes": routes,
+    })
 
-    cyber_scam_cases = [scam_yearly.get(y, None) for y in target_years]
 
-    return JsonResponse({
-        "years": target_years,
-        "crime_ratio": crime_ratio,
-        "cyber_scam_cases": cyber_scam_cases,
-        "voice_phishing_cases": voice_cases
-    })
+# Prometheus 스크레이프용 (METRICS_ENABLED=0 이면 404)
+def metrics_view(request):
+    if not metrics.metrics_enabled():
+        return HttpResponse("metrics disabled\n", status=404, content_type="text/plain")
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
-from django.http import JsonResponse
-from .utils_csv_import import load_all_departure_data
-from .api_client import get_voice_phishing_yearly, fetch_cyber_scam
 
-import pandas as pd
 from django.http import JsonResponse
-
 from .utils_csv_import import load_all_departure_data
-from .api_client import get_voice_phishing_yearly
-from .models import CyberScamStat
+from .api_client import get_cyber_scam_yearly, get_voice_phishing_yearly, fetch_cyber_scam
 
 
 def build_analysis_data():
@@ -206,72 +171,32 @@ def build_analysis_data():
     기간은 공통된 2018~2025로 통일.
     """
 
-    # 1) 출입국 CSV 데이터에서 연도별 합계, 범죄국 합계 불러오기
-    df, year_totals, crime_totals, country_yearly, total_2018_2024 = load_all_departure_data()
-
-
-    # 2) 분석 공통 연도 구간 설정
+    # 1) 분석 공통 연도 구간 설정
     valid_years = list(range(2018, 2026))  # 2018~2025
 
-    # 3) 출국자 데이터 필터링
-    year_totals_filtered = year_totals[year_totals["year"].isin(valid_years)]
-    crime_totals_filtered = crime_totals[crime_totals["year"].isin(valid_years)]
-
-    years = year_totals_filtered["year"].tolist()
-
-    # 4) 범죄국 비율(%)
-    crime_ratio = (
-        crime_totals_filtered["crime_country_total"].values /
-        year_totals_filtered["year_total"].values * 100
-    ).tolist()
-
-    # 5) 사이버사기 연도별 합계 (이미 연도별 total 필드 있다고 가정)
-    cyber_rows = CyberScamStat.objects.filter(year__in=valid_years).values(
-        "year",
-        "direct_trade",
-        "shopping_mall",
-        "game",
-        "email_trade",
-        "romance",
-        "investment",
-        "etc",
+    # 2) 출국자 연도별 합계 / 범죄국 합계 (동기화 때 미리 집계해 둔 요약 테이블, 연도당 1행)
+    departure_rows = list(
+        YearlyDepartureTotal.objects
+        .filter(year__in=valid_years)
+        .order_by("year")
+        .values_list("year", "departures", "crime_departures")
     )
 
-    # 연도별 total 계산
-    cyber_yearly = {}
-    for row in cyber_rows:
-        year = row["year"]
-        total = (
-            row["direct_trade"] +
-            row["shopping_mall"] +
-            row["game"] +
-            row["email_trade"] +
-            row["romance"] +
-            row["investment"] +
-            row["etc"]
-        )
-        cyber_yearly[year] = total
+    years = [year for year, _, _ in departure_rows]
 
-    cyber_scam_cases = [cyber_yearly.get(y, 0) for y in years]
+    # 3) 범죄국 비율(%)
+    crime_ratio = [crime / total * 100 if total else None for _, total, crime in departure_rows]
 
-    # 6) 보이스피싱 연도별 합계
-    voice_df = get_voice_phishing_yearly()
-    voice_df = voice_df[voice_df["year"].isin(valid_years)].sort_values("year")
-    voice_phishing_cases = voice_df["voice_year_total"].tolist()
+    # 4) 사이버사기 연도별 합계 (발생건수 유형 7개 합, DB에서 SUM)
+    cyber_yearly = get_cyber_scam_yearly(valid_years)
 
-    # 7) 길이 확인 후 패딩/정렬 (혹시 DB 누락된 연도가 있어도 안전)
-    def align_to_years(values, years_list):
-        """values 길이가 years_list와 다르면 빈 값(0)으로 보정"""
-        data = []
-        year_to_value = dict(zip(years_list, values))
-        for y in years_list:
-            data.append(year_to_value.get(y, 0))
-        return data
+    # 5) 보이스피싱 연도별 합계
+    voice_yearly = get_voice_phishing_yearly(valid_years)
 
-    cyber_scam_cases = align_to_years(cyber_scam_cases, years)
-    voice_phishing_cases = align_to_years(voice_phishing_cases, years)
+    # 6) 출국자 데이터가 있는 연도에 맞춤 (DB에 없는 연도는 0)
+    voice_phishing_cases = [voice_yearly.get(y, 0) for y in years]
 
-    # 8) 최종 JSON 데이터 반환
+    # 7) 최종 JSON 데이터 반환
     return {
         "years": years,
         "crime_ratio": crime_ratio,
@@ -284,8 +209,55 @@ def build_analysis_data():
 
 def get_analysis_data(request):
     """HTML에서 호출하는 /analysis/data/ API"""
-    data = build_analysis_data()
-    return JsonResponse(data)
+    # 동시에 들어온 요청은 cached_json_response 안의 single-flight 로 계산 하나를 같이 기다린다
+    return cached_json_response("analysis_data", build_analysis_data)
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}는 정수여야 합니다: {value!r}")
+
+
+def analysis_ratio_view(request):
+    """
+    /analysis/ratio/?countries=캄보디아,미얀마&from=2015&to=2024[&by=month]
+    임의 국가 묶음의 출국자 합계와 전체 대비 비율(%).
+    출국 큐브의 누적합 인덱스에서 구간 경계만 빼서 계산 (원본 데이터 재스캔 없음)
+    countries를 빼면 주요 범죄국(CRIME_COUNTRIES)
+    """
+    cube = open_cube()
+    if cube is None:
+        return JsonResponse({"error": "출국 큐브가 아직 없습니다. /sync/travel/ 먼저 실행"}, status=503)
+
+    raw = request.GET.get("countries", "")
+    # 같은 국가를 여러 번 넣어도 한 번만 더한다 (순서는 처음 나온 순)
+    countries = list(dict.fromkeys(c.strip() for c in raw.split(",") if c.strip())) or list(CRIME_COUNTRIES)
+    by = request.GET.get("by", "year")
+    try:
+        start_year = _parse_int(request.GET.get("from", cube.base_year), "from")
+        end_year = _parse_int(request.GET.get("to", cube.years[-1]), "to")
+        if by not in ("year", "month"):
+            raise ValueError(f"by는 year 또는 month: {by!r}")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    labels, picked, total = cube.range_totals(countries, (start_year, 1), (end_year, 12), by=by)
+    ratio = [
+        round(p / t * 100, 3) if t else None
+        for p, t in zip(picked.tolist(), total.tolist())
+    ]
+
+    return JsonResponse({
+        "countries": [c for c in countries if c in cube.country_index],
+        "unknown_countries": [c for c in countries if c not in cube.country_index],
+        "by": by,
+        "periods": [y if by == "year" else f"{y}-{m:02d}" for y, m in labels],
+        "selected_total": picked.tolist(),
+        "all_total": total.tolist(),
+        "ratio_percent": ratio,
+    })
+
 
 from django.shortcuts import render
 
@@ -301,13 +273,17 @@ from django.http import JsonResponse
 from .models import CyberScamStat
 
 def step3_radial_data(request):
-    qs = CyberScamStat.objects.order_by("year")
+    return cached_json_response("step3_radial", build_step3_radial_data)
 
-    voice_df = get_voice_phishing_yearly()
-    voice_dict = dict(
-        zip(voice_df["year"], voice_df["voice_year_total"])
+
+def build_step3_radial_data():
+    # 모델 인스턴스 대신 필요한 컬럼만 (total_cases는 DB 생성 컬럼)
+    qs = CyberScamStat.objects.order_by("year").values(
+        "year", "shopping_mall", "email_trade", "romance", "investment", "etc", "total_cases",
     )
 
+    voice_dict = get_voice_phishing_yearly()
+
     categories = [
         "shopping",
         "email_trade",
@@ -321,26 +297,28 @@ def step3_radial_data(request):
     data = []
 
     for row in qs:
-        year = row.year
+        year = row["year"]
 
         year_data = {
             "year": year,
-            "shopping": row.shopping_mall,
-            "email_trade": row.email_trade,
-            "celebrity": row.romance,
-            "cyber_invest": row.investment,
-            "cyber_etc": row.etc,
+            "shopping": row["shopping_mall"],
+            "email_trade": row["email_trade"],
+            "celebrity": row["romance"],
+            "cyber_invest": row["investment"],
+            "cyber_etc": row["etc"],
             "voice_phishing": voice_dict.get(year, 0),  # ✅ API에서 합침
         }
 
         year_data["total"] = sum(
             v for k, v in year_data.items() if k != "year"
         )
+        # 사이버사기 유형 7개 전체 합계 (그래프 범주에는 없음)
+        year_data["cyber_total"] = row["total_cases"]
 
         data.append(year_data)
 
-    return JsonResponse({
+    return {
         "categories": categories,
         "data": data
-    })
+    }
 